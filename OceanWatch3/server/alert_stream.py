@@ -0,0 +1,179 @@
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Deque, Dict, List, Optional, Sequence, Set, Tuple
+
+from pymongo import ASCENDING
+from pymongo.errors import PyMongoError
+
+from pagination import encode_cursor, jsonable, keyset_page
+
+logger = logging.getLogger(__name__)
+
+# Oldest first, so a resumed client receives what it missed in order
+REPLAY_SORT = [("timestamp", ASCENDING), ("_id", ASCENDING)]
+
+def _utc(dt: datetime) -> datetime:
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+def event_id(alert: Dict[str, Any]) -> str:
+    """SSE event id of an alert: a (timestamp, _id) cursor, valid as Last-Event-ID"""
+    return encode_cursor({"timestamp": alert["timestamp"], "_id": alert["_id"]})
+
+def alert_filter(severity: Optional[str] = None, alert_type: Optional[str] = None,
+                 ship_id: Optional[str] = None) -> Dict[str, Set[str]]:
+    """Allowed values per field from comma-separated parameters; empty means everything"""
+    filters = {}
+    for name, values in (("severity", severity), ("alert_type", alert_type), ("ship_id", ship_id)):
+        allowed = {value.strip() for value in (values or "").split(",") if value.strip()}
+        if allowed:
+            filters[name] = allowed
+    return filters
+
+def filter_query(filters: Dict[str, Set[str]]) -> Dict[str, Any]:
+    return {name: {"$in": sorted(values)} for name, values in filters.items()}
+
+def filter_matches(filters: Dict[str, Set[str]], alert: Dict[str, Any]) -> bool:
+    return all(getattr(alert.get(name), "value", alert.get(name)) in values for name, values in filters.items())
+
+@dataclass(eq=False)
+class Subscription:
+    filters: Dict[str, Set[str]]
+    queue: asyncio.Queue
+    dropped: bool = False
+
+class AlertStream:
+    """Fans new `ship_alerts` out to every subscriber from a single source.
+
+    The source is a change stream when the deployment supports one (replica
+    sets, Atlas) and otherwise one poller reading alerts newer than the last
+    it saw every `poll_seconds`; `notify()` makes it poll right away. Either
+    way the collection is read once no matter how many clients listen, and
+    only while at least one does. A subscriber more than `queue_max` alerts
+    behind is dropped and resumes through `replay` when it reconnects.
+    """
+
+    def __init__(self, collection, fields: Sequence[str], poll_seconds: float = 2.0,
+                 queue_max: int = 256, overlap_seconds: float = 5.0):
+        self.collection = collection
+        self.fields = list(fields)
+        self.poll_seconds = poll_seconds
+        self.queue_max = queue_max
+        # Alerts from other writers can land slightly out of timestamp order
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self.source: Optional[str] = None
+        self._subscribers: Set[Subscription] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake = asyncio.Event()
+        self.stats = {"published": 0, "delivered": 0, "dropped_subscribers": 0, "replayed": 0}
+
+    def payload(self, alert: Dict[str, Any]) -> Dict[str, Any]:
+        return jsonable({name: alert[name] for name in self.fields if name in alert})
+
+    def subscribe(self, filters: Dict[str, Set[str]]) -> Subscription:
+        subscription = Subscription(filters, asyncio.Queue(self.queue_max))
+        self._subscribers.add(subscription)
+        if self._task is None or self._task.done():
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.create_task(self._run())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self.source = None
+
+    def notify(self, *_: Any) -> None:
+        """Poll now; safe to call from tool threads"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def replay(self, after: str, filters: Dict[str, Set[str]], limit: int) -> Tuple[List[Dict[str, Any]], bool]:
+        """Alerts after the `after` event id in order, and whether more than `limit` were missed"""
+        alerts, next_cursor = await keyset_page(self.collection, filter_query(filters), REPLAY_SORT, limit, cursor=after)
+        self.stats["replayed"] += len(alerts)
+        return alerts, next_cursor is not None
+
+    async def close(self) -> None:
+        for subscription in list(self._subscribers):
+            self.unsubscribe(subscription)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"source": self.source, "subscribers": len(self._subscribers), **self.stats}
+
+    def _publish(self, alert: Dict[str, Any]) -> None:
+        self.stats["published"] += 1
+        for subscription in list(self._subscribers):
+            if not filter_matches(subscription.filters, alert):
+                continue
+            try:
+                subscription.queue.put_nowait(alert)
+                self.stats["delivered"] += 1
+            except asyncio.QueueFull:
+                # Too far behind: make room for the end-of-stream marker and let it resume by id
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.dropped = True
+                subscription.queue.put_nowait(None)
+                self._subscribers.discard(subscription)
+                self.stats["dropped_subscribers"] += 1
+
+    async def _run(self) -> None:
+        try:
+            await self._watch()
+        except asyncio.CancelledError:
+            raise
+        except PyMongoError as e:
+            logger.info(f"Alert change stream unavailable ({e}), polling every {self.poll_seconds}s")
+            await self._poll()
+
+    async def _watch(self) -> None:
+        resume_token = None
+        while True:
+            try:
+                stream = await self.collection.watch(
+                    [{"$match": {"operationType": "insert"}}], resume_after=resume_token
+                )
+                self.source = "change_stream"
+                async with stream:
+                    async for change in stream:
+                        resume_token = change["_id"]
+                        self._publish(change["fullDocument"])
+            except PyMongoError:
+                if self.source is None:
+                    raise
+                logger.warning("Alert change stream failed, reopening", exc_info=True)
+                await asyncio.sleep(self.poll_seconds)
+
+    async def _poll(self) -> None:
+        self.source = "poll"
+        latest = await self.collection.find_one({}, {"timestamp": 1}, sort=[("timestamp", -1), ("_id", -1)])
+        since = _utc(latest["timestamp"]) if latest else datetime.now(timezone.utc)
+        # Alerts already stored when the stream starts are history, not news
+        existing = await self.collection.find({"timestamp": {"$gte": since - self.overlap}}, {"timestamp": 1}).sort(REPLAY_SORT).to_list()
+        seen: Deque[Tuple[datetime, Any]] = deque((_utc(alert["timestamp"]), alert["_id"]) for alert in existing)
+        seen_ids: Set[Any] = {alert["_id"] for alert in existing}
+        while True:
+            try:
+                alerts = await self.collection.find({"timestamp": {"$gte": since - self.overlap}}).sort(REPLAY_SORT).to_list()
+                for alert in alerts:
+                    if alert["_id"] in seen_ids:
+                        continue
+                    seen.append((_utc(alert["timestamp"]), alert["_id"]))
+                    seen_ids.add(alert["_id"])
+                    since = max(since, _utc(alert["timestamp"]))
+                    self._publish(alert)
+                while seen and seen[0][0] < since - self.overlap:
+                    seen_ids.discard(seen.popleft()[1])
+            except Exception as e:
+                logger.warning(f"Alert poll failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
@@ -1,14 +1,29 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel
 import asyncio
+import gzip
 import uvicorn
 from datetime import datetime, timezone
+import json
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import os
 
-from ship_monitor_agent import ShipMonitorAgent
+from ship_monitor_agent import ShipMonitorAgent, ALERT_INDEXES
+from pagination import InvalidCursor, jsonable, keyset_page, parse_fields, window_start
+from rollups import alert_stats, backfill_rollups
+from jobs import JobQueue, JobStatus, QueueFull
+from ships import SHIP_FIELDS, SHIP_INDEXES, SHIP_LIST_FIELDS, SHIP_SORTS, ship_filter, ship_projection, ship_row
+from alert_stream import AlertStream, alert_filter, event_id
+from http_cache import ResponseCache, conditional_json, etag_for, etag_matches, parse_ttls
+from ship_tracks import MAX_ZOOM, TRACK_INDEXES, load_track, simplify, track_version, zoom_tolerance
+from cache import SWRCache
+from risk_grid import RISK_PROJECTION, RISK_QUERY, RiskGrid
+from viewport import LOCATION_INDEXES, normalize_locations, parse_bbox, viewport
+from positions import MEDIA_TYPE, POSITION_PROJECTION, POSITION_QUERY, encode_positions
 from config import config
 
 # Configure logging
@@ -33,24 +48,89 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Fields /recent-alerts may project; the default leaves out reasoning, evidence and dedup_key
+ALERT_FIELDS = [
+    "alert_id", "timestamp", "ship_id", "ship_name", "alert_type", "severity", "location",
+    "description", "reasoning", "evidence", "status", "dedup_key", "occurrences", "last_seen"
+]
+ALERT_LIST_FIELDS = [
+    "alert_id", "timestamp", "ship_id", "ship_name", "alert_type", "severity", "location",
+    "description", "status", "occurrences", "last_seen"
+]
+ALERT_SORT = [("timestamp", -1), ("_id", -1)]
+
+class BatchAnalysisRequest(BaseModel):
+    ship_ids: List[str]
+    max_concurrency: Optional[int] = None
+
 # Global agent instance
 agent: Optional[ShipMonitorAgent] = None
 monitoring_task: Optional[asyncio.Task] = None
 is_monitoring = False
+job_queue: Optional[JobQueue] = None
+alert_stream: Optional[AlertStream] = None
+response_cache = ResponseCache(
+    parse_ttls(config.RESPONSE_CACHE_TTLS), config.RESPONSE_CACHE_STALE_SECONDS, config.RESPONSE_CACHE_MAX_ENTRIES
+)
+track_cache = SWRCache(config.TRACK_CACHE_TTL_SECONDS, max_entries=config.TRACK_CACHE_MAX_ENTRIES, name="ship_tracks")
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize the AI agent on startup"""
-    global agent
+    global agent, job_queue, alert_stream
     try:
         logger.info("🚀 Starting OceanWatch AI Agent API Server...")
         config.validate()
         agent = ShipMonitorAgent()
+        job_queue = JobQueue(config.JOB_WORKERS, config.JOB_QUEUE_MAX, config.JOB_RESULT_TTL_SECONDS, config.JOB_STREAM_QUEUE_MAX)
+        job_queue.start()
+        alert_stream = AlertStream(
+            agent.async_db.ship_alerts, ALERT_LIST_FIELDS, config.ALERT_STREAM_POLL_SECONDS, config.ALERT_STREAM_QUEUE_MAX
+        )
+        agent.alert_listeners.append(alert_stream.notify)
+        try:
+            await agent.async_db.ship_alerts.create_indexes(ALERT_INDEXES)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not create alert indexes: {e}")
+        try:
+            await agent.async_db.gfw_ships.create_indexes(SHIP_INDEXES)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not create ship indexes: {e}")
+        try:
+            await agent.async_db[config.TRACK_EVENTS_COLLECTION].create_indexes(TRACK_INDEXES)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not create track indexes: {e}")
+        asyncio.create_task(backfill_alert_rollups())
+        asyncio.create_task(sync_vessel_locations())
         logger.info("✅ AI Agent initialized successfully")
     except Exception as e:
         logger.error(f"❌ Failed to initialize AI Agent: {e}")
         raise
 
+async def backfill_alert_rollups():
+    """Count recent alerts that predate the hourly rollups into them"""
+    try:
+        hours = await backfill_rollups(agent.async_db, window_start(config.ALERT_STATS_BACKFILL_HOURS))
+        logger.info(f"🧾 Alert rollups backfilled for {hours} hours")
+    except Exception as e:
+        logger.warning(f"⚠️ Alert rollup backfill failed, /alert-stats will count raw alerts: {e}")
+
+async def sync_vessel_locations():
+    """Keep the map vessels' GeoJSON `location` in step with their lat/lon and index it"""
+    vessels = agent.async_db[config.MAP_VESSELS_COLLECTION]
+    indexed = False
+    while True:
+        try:
+            updated = await normalize_locations(vessels)
+            if not indexed:
+                await vessels.create_indexes(LOCATION_INDEXES)
+                indexed = True
+            if updated:
+                logger.info(f"🗺️ Updated GeoJSON locations of {updated} vessels")
+        except Exception as e:
+            logger.warning(f"⚠️ Vessel location sync failed: {e}")
+        await asyncio.sleep(config.VESSEL_LOCATION_SYNC_SECONDS)
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
@@ -61,6 +141,12 @@ async def shutdown_event():
             await monitoring_task
         except asyncio.CancelledError:
             pass
+    if job_queue:
+        await job_queue.close()
+    if alert_stream:
+        await alert_stream.close()
+    if agent:
+        await agent.close()
     logger.info("👋 OceanWatch AI Agent API Server stopped")
 
 @app.get("/")
@@ -81,9 +167,8 @@ async def health_check():
         if not agent:
             raise HTTPException(status_code=503, detail="Agent not initialized")
         
-        # Test MongoDB connection
-        recent_events = agent.mongodb_tool._run("get_recent_events", hours=1)
-        
+        # Test MongoDB connection on every call; a cached answer could report healthy after Mongo went down
+        recent_events = await agent.mongodb_tool._arun("get_recent_events", hours=1)
         return {
             "status": "healthy",
             "agent_initialized": agent is not None,
@@ -156,28 +241,179 @@ async def get_monitoring_status():
     return {
         "is_monitoring": is_monitoring,
         "agent_initialized": agent is not None,
+        "jobs": agent.scheduler.snapshot() if agent else [],
+        "alert_stream": alert_stream.snapshot() if alert_stream else None,
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
 
-@app.post("/analyze-ship/{ship_id}")
-async def analyze_ship(ship_id: str):
-    """Analyze a specific ship"""
+@app.get("/ships/{vessel_id}/track")
+async def get_ship_track(vessel_id: str, zoom: Optional[int] = None):
+    """A vessel's event track in time order, simplified for the map's `zoom` level when given"""
     try:
         if not agent:
             raise HTTPException(status_code=503, detail="Agent not initialized")
+        if zoom is not None and not 0 <= zoom <= MAX_ZOOM:
+            raise HTTPException(status_code=400, detail=f"zoom must be between 0 and {MAX_ZOOM}")
+        
+        events = agent.async_db[config.TRACK_EVENTS_COLLECTION]
+        version = await track_version(events, vessel_id)
+        if version[0] == 0 and not await agent.async_db[config.MAP_VESSELS_COLLECTION].find_one({"vessel_id": vessel_id}, {"_id": 1}):
+            raise HTTPException(status_code=404, detail="Vessel not found")
+        cached = track_cache.peek(vessel_id)
+        if cached is not None and cached["version"] != version:
+            # New or removed events since the track was cached
+            track_cache.invalidate(vessel_id)
         
-        result = await agent.analyze_specific_ship(ship_id)
+        async def load() -> Dict[str, Any]:
+            return {"version": version, "points": await load_track(events, vessel_id), "simplified": {}}
         
+        track = await track_cache.get_or_load(vessel_id, load)
+        points = track["points"]
+        if zoom is not None:
+            if zoom not in track["simplified"]:
+                track["simplified"][zoom] = simplify(points, zoom_tolerance(zoom, config.TRACK_SIMPLIFY_PIXELS))
+            points = track["simplified"][zoom]
+        
+        return {
+            "id": vessel_id,
+            "points": points,
+            "total_points": len(track["points"]),
+            "zoom": zoom
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get track for {vessel_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get ship track: {str(e)}")
+
+@app.get("/vessels/bbox")
+async def get_vessels_in_bbox(bbox: str, zoom: Optional[int] = None):
+    """Vessels inside a map viewport (`min_lon,min_lat,max_lon,max_lat`), as points or, when dense, clusters"""
+    try:
+        if not agent:
+            raise HTTPException(status_code=503, detail="Agent not initialized")
+        try:
+            box = parse_bbox(bbox)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if zoom is not None and not 0 <= zoom <= MAX_ZOOM:
+            raise HTTPException(status_code=400, detail=f"zoom must be between 0 and {MAX_ZOOM}")
+        
+        result = await viewport(
+            agent.async_db[config.MAP_VESSELS_COLLECTION], box, zoom, config.VIEWPORT_MAX_POINTS,
+            config.VIEWPORT_CLUSTER_MAX_ZOOM, config.VIEWPORT_CLUSTER_CELL_BITS
+        )
         return {
-            "ship_id": ship_id,
-            "analysis": result,
+            **result,
+            "bbox": list(box),
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get vessels in bbox {bbox}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get vessels in bbox: {str(e)}")
+
+@app.get("/vessel-positions")
+async def get_vessel_positions(request: Request, names: bool = True):
+    """Every map vessel's position, bearing and risk counters as a gzipped columnar binary payload (see positions.py)"""
+    try:
+        if not agent:
+            raise HTTPException(status_code=503, detail="Agent not initialized")
+        
+        async def load():
+            vessels = await agent.async_db[config.MAP_VESSELS_COLLECTION].find(POSITION_QUERY, POSITION_PROJECTION).to_list()
+            body = await asyncio.to_thread(encode_positions, vessels, names)
+            return {"body": body, "etag": etag_for(body), "count": len(vessels)}
+        
+        payload = await response_cache.get("vessel_positions", names, load)
+        headers = {"ETag": payload["etag"], "Cache-Control": "no-cache", "Vary": "Accept-Encoding", "X-Vessel-Count": str(payload["count"])}
+        if etag_matches(request.headers.get("if-none-match"), payload["etag"]):
+            return Response(status_code=304, headers=headers)
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            return Response(payload["body"], media_type=MEDIA_TYPE, headers={**headers, "Content-Encoding": "gzip"})
+        return Response(gzip.decompress(payload["body"]), media_type=MEDIA_TYPE, headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get vessel positions: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get vessel positions: {str(e)}")
+
+@app.get("/risk-grid")
+async def get_risk_grid(zoom: int = 3):
+    """Vessel risk aggregated into map grid cells for a heatmap; only non-empty cells are returned"""
+    try:
+        if not agent:
+            raise HTTPException(status_code=503, detail="Agent not initialized")
+        if zoom < 0:
+            raise HTTPException(status_code=400, detail="zoom must not be negative")
+        
+        async def load():
+            vessels = await agent.async_db[config.MAP_VESSELS_COLLECTION].find(RISK_QUERY, RISK_PROJECTION).to_list()
+            grid = await asyncio.to_thread(RiskGrid, vessels, config.RISK_GRID_MAX_ZOOM, config.RISK_GRID_CELL_BITS)
+            return {"grid": grid, "generated_at": datetime.now(timezone.utc).isoformat()}
+        
+        # Every zoom level is built at once, so all zooms share one cache entry
+        built = await response_cache.get("risk_grid", "grid", load)
+        return {
+            **built["grid"].cells(zoom),
+            "vessel_count": built["grid"].vessel_count,
+            "generated_at": built["generated_at"]
+        }
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Failed to analyze ship {ship_id}: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to analyze ship: {str(e)}")
+        logger.error(f"Failed to get risk grid: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get risk grid: {str(e)}")
+
+@app.get("/cache-stats")
+async def get_cache_stats():
+    """Hit/miss metrics of the response cache and the agent's caches"""
+    return {
+        "responses": response_cache.snapshot(),
+        "ship_tracks": track_cache.snapshot(),
+        **(agent.cache_stats() if agent else {}),
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
+def _enqueue(kind: str, func, **params) -> JSONResponse:
+    """Queue an agent run and answer 202 with where to poll for it"""
+    if not agent or not job_queue:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    try:
+        job = job_queue.submit(kind, func, **params)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return JSONResponse(status_code=202, content={
+        "job_id": job.job_id,
+        "status": job.status.value,
+        "status_url": f"/jobs/{job.job_id}",
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    })
+
+@app.post("/analyze-ship/{ship_id}", status_code=202)
+async def analyze_ship(ship_id: str):
+    """Queue an analysis of a specific ship; poll /jobs/{job_id} for the result"""
+    return _enqueue("analyze_ship", lambda: agent.analyze_specific_ship(ship_id), ship_id=ship_id)
+
+@app.post("/analyze-ships")
+async def analyze_ships(request: BatchAnalysisRequest):
+    """Analyze many ships concurrently, streaming one NDJSON line per completed analysis"""
+    if not agent:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    if not request.ship_ids:
+        raise HTTPException(status_code=400, detail="ship_ids must not be empty")
+    # Clients may ask for less concurrency than the server allows, never more
+    concurrency = min(request.max_concurrency or config.MAX_CONCURRENT_ANALYSES, config.MAX_CONCURRENT_ANALYSES)
+
+    async def stream_results():
+        async for result in agent.analyze_ships_batch(request.ship_ids, concurrency):
+            result["timestamp"] = datetime.now(timezone.utc).isoformat()
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
 
-@app.post("/generate-alert")
+@app.post("/generate-alert", status_code=202)
 async def generate_alert(
     ship_id: str,
     alert_type: str,
@@ -185,119 +421,296 @@ async def generate_alert(
     reasoning: str,
     severity: str = "medium"
 ):
-    """Generate a specific alert"""
-    try:
-        if not agent:
-            raise HTTPException(status_code=503, detail="Agent not initialized")
-        
-        result = await agent.generate_alert_for_ship(
+    """Queue a specific alert; poll /jobs/{job_id} for the result"""
+    return _enqueue(
+        "generate_alert",
+        lambda: agent.generate_alert_for_ship(
             ship_id=ship_id,
             alert_type=alert_type,
             description=description,
             reasoning=reasoning
-        )
+        ),
+        ship_id=ship_id,
+        alert_type=alert_type
+    )
+
+@app.get("/jobs")
+async def list_jobs(status: Optional[JobStatus] = None, limit: int = 50):
+    """Recent analysis jobs, newest first, without their results"""
+    if not job_queue:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    return {
+        "jobs": [job.to_dict(include_result=False) for job in job_queue.recent(status, min(max(limit, 1), 500))],
+        "stats": job_queue.stats(),
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
+@app.get("/jobs/stream")
+async def stream_jobs(job_id: Optional[str] = None):
+    """Server-sent events, one `job` event per finished job (or only `job_id`, then the stream ends)"""
+    if not job_queue:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+
+    async def events():
+        inbox = job_queue.subscribe()
+        try:
+            if job_id:
+                job = job_queue.get(job_id)
+                if job is None:
+                    yield f"event: error\ndata: {json.dumps({'detail': 'Job not found'})}\n\n"
+                    return
+                if job.done:
+                    yield f"id: {job.job_id}\nevent: job\ndata: {json.dumps(job.to_dict(), default=str)}\n\n"
+                    return
+            while True:
+                try:
+                    job = await asyncio.wait_for(inbox.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                if job is None:
+                    # Dropped for falling too far behind; finished jobs are still listed by /jobs
+                    yield f"event: reset\ndata: {json.dumps({'detail': 'Too many missed jobs, reload from /jobs'})}\n\n"
+                    return
+                if job_id and job.job_id != job_id:
+                    continue
+                yield f"id: {job.job_id}\nevent: job\ndata: {json.dumps(job.to_dict(), default=str)}\n\n"
+                if job_id:
+                    return
+        finally:
+            job_queue.unsubscribe(inbox)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of an analysis job, with its result once it has finished"""
+    if not job_queue:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@app.get("/traces")
+async def get_traces(name: Optional[str] = None, ship_id: Optional[str] = None, limit: int = 20):
+    """Recent agent run traces (fleet sweeps, ship analyses, alerts) with their time split, without spans"""
+    try:
+        if not agent:
+            raise HTTPException(status_code=503, detail="Agent not initialized")
+        
+        query: Dict[str, Any] = {}
+        if name:
+            query["name"] = name
+        if ship_id:
+            query["attributes.ship_id"] = ship_id
+        traces = await agent.async_db.agent_traces.find(query, {"_id": 0, "spans": 0}) \
+            .sort("started_at", -1).limit(min(max(limit, 1), 200)).to_list()
         
         return {
-            "ship_id": ship_id,
-            "alert_result": result,
+            "traces": traces,
+            "count": len(traces),
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get traces: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get traces: {str(e)}")
+
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """One agent run trace with every LLM and tool span"""
+    try:
+        if not agent:
+            raise HTTPException(status_code=503, detail="Agent not initialized")
+        trace = await agent.async_db.agent_traces.find_one({"trace_id": trace_id}, {"_id": 0})
+        if trace is None:
+            raise HTTPException(status_code=404, detail="Trace not found")
+        return trace
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Failed to generate alert for ship {ship_id}: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to generate alert: {str(e)}")
+        logger.error(f"Failed to get trace {trace_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get trace: {str(e)}")
 
 @app.get("/recent-alerts")
-async def get_recent_alerts(hours: int = 6, limit: int = 50):
-    """Get recent alerts"""
+async def get_recent_alerts(hours: int = 6, limit: int = 50, cursor: Optional[str] = None, fields: Optional[str] = None):
+    """Recent alerts, newest first; pass `next_cursor` back as `cursor` for the next page"""
     try:
         if not agent:
             raise HTTPException(status_code=503, detail="Agent not initialized")
+        if hours <= 0:
+            raise HTTPException(status_code=400, detail="hours must be positive")
+        try:
+            projection = parse_fields(fields, ALERT_FIELDS, ALERT_LIST_FIELDS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         # Get alerts from MongoDB
-        alerts_collection = agent.db.ship_alerts
-        start_date = datetime.now(timezone.utc).replace(hour=datetime.now(timezone.utc).hour - hours)
-        
-        alerts = list(alerts_collection.find({
-            "timestamp": {"$gte": start_date}
-        }).sort("timestamp", -1).limit(limit))
+        try:
+            alerts, next_cursor = await keyset_page(
+                agent.async_db.ship_alerts,
+                {"timestamp": {"$gte": window_start(hours)}},
+                ALERT_SORT,
+                min(max(limit, 1), 500),
+                cursor=cursor,
+                projection=projection
+            )
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         return {
-            "alerts": alerts,
+            "alerts": [jsonable(alert) for alert in alerts],
             "count": len(alerts),
             "hours": hours,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
             "timestamp": datetime.now(timezone.utc).isoformat()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to get recent alerts: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get alerts: {str(e)}")
 
+@app.get("/alerts/stream")
+async def stream_alerts(
+    severity: Optional[str] = None,
+    alert_type: Optional[str] = None,
+    ship_id: Optional[str] = None,
+    last_event_id: Optional[str] = Header(default=None)
+):
+    """Server-sent events, one `alert` event per new alert matching the filters (comma-separated values).
+
+    Reconnecting with Last-Event-ID first replays the alerts stored since that event.
+    Only inserts are streamed: a repeat that dedup merges into a stored alert, even one
+    that raises its severity, is an update of that alert and produces no event.
+    """
+    if not alert_stream:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    filters = alert_filter(severity, alert_type, ship_id)
+
+    def event(alert: Dict[str, Any]) -> str:
+        return f"id: {event_id(alert)}\nevent: alert\ndata: {json.dumps(jsonable_encoder(alert_stream.payload(alert)))}\n\n"
+
+    async def events():
+        # Subscribe before replaying so nothing stored in between is lost
+        subscription = alert_stream.subscribe(filters)
+        try:
+            replayed = set()
+            if last_event_id:
+                try:
+                    missed, truncated = await alert_stream.replay(last_event_id, filters, config.ALERT_STREAM_REPLAY_MAX)
+                except InvalidCursor as e:
+                    yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+                    return
+                if truncated:
+                    # Too much was missed to replay; the client should reload from /recent-alerts
+                    yield f"event: reset\ndata: {json.dumps({'detail': 'Too many missed alerts to replay'})}\n\n"
+                else:
+                    for alert in missed:
+                        replayed.add(alert["_id"])
+                        yield event(alert)
+            while True:
+                try:
+                    alert = await asyncio.wait_for(subscription.queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if alert is None:
+                    # Fell too far behind; the client resumes from its last event id
+                    return
+                if alert["_id"] in replayed:
+                    continue
+                yield event(alert)
+        finally:
+            alert_stream.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.get("/alert-stats")
 async def get_alert_stats(hours: int = 24):
-    """Get alert statistics"""
+    """Get alert statistics, served from the hourly alert rollups"""
     try:
         if not agent:
             raise HTTPException(status_code=503, detail="Agent not initialized")
+        if hours <= 0:
+            raise HTTPException(status_code=400, detail="hours must be positive")
         
-        alerts_collection = agent.db.ship_alerts
-        start_date = datetime.now(timezone.utc).replace(hour=datetime.now(timezone.utc).hour - hours)
-        
-        # Get total count
-        total = alerts_collection.count_documents({
-            "timestamp": {"$gte": start_date}
-        })
-        
-        # Get counts by severity
-        severity_pipeline = [
-            {"$match": {"timestamp": {"$gte": start_date}}},
-            {"$group": {"_id": "$severity", "count": {"$sum": 1}}}
-        ]
-        severity_results = list(alerts_collection.aggregate(severity_pipeline))
-        
-        by_severity = {"low": 0, "medium": 0, "high": 0, "critical": 0}
-        for result in severity_results:
-            if result["_id"] in by_severity:
-                by_severity[result["_id"]] = result["count"]
-        
-        # Get counts by type
-        type_pipeline = [
-            {"$match": {"timestamp": {"$gte": start_date}}},
-            {"$group": {"_id": "$alert_type", "count": {"$sum": 1}}}
-        ]
-        type_results = list(alerts_collection.aggregate(type_pipeline))
-        
-        by_type = {
-            "loitering": 0, "port_entry": 0, "port_exit": 0,
-            "suspicious_route": 0, "speed_anomaly": 0, "encounter": 0, "gap_in_tracking": 0
-        }
-        for result in type_results:
-            if result["_id"] in by_type:
-                by_type[result["_id"]] = result["count"]
+        async def load():
+            stats = await alert_stats(agent.async_db, window_start(hours))
+            return {
+                **stats,
+                "hours": hours,
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            }
         
-        return {
-            "total": total,
-            "by_severity": by_severity,
-            "by_type": by_type,
-            "hours": hours,
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
+        return await response_cache.get("alert_stats", hours, load)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to get alert stats: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get alert stats: {str(e)}")
 
 @app.get("/ships")
-async def get_ships(limit: int = 100):
-    """Get ships from database"""
+async def get_ships(
+    request: Request,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    flag: Optional[str] = None,
+    vessel_type: Optional[str] = None,
+    min_risk: Optional[float] = None,
+    max_risk: Optional[float] = None,
+    sort: str = "vessel_id"
+):
+    """Ships matching the filters, one keyset page at a time; supports If-None-Match"""
     try:
         if not agent:
             raise HTTPException(status_code=503, detail="Agent not initialized")
+        if sort not in SHIP_SORTS:
+            raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(SHIP_SORTS)}")
+        if min_risk is not None and max_risk is not None and min_risk > max_risk:
+            raise HTTPException(status_code=400, detail="min_risk must not exceed max_risk")
+        try:
+            requested = list(parse_fields(fields, SHIP_FIELDS, SHIP_LIST_FIELDS))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        ships = agent.mongodb_tool._run("get_ships", limit=limit)
+        query = ship_filter(flag, vessel_type, min_risk, max_risk)
+        if sort == "risk" and min_risk is None and max_risk is None:
+            # Ships without a score have no place in a risk ordering
+            query = {"$and": [query, {"risk_score": {"$type": "number"}}]} if query else {"risk_score": {"$type": "number"}}
+        limit = min(max(limit, 1), 500)
         
-        return {
-            "ships": ships,
-            "limit": limit,
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
+        async def load():
+            ships, next_cursor = await keyset_page(
+                agent.async_db.gfw_ships,
+                query,
+                SHIP_SORTS[sort],
+                limit,
+                cursor=cursor,
+                projection=ship_projection(requested)
+            )
+            return {
+                "ships": [ship_row(ship, requested) for ship in ships],
+                "count": len(ships),
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None,
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            }
+        
+        key = (json.dumps(query, sort_keys=True), sort, limit, cursor, tuple(requested))
+        try:
+            payload = await response_cache.get("ships", key, load)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        return conditional_json(request, payload)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to get ships: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get ships: {str(e)}")
@@ -0,0 +1,139 @@
+import asyncio
+import time
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CacheEntry:
+    value: Any
+    stored_at: float
+
+class SWRCache:
+    """In-process TTL cache with singleflight loading and stale-while-revalidate.
+
+    Entries younger than `ttl_seconds` are served as-is. Entries older than that
+    but within `stale_seconds` more are served immediately while a single
+    background refresh replaces them. Concurrent misses for the same key share
+    one loader call.
+    """
+
+    def __init__(self, ttl_seconds: float, stale_seconds: float = 0, max_entries: int = 256, name: str = "cache"):
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self.name = name
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._refreshes: Set[asyncio.Task] = set()
+        self.stats: Dict[str, int] = {
+            "hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "refreshes": 0, "errors": 0
+        }
+
+    def _age(self, entry: CacheEntry) -> float:
+        return time.monotonic() - entry.stored_at
+
+    def get_fresh(self, key: Hashable) -> Optional[Any]:
+        """Return a fresh cached value without loading, or None"""
+        entry = self._entries.get(key)
+        if entry is None or self._age(entry) >= self.ttl_seconds:
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry.value
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        """Return a fresh cached value without counting a lookup, or None"""
+        entry = self._entries.get(key)
+        if entry is None or self._age(entry) >= self.ttl_seconds:
+            return None
+        return entry.value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = CacheEntry(value=value, stored_at=time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for `key`, loading it through `loader` when needed"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = self._age(entry)
+            if age < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry.value
+            if age < self.ttl_seconds + self.stale_seconds:
+                self.stats["stale_hits"] += 1
+                self._refresh_in_background(key, loader)
+                return entry.value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["misses"] += 1
+            task = self._load(key, loader)
+        # The load is its own task, so a caller that is cancelled (a client
+        # disconnecting) abandons it without failing the other waiters
+        return await asyncio.shield(task)
+
+    def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Start loading `key` in a task of its own, shared by everyone waiting on it"""
+
+        async def load():
+            try:
+                value = await loader()
+            except BaseException:
+                self.stats["errors"] += 1
+                raise
+            self.set(key, value)
+            return value
+
+        task = asyncio.create_task(load())
+        self._inflight[key] = task
+
+        def done(finished: asyncio.Task) -> None:
+            if self._inflight.get(key) is finished:
+                del self._inflight[key]
+            # Retrieve the failure so one nobody awaited is not logged as unhandled
+            if not finished.cancelled():
+                finished.exception()
+
+        task.add_done_callback(done)
+        return task
+
+    def _refresh_in_background(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> None:
+        if key in self._inflight:
+            return
+        self.stats["refreshes"] += 1
+        task = self._load(key, loader)
+        self._refreshes.add(task)
+
+        def finished(task: asyncio.Task) -> None:
+            self._refreshes.discard(task)
+            if not task.cancelled() and task.exception() is not None:
+                logger.warning(f"{self.name}: background refresh failed for {key!r}: {task.exception()}")
+
+        task.add_done_callback(finished)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Entry count and hit/miss counters"""
+        lookups = self.stats["hits"] + self.stats["stale_hits"] + self.stats["misses"] + self.stats["coalesced"]
+        served = lookups - self.stats["misses"]
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            **self.stats,
+            "hit_ratio": round(served / lookups, 3) if lookups else 0.0,
+        }
@@ -5,10 +5,13 @@ CLI interface for OceanWatch AI Ship Monitor Agent
 
 import asyncio
 import argparse
+import cProfile
+import statistics
 import sys
-from typing import Optional
+import time
+from typing import List, Optional
 from ship_monitor_agent import ShipMonitorAgent
-from config import config
+from config import Config, config
 
 class OceanWatchCLI:
     def __init__(self):
@@ -38,6 +41,16 @@ class OceanWatchCLI:
         result = await self.agent.analyze_specific_ship(ship_id)
         print(f"📊 Analysis Result:\n{result}")
     
+    async def analyze_ships(self, ship_ids: List[str], concurrency: Optional[int] = None):
+        """Analyze several ships concurrently, printing results as they complete"""
+        await self.initialize_agent()
+        print(f"🔍 Analyzing {len(ship_ids)} ships (concurrency: {concurrency or config.MAX_CONCURRENT_ANALYSES})")
+        async for result in self.agent.analyze_ships_batch(ship_ids, concurrency):
+            if result["status"] == "completed":
+                print(f"📊 {result['ship_id']} ({result['duration_seconds']}s, {result['tokens']} tokens):\n{result['analysis']}\n")
+            else:
+                print(f"❌ {result['ship_id']}: {result['error']}")
+    
     async def generate_alert(self, ship_id: str, alert_type: str, description: str, reasoning: str):
         """Generate a specific alert"""
         await self.initialize_agent()
@@ -45,6 +58,35 @@ class OceanWatchCLI:
         result = await self.agent.generate_alert_for_ship(ship_id, alert_type, description, reasoning)
         print(f"📋 Alert Result:\n{result}")
     
+    async def bench(self, cycles: int, ship_id: Optional[str] = None, profile_path: Optional[str] = None):
+        """Time repeated monitoring cycles (or analyses of one ship), optionally under cProfile"""
+        await self.initialize_agent()
+        target = f"analysis of {ship_id}" if ship_id else "fleet sweep"
+        print(f"⏱️ Benchmarking {cycles} x {target} (LLM mode: {config.LLM_MODE})")
+        profiler = cProfile.Profile() if profile_path else None
+        durations = []
+        for cycle in range(cycles):
+            if profiler:
+                profiler.enable()
+            started = time.perf_counter()
+            if ship_id:
+                # Every cycle should run the agent, not hit the analysis cache
+                self.agent.analysis_cache.clear()
+                await self.agent.analyze_specific_ship(ship_id)
+            else:
+                await self.agent.run_fleet_sweep()
+            durations.append(time.perf_counter() - started)
+            if profiler:
+                profiler.disable()
+            print(f"  cycle {cycle + 1}: {durations[-1]:.3f}s")
+        print(f"📈 min {min(durations):.3f}s, median {statistics.median(durations):.3f}s, max {max(durations):.3f}s")
+        if self.agent.cassette:
+            print(f"📼 Cassette {self.agent.cassette.path}: {self.agent.cassette.stats}")
+        if profiler:
+            profiler.dump_stats(profile_path)
+            print(f"🧪 Profile written to {profile_path}")
+        await self.agent.close()
+    
     async def test_connection(self):
         """Test database and API connections"""
         await self.initialize_agent()
@@ -107,8 +149,9 @@ def main():
     monitor_parser = subparsers.add_parser("monitor", help="Start continuous monitoring")
     
     # Analyze command
-    analyze_parser = subparsers.add_parser("analyze", help="Analyze a specific ship")
-    analyze_parser.add_argument("ship_id", help="Ship ID to analyze")
+    analyze_parser = subparsers.add_parser("analyze", help="Analyze one or more ships")
+    analyze_parser.add_argument("ship_ids", nargs="+", help="Ship ID(s) to analyze")
+    analyze_parser.add_argument("--concurrency", type=int, default=None, help="Max analyses running at once")
     
     # Alert command
     alert_parser = subparsers.add_parser("alert", help="Generate a specific alert")
@@ -128,6 +171,14 @@ def main():
     alerts_parser = subparsers.add_parser("alerts", help="Get recent alerts")
     alerts_parser.add_argument("--hours", type=int, default=24, help="Hours to look back")
     
+    # Benchmark command
+    bench_parser = subparsers.add_parser("bench", help="Time agent cycles, offline with --llm-mode fake or replay")
+    bench_parser.add_argument("--cycles", type=int, default=3, help="Cycles to run")
+    bench_parser.add_argument("--ship", default=None, help="Time analyses of this ship instead of fleet sweeps")
+    bench_parser.add_argument("--llm-mode", choices=["live", "record", "replay", "fake"], default=None, help="Override LLM_MODE")
+    bench_parser.add_argument("--cassette", default=None, help="Override LLM_CASSETTE_PATH")
+    bench_parser.add_argument("--profile", default=None, help="Write cProfile stats to this file")
+    
     args = parser.parse_args()
     
     if not args.command:
@@ -140,7 +191,10 @@ def main():
         if args.command == "monitor":
             asyncio.run(cli.start_monitoring())
         elif args.command == "analyze":
-            asyncio.run(cli.analyze_ship(args.ship_id))
+            if len(args.ship_ids) == 1:
+                asyncio.run(cli.analyze_ship(args.ship_ids[0]))
+            else:
+                asyncio.run(cli.analyze_ships(args.ship_ids, args.concurrency))
         elif args.command == "alert":
             asyncio.run(cli.generate_alert(args.ship_id, args.alert_type, args.description, args.reasoning))
         elif args.command == "test":
@@ -149,6 +203,13 @@ def main():
             asyncio.run(cli.list_ships(args.limit))
         elif args.command == "alerts":
             asyncio.run(cli.get_recent_alerts(args.hours))
+        elif args.command == "bench":
+            # Set on the class so config.validate() sees the overrides too
+            if args.llm_mode:
+                Config.LLM_MODE = args.llm_mode
+            if args.cassette:
+                Config.LLM_CASSETTE_PATH = args.cassette
+            asyncio.run(cli.bench(args.cycles, args.ship, args.profile))
     except KeyboardInterrupt:
         print("\n👋 Stopping OceanWatch AI Agent...")
     except Exception as e:
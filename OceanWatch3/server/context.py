@@ -0,0 +1,142 @@
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - tiktoken ships with langchain-openai
+    tiktoken = None
+
+_encoders: Dict[str, Callable[[str], int]] = {}
+
+def token_counter(model: str = "gpt-4") -> Callable[[str], int]:
+    """Token counting function for a model; falls back to ~4 characters per token without tiktoken"""
+    if model not in _encoders:
+        encoding = None
+        if tiktoken is not None:
+            try:
+                try:
+                    encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                # tiktoken downloads its vocabularies on first use; offline hosts get the estimate
+                logger.warning(f"Token encoding unavailable for {model}, estimating from length: {e}")
+        if encoding is None:
+            _encoders[model] = lambda text: (len(text) + 3) // 4
+        else:
+            _encoders[model] = lambda text: len(encoding.encode(text, disallowed_special=()))
+    return _encoders[model]
+
+def compact_value(value: Any, max_chars: int) -> str:
+    """Render one table cell: short floats, ISO minutes for datetimes, no separators, truncated"""
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        text = f"{value:.4g}" if abs(value) < 1000 else f"{value:.0f}"
+    elif hasattr(value, "isoformat"):
+        text = value.isoformat(timespec="minutes").replace("+00:00", "Z")
+    elif isinstance(value, (list, tuple)):
+        text = ",".join(compact_value(v, max_chars) for v in value)
+    else:
+        text = str(value)
+    text = text.replace("|", "/").replace("\n", " ")
+    return text if len(text) <= max_chars else text[:max_chars - 1] + "…"
+
+@dataclass
+class ContextSection:
+    title: str
+    columns: List[str]
+    rows: List[Sequence[Any]] = field(default_factory=list)
+    # Lower is more important; sections are filled in priority order
+    priority: int = 0
+    note: Optional[str] = None
+
+@dataclass
+class ContextStats:
+    tokens: int
+    budget: int
+    raw_tokens: int
+    rows_included: int
+    rows_dropped: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.raw_tokens - self.tokens)
+
+    def summary(self) -> str:
+        return (
+            f"{self.tokens}/{self.budget} tokens, {self.tokens_saved} saved vs raw "
+            f"({self.raw_tokens}), {self.rows_included} rows kept, {self.rows_dropped} dropped"
+        )
+
+class ContextBuilder:
+    """Renders prompt context as compact pipe-separated tables under a hard token budget.
+
+    Sections are filled in priority order and rows in the order given, so
+    callers sort rows by risk first. When the budget runs out the remaining
+    rows of a section are replaced by a "+N more" marker and lower-priority
+    sections shrink or disappear. `raw_tokens` measures the same rows rendered
+    as JSON objects, which is what the savings figure is compared against.
+    """
+
+    def __init__(self, budget_tokens: int, model: str = "gpt-4", max_cell_chars: int = 60):
+        self.budget_tokens = budget_tokens
+        self.max_cell_chars = max_cell_chars
+        self.count = token_counter(model)
+        self.sections: List[ContextSection] = []
+
+    def add_table(self, title: str, columns: List[str], rows: List[Sequence[Any]], priority: int = 0,
+                  note: Optional[str] = None) -> None:
+        self.sections.append(ContextSection(title, columns, list(rows), priority, note))
+
+    def _row(self, row: Sequence[Any]) -> str:
+        return "|".join(compact_value(v, self.max_cell_chars) for v in row)
+
+    def _raw_tokens(self) -> int:
+        raw = [
+            json.dumps({"section": s.title, "rows": [dict(zip(s.columns, row)) for row in s.rows]}, default=str)
+            for s in self.sections
+        ]
+        return self.count("\n".join(raw))
+
+    def build(self) -> Tuple[str, ContextStats]:
+        remaining = self.budget_tokens
+        blocks: Dict[int, str] = {}
+        included = dropped = 0
+        for index, section in sorted(enumerate(self.sections), key=lambda item: item[1].priority):
+            header = f"## {section.title} ({len(section.rows)})" + (f" - {section.note}" if section.note else "")
+            lines = [header, "|".join(section.columns)] if section.rows else [header, "none"]
+            cost = self.count("\n".join(lines)) + 1
+            if cost > remaining:
+                dropped += len(section.rows)
+                continue
+            remaining -= cost
+            kept = 0
+            for row in section.rows:
+                line = self._row(row)
+                # Keep room for the "+N more" marker when a row does not fit
+                line_cost = self.count(line) + 1
+                if line_cost > remaining - 8:
+                    break
+                lines.append(line)
+                remaining -= line_cost
+                kept += 1
+            if kept < len(section.rows):
+                lines.append(f"+{len(section.rows) - kept} more")
+                remaining -= self.count(lines[-1]) + 1
+            included += kept
+            dropped += len(section.rows) - kept
+            blocks[index] = "\n".join(lines)
+        text = "\n\n".join(blocks[i] for i in sorted(blocks))
+        stats = ContextStats(
+            tokens=self.count(text),
+            budget=self.budget_tokens,
+            raw_tokens=self._raw_tokens(),
+            rows_included=included,
+            rows_dropped=dropped
+        )
+        return text, stats
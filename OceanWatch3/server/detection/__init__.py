@@ -0,0 +1,40 @@
+from .tracks import TrackPoint, haversine_km, group_tracks, load_tracks, aload_tracks
+from .candidates import SEVERITY_RANK, summarize_candidates
+from .loitering import LoiteringDetector
+from .spatial import SphereGrid
+from .encounters import EncounterDetector
+from .batch import TrackBatch, haversine_km_np
+from .speed import SpeedAnomalyDetector
+from .gaps import GapDetector, reappearances, parse_thresholds, vessel_type_from_doc, VESSEL_TYPE_PROJECTION
+from .geofence import Zone, load_zones, BBoxIndex, GeofenceIndex, GeofenceMonitor
+from .ports import Port, load_ports, PortIndex, PortTracker
+
+__all__ = [
+    'TrackPoint',
+    'haversine_km',
+    'group_tracks',
+    'load_tracks',
+    'aload_tracks',
+    'SEVERITY_RANK',
+    'summarize_candidates',
+    'LoiteringDetector',
+    'SphereGrid',
+    'EncounterDetector',
+    'TrackBatch',
+    'haversine_km_np',
+    'SpeedAnomalyDetector',
+    'GapDetector',
+    'reappearances',
+    'parse_thresholds',
+    'vessel_type_from_doc',
+    'VESSEL_TYPE_PROJECTION',
+    'Zone',
+    'load_zones',
+    'BBoxIndex',
+    'GeofenceIndex',
+    'GeofenceMonitor',
+    'Port',
+    'load_ports',
+    'PortIndex',
+    'PortTracker'
+]
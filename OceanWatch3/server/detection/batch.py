@@ -0,0 +1,58 @@
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+
+from .tracks import EARTH_RADIUS_KM, TrackPoint
+
+def haversine_km_np(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Element-wise great-circle distance in kilometres"""
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = np.radians(lon2 - lon1)
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+@dataclass
+class TrackBatch:
+    """Many vessel tracks flattened into parallel columns, ordered by vessel then time.
+
+    `vessel[i]` indexes into `vessel_ids`; `t` is epoch seconds. Segment-level
+    arrays (length n - 1) pair row i with row i + 1 and are only meaningful
+    where `same_vessel` is True.
+    """
+    vessel_ids: List[str]
+    vessel: np.ndarray
+    t: np.ndarray
+    lat: np.ndarray
+    lon: np.ndarray
+
+    @classmethod
+    def from_tracks(cls, tracks: Dict[str, List[TrackPoint]]) -> "TrackBatch":
+        vessel_ids = [vessel_id for vessel_id, points in tracks.items() if points]
+        if not vessel_ids:
+            empty = np.empty(0)
+            return cls([], np.empty(0, dtype=np.int32), empty, empty, empty)
+        counts = [len(tracks[vessel_id]) for vessel_id in vessel_ids]
+        points = [p for vessel_id in vessel_ids for p in tracks[vessel_id]]
+        vessel = np.repeat(np.arange(len(vessel_ids), dtype=np.int32), counts)
+        t = np.fromiter((p.timestamp.timestamp() for p in points), dtype=np.float64, count=len(points))
+        lat = np.fromiter((p.lat for p in points), dtype=np.float64, count=len(points))
+        lon = np.fromiter((p.lon for p in points), dtype=np.float64, count=len(points))
+        # Stable sort by (vessel, time) in case a track was not time-ordered
+        order = np.lexsort((t, vessel))
+        return cls(vessel_ids, vessel[order], t[order], lat[order], lon[order])
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    @property
+    def same_vessel(self) -> np.ndarray:
+        return self.vessel[1:] == self.vessel[:-1]
+
+    @property
+    def dt_seconds(self) -> np.ndarray:
+        return np.diff(self.t)
+
+    def segment_distance_km(self) -> np.ndarray:
+        return haversine_km_np(self.lat[:-1], self.lon[:-1], self.lat[1:], self.lon[1:])
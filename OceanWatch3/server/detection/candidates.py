@@ -0,0 +1,14 @@
+from typing import List
+
+from models import AlertCandidate, AlertSeverity
+
+SEVERITY_RANK = {AlertSeverity.CRITICAL: 0, AlertSeverity.HIGH: 1, AlertSeverity.MEDIUM: 2, AlertSeverity.LOW: 3}
+
+def summarize_candidates(label: str, candidates: List[AlertCandidate], hours: int, limit: int = 10) -> str:
+    """Render detector candidates for the agent, most severe first"""
+    if not candidates:
+        return f"Detected 0 {label} candidates in the last {hours} hours"
+    ranked = sorted(candidates, key=lambda c: (SEVERITY_RANK[c.severity], c.started_at))
+    lines = "\n".join(f"- {c.summary()}" for c in ranked[:limit])
+    more = f"\n(+{len(candidates) - limit} more)" if len(candidates) > limit else ""
+    return f"Detected {len(candidates)} {label} candidates in the last {hours} hours:\n{lines}{more}"
@@ -0,0 +1,120 @@
+import heapq
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from models import AlertCandidate, AlertSeverity, AlertType, ShipLocation
+from .spatial import SphereGrid
+from .tracks import TrackPoint
+
+@dataclass
+class _PairState:
+    first_seen: datetime
+    last_seen: datetime
+    min_distance_km: float
+    point_a: TrackPoint
+    point_b: TrackPoint
+    slices: int = 1
+    emitted: bool = False
+
+class EncounterDetector:
+    """Finds vessel pairs that stay within `max_distance_km` of each other for `min_duration`.
+
+    Each time slice bins the latest vessel positions into a SphereGrid and only
+    compares vessels in neighbouring cells, so a whole-fleet slice costs roughly
+    O(n) instead of O(n^2). Pair state carries across slices (tolerating
+    `max_gap` without a sighting) and a pair is reported once, when its
+    proximity has lasted long enough.
+    """
+
+    def __init__(self, max_distance_km: float = 0.5, min_duration: timedelta = timedelta(hours=2),
+                 slice_length: timedelta = timedelta(minutes=10), max_gap: Optional[timedelta] = None,
+                 max_position_age: Optional[timedelta] = None):
+        self.max_distance_km = max_distance_km
+        self.min_duration = min_duration
+        self.slice_length = slice_length
+        self.max_gap = max_gap if max_gap is not None else 2 * slice_length
+        self.max_position_age = max_position_age if max_position_age is not None else 3 * slice_length
+        self._pairs: Dict[Tuple[str, str], _PairState] = {}
+
+    def close_pairs(self, positions: Dict[str, TrackPoint]) -> List[Tuple[str, str, float]]:
+        """Vessel pairs within the distance threshold in one snapshot of positions"""
+        grid: SphereGrid[str] = SphereGrid(self.max_distance_km)
+        for vessel_id, point in positions.items():
+            grid.insert(vessel_id, point.lat, point.lon)
+        return [
+            (min(a, b), max(a, b), distance)
+            for a, b, distance in grid.pairs_within(self.max_distance_km)
+            if a != b
+        ]
+
+    def update(self, slice_time: datetime, positions: Dict[str, TrackPoint]) -> List[AlertCandidate]:
+        """Process one time slice of latest positions; returns candidates for newly qualifying encounters"""
+        candidates = []
+        for a, b, distance in self.close_pairs(positions):
+            state = self._pairs.get((a, b))
+            if state is None:
+                self._pairs[(a, b)] = _PairState(slice_time, slice_time, distance, positions[a], positions[b])
+                continue
+            state.last_seen = slice_time
+            state.slices += 1
+            if distance < state.min_distance_km:
+                state.min_distance_km = distance
+                state.point_a, state.point_b = positions[a], positions[b]
+            if not state.emitted and state.last_seen - state.first_seen >= self.min_duration:
+                state.emitted = True
+                candidates.extend(self._describe(a, b, state))
+
+        expired = [pair for pair, state in self._pairs.items() if slice_time - state.last_seen > self.max_gap]
+        for pair in expired:
+            del self._pairs[pair]
+        return candidates
+
+    def detect(self, tracks: Dict[str, List[TrackPoint]]) -> List[AlertCandidate]:
+        """Replay time-ordered tracks slice by slice from a clean state"""
+        self._pairs.clear()
+        merged = heapq.merge(
+            *[[(p.timestamp, vessel_id, p) for p in points] for vessel_id, points in tracks.items()],
+            key=lambda item: item[0]
+        )
+        candidates: List[AlertCandidate] = []
+        latest: Dict[str, TrackPoint] = {}
+        slice_end: Optional[datetime] = None
+        for timestamp, vessel_id, point in merged:
+            if slice_end is None:
+                slice_end = timestamp + self.slice_length
+            while timestamp >= slice_end:
+                candidates.extend(self.update(slice_end, self._snapshot(latest, slice_end)))
+                slice_end += self.slice_length
+            latest[vessel_id] = point
+        if slice_end is not None:
+            candidates.extend(self.update(slice_end, self._snapshot(latest, slice_end)))
+        return candidates
+
+    def _snapshot(self, latest: Dict[str, TrackPoint], slice_end: datetime) -> Dict[str, TrackPoint]:
+        oldest = slice_end - self.max_position_age
+        stale = [vessel_id for vessel_id, point in latest.items() if point.timestamp < oldest]
+        for vessel_id in stale:
+            del latest[vessel_id]
+        return dict(latest)
+
+    def _describe(self, a: str, b: str, state: _PairState) -> List[AlertCandidate]:
+        hours = (state.last_seen - state.first_seen).total_seconds() / 3600
+        severity = AlertSeverity.HIGH if hours * 3600 >= 3 * self.min_duration.total_seconds() else AlertSeverity.MEDIUM
+        candidates = []
+        for ship_id, other, point in ((a, b, state.point_a), (b, a, state.point_b)):
+            candidates.append(AlertCandidate(
+                ship_id=ship_id,
+                alert_type=AlertType.ENCOUNTER,
+                severity=severity,
+                location=ShipLocation(latitude=point.lat, longitude=point.lon, timestamp=point.timestamp),
+                started_at=state.first_seen,
+                ended_at=state.last_seen,
+                description=f"Within {state.min_distance_km:.2f} km of {other} for {hours:.1f}h",
+                evidence=[
+                    f"Close approach observed in {state.slices} time slices",
+                    f"Closest distance {state.min_distance_km:.3f} km at {point.timestamp.isoformat()}"
+                ],
+                details={"other_vessel_id": other, "min_distance_km": round(state.min_distance_km, 3), "duration_hours": round(hours, 2)}
+            ))
+        return candidates
@@ -0,0 +1,129 @@
+import bisect
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from models import AlertCandidate, AlertSeverity, AlertType, ShipLocation
+from .batch import TrackBatch, haversine_km_np
+from .tracks import KM_PER_NAUTICAL_MILE, TrackPoint
+
+def parse_thresholds(spec: str) -> Dict[str, timedelta]:
+    """Parse "fishing:180,cargo:720" (minutes per vessel type) into thresholds"""
+    thresholds = {}
+    for item in spec.split(","):
+        vessel_type, _, minutes = item.partition(":")
+        if vessel_type.strip() and minutes.strip():
+            thresholds[vessel_type.strip().lower()] = timedelta(minutes=float(minutes))
+    return thresholds
+
+VESSEL_TYPE_PROJECTION = {"_id": 0, "vessel_id": 1, "vessel_type": 1, "type": 1, "details.combined_sources_info.shiptypes": 1}
+
+def vessel_type_from_doc(doc: Dict[str, Any]) -> Optional[str]:
+    """Vessel type of a gfw_ships document (`vessel_type`, `type` or the GFW combined shiptype)"""
+    vessel_type = doc.get("vessel_type") or doc.get("type")
+    if not vessel_type:
+        for info in ((doc.get("details") or {}).get("combined_sources_info") or []):
+            shiptypes = info.get("shiptypes") or []
+            if shiptypes:
+                vessel_type = shiptypes[-1].get("name")
+                break
+    return str(vessel_type).lower() if vessel_type else None
+
+def _utc(epoch_seconds: float) -> datetime:
+    return datetime.fromtimestamp(float(epoch_seconds), tz=timezone.utc)
+
+def reappearances(tracks: Dict[str, List[TrackPoint]], open_gaps: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Stored open gaps (`_id`, `vessel_id`, `gap_start`) that the tracks show have ended.
+
+    A gap ends at the vessel's first position after its start, however long
+    ago it started, so gaps whose last position before the silence has slid
+    out of the scan window are still closed.
+    """
+    closed = []
+    for gap in open_gaps:
+        points = tracks.get(gap.get("vessel_id")) or []
+        start = gap["gap_start"] if gap["gap_start"].tzinfo else gap["gap_start"].replace(tzinfo=timezone.utc)
+        i = bisect.bisect_right([p.timestamp for p in points], start)
+        if i < len(points):
+            point = points[i]
+            closed.append({
+                "_id": gap["_id"],
+                "gap_end": point.timestamp,
+                "gap_hours": round((point.timestamp - start).total_seconds() / 3600, 2),
+                "lat": point.lat,
+                "lon": point.lon
+            })
+    return closed
+
+class GapDetector:
+    """Finds AIS transmission gaps across every vessel's track in one vectorized pass.
+
+    Each vessel gets a silence threshold from its type (falling back to
+    `default_threshold`); a gap is a pair of consecutive positions further apart
+    than that. When `now` is given, vessels whose last position is older than
+    their threshold are reported as ongoing gaps. Candidates are keyed by vessel
+    and gap start, so repeated scans over a sliding window describe the same gap.
+    """
+
+    def __init__(self, default_threshold: timedelta = timedelta(hours=6),
+                 thresholds: Optional[Dict[str, timedelta]] = None):
+        self.default_threshold = default_threshold
+        self.thresholds = {k.lower(): v for k, v in (thresholds or {}).items()}
+
+    def threshold_for(self, vessel_type: Optional[str]) -> timedelta:
+        return self.thresholds.get((vessel_type or "").lower(), self.default_threshold)
+
+    def detect(self, batch: TrackBatch, vessel_types: Optional[Dict[str, str]] = None,
+               now: Optional[datetime] = None) -> List[AlertCandidate]:
+        if len(batch) == 0:
+            return []
+        vessel_types = vessel_types or {}
+        types = [vessel_types.get(vessel_id) for vessel_id in batch.vessel_ids]
+        limits = np.array([self.threshold_for(t).total_seconds() for t in types])
+
+        closed = np.flatnonzero(batch.same_vessel & (batch.dt_seconds > limits[batch.vessel[:-1]]))
+        candidates = [self._describe(batch, i, i + 1, types, limits) for i in closed.tolist()]
+
+        if now is not None:
+            last_rows = np.flatnonzero(np.append(~batch.same_vessel, True))
+            silent = now.timestamp() - batch.t[last_rows]
+            for i in last_rows[silent > limits[batch.vessel[last_rows]]].tolist():
+                candidates.append(self._describe(batch, i, None, types, limits, now))
+        return candidates
+
+    def _describe(self, batch: TrackBatch, start: int, end: Optional[int], types: List[Optional[str]],
+                  limits: np.ndarray, now: Optional[datetime] = None) -> AlertCandidate:
+        vessel = int(batch.vessel[start])
+        vessel_type = types[vessel]
+        threshold_hours = float(limits[vessel]) / 3600
+        started_at = _utc(batch.t[start])
+        ended_at = _utc(batch.t[end]) if end is not None else now
+        hours = (ended_at - started_at).total_seconds() / 3600
+        severity = AlertSeverity.HIGH if hours >= 3 * threshold_hours else AlertSeverity.MEDIUM
+        details: Dict[str, Any] = {
+            "gap_hours": round(hours, 2),
+            "threshold_hours": round(threshold_hours, 2),
+            "vessel_type": vessel_type,
+            "ongoing": end is None
+        }
+        evidence = [f"Last position {batch.lat[start]:.4f},{batch.lon[start]:.4f} at {started_at.isoformat()}"]
+        if end is None:
+            description = f"No AIS positions for {hours:.1f}h (threshold {threshold_hours:g}h for {vessel_type or 'unknown type'})"
+        else:
+            displacement = float(haversine_km_np(batch.lat[start], batch.lon[start], batch.lat[end], batch.lon[end]))
+            details["displacement_km"] = round(displacement, 2)
+            details["implied_speed_knots"] = round(displacement / max(hours, 1e-9) / KM_PER_NAUTICAL_MILE, 1)
+            description = f"AIS gap of {hours:.1f}h (threshold {threshold_hours:g}h for {vessel_type or 'unknown type'})"
+            evidence.append(f"Reappeared {displacement:.1f} km away at {batch.lat[end]:.4f},{batch.lon[end]:.4f} at {ended_at.isoformat()}")
+        return AlertCandidate(
+            ship_id=batch.vessel_ids[vessel],
+            alert_type=AlertType.GAP_IN_TRACKING,
+            severity=severity,
+            location=ShipLocation(latitude=batch.lat[start], longitude=batch.lon[start], timestamp=started_at),
+            started_at=started_at,
+            ended_at=ended_at,
+            description=description,
+            evidence=evidence,
+            details=details
+        )
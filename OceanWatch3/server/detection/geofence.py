@@ -0,0 +1,305 @@
+import json
+import math
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from models import AlertCandidate, AlertSeverity, AlertType, ShipLocation
+from .batch import TrackBatch
+
+# Entry severity by zone kind unless a feature sets its own "severity" property
+KIND_SEVERITY = {"mpa": AlertSeverity.HIGH, "restricted": AlertSeverity.HIGH, "eez": AlertSeverity.LOW}
+
+# Upper bound on points x edges evaluated at once by the point-in-polygon kernel
+_PIP_CELLS = 4_000_000
+
+@dataclass
+class Zone:
+    zone_id: str
+    name: str
+    kind: str
+    severity: AlertSeverity
+    # Each part is an exterior ring followed by its holes, as (k, 2) lon/lat arrays
+    parts: List[List[np.ndarray]] = field(default_factory=list)
+
+def _polygons(geometry: Dict[str, Any]) -> Iterator[List[List[List[float]]]]:
+    if not geometry:
+        return
+    if geometry.get("type") == "Polygon":
+        yield geometry["coordinates"]
+    elif geometry.get("type") == "MultiPolygon":
+        yield from geometry["coordinates"]
+    elif geometry.get("type") == "GeometryCollection":
+        for member in geometry.get("geometries", []):
+            yield from _polygons(member)
+
+def _unwrap(ring: np.ndarray) -> np.ndarray:
+    """Ring with longitudes made continuous, so an edge crossing ±180 runs past it (170 -> 190)"""
+    step = np.diff(ring[:, 0])
+    step -= 360.0 * np.round(step / 360.0)
+    unwrapped = ring.copy()
+    unwrapped[:, 0] = ring[0, 0] + np.concatenate([[0.0], np.cumsum(step)])
+    return unwrapped
+
+def _split_antimeridian(part: List[np.ndarray]) -> List[List[np.ndarray]]:
+    """A polygon part as one or two parts that the planar ray cast handles.
+
+    A part crossing the antimeridian is unwrapped and also shifted a full turn
+    the other way, so positions on either side of ±180 fall in one copy.
+    Rings that wind around a pole do not close once unwrapped and are left as
+    they are.
+    """
+    exterior = _unwrap(part[0])
+    if abs(exterior[-1, 0] - exterior[0, 0]) > 180 or (exterior[:, 0].min() >= -180 and exterior[:, 0].max() <= 180):
+        return [part]
+    centre = (exterior[:, 0].min() + exterior[:, 0].max()) / 2
+    rings = [exterior]
+    for hole in part[1:]:
+        hole = _unwrap(hole)
+        hole[:, 0] += 360.0 * np.round((centre - hole[:, 0].mean()) / 360.0)
+        rings.append(hole)
+    shift = -360.0 if exterior[:, 0].max() > 180 else 360.0
+    return [rings, [ring + np.array([shift, 0.0]) for ring in rings]]
+
+def zones_from_geojson(data: Dict[str, Any], default_kind: str = "custom", prefix: str = "zone") -> List[Zone]:
+    """Polygon and MultiPolygon features of a GeoJSON FeatureCollection (or single Feature) as zones"""
+    features = data.get("features") if data.get("type") == "FeatureCollection" else [data]
+    zones = []
+    for i, feature in enumerate(features or []):
+        properties = feature.get("properties") or {}
+        parts = [
+            [np.asarray(ring, dtype=np.float64)[:, :2] for ring in polygon if len(ring) >= 3]
+            for polygon in _polygons(feature.get("geometry") or {})
+        ]
+        parts = [split for part in parts if part for split in _split_antimeridian(part)]
+        if not parts:
+            continue
+        kind = str(properties.get("kind") or properties.get("zone_type") or default_kind).lower()
+        severity = properties.get("severity")
+        zones.append(Zone(
+            zone_id=str(properties.get("id") or feature.get("id") or f"{prefix}:{i}"),
+            name=str(properties.get("name") or properties.get("NAME") or f"{prefix} {i}"),
+            kind=kind,
+            severity=AlertSeverity(severity) if severity else KIND_SEVERITY.get(kind, AlertSeverity.MEDIUM),
+            parts=parts
+        ))
+    return zones
+
+def load_zones(directory: str) -> List[Zone]:
+    """Load every *.geojson / *.json file in a directory; the file name is the default zone kind (mpa.geojson -> mpa)"""
+    zones: List[Zone] = []
+    if not os.path.isdir(directory):
+        return zones
+    for filename in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(filename)
+        if ext.lower() not in (".geojson", ".json"):
+            continue
+        with open(os.path.join(directory, filename)) as f:
+            zones.extend(zones_from_geojson(json.load(f), default_kind=stem.lower(), prefix=stem))
+    return zones
+
+def points_in_ring(x: np.ndarray, y: np.ndarray, ring: np.ndarray) -> np.ndarray:
+    """Even-odd ray casting of many points against one ring, vectorized over points and edges"""
+    x0, y0 = ring[:, 0], ring[:, 1]
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+    inside = np.zeros(len(x), dtype=bool)
+    step = max(1, _PIP_CELLS // len(ring))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for start in range(0, len(x), step):
+            px = x[start:start + step, None]
+            py = y[start:start + step, None]
+            straddles = (y0 > py) != (y1 > py)
+            crossing_x = (x1 - x0) * (py - y0) / (y1 - y0) + x0
+            inside[start:start + step] = np.count_nonzero(straddles & (px < crossing_x), axis=1) % 2 == 1
+    return inside
+
+class BBoxIndex:
+    """Static R-tree over bounding boxes, bulk-loaded with Sort-Tile-Recursive packing.
+
+    Levels are stored as (m, 4) [minx, miny, maxx, maxy] arrays; node i of a
+    level covers children [i * node_size, (i + 1) * node_size) of the level
+    below. `query` walks all points down the tree together, so each level is a
+    handful of array operations regardless of how many points are tested.
+    """
+
+    def __init__(self, boxes: np.ndarray, node_size: int = 16):
+        self.node_size = node_size
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        self.order = self._str_order(boxes)
+        self.levels = [boxes[self.order]]
+        while len(self.levels[-1]) > 1:
+            below = self.levels[-1]
+            groups = np.arange(0, len(below), node_size)
+            self.levels.append(np.column_stack([
+                np.minimum.reduceat(below[:, 0], groups), np.minimum.reduceat(below[:, 1], groups),
+                np.maximum.reduceat(below[:, 2], groups), np.maximum.reduceat(below[:, 3], groups)
+            ]))
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def _str_order(self, boxes: np.ndarray) -> np.ndarray:
+        if len(boxes) == 0:
+            return np.empty(0, dtype=np.int64)
+        cx = (boxes[:, 0] + boxes[:, 2]) / 2
+        cy = (boxes[:, 1] + boxes[:, 3]) / 2
+        slices = max(1, math.ceil(math.sqrt(math.ceil(len(boxes) / self.node_size))))
+        by_x = np.argsort(cx, kind="stable")
+        per_slice = math.ceil(len(boxes) / slices)
+        return np.concatenate([
+            chunk[np.argsort(cy[chunk], kind="stable")]
+            for chunk in (by_x[i:i + per_slice] for i in range(0, len(boxes), per_slice))
+        ])
+
+    @staticmethod
+    def _contains(boxes: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        return (boxes[:, 0] <= x) & (x <= boxes[:, 2]) & (boxes[:, 1] <= y) & (y <= boxes[:, 3])
+
+    def query(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(point index, item index) pairs for every point inside an item's box"""
+        if len(self.order) == 0 or len(x) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        root = self.levels[-1]
+        point = np.flatnonzero(self._contains(root, x, y))
+        node = np.zeros(len(point), dtype=np.int64)
+        for level in reversed(self.levels[:-1]):
+            first = node * self.node_size
+            count = np.minimum(first + self.node_size, len(level)) - first
+            point = np.repeat(point, count)
+            # Child index = first child of the parent + position within the parent's run
+            offsets = np.arange(len(point)) - np.repeat(np.cumsum(count) - count, count)
+            node = np.repeat(first, count) + offsets
+            hit = self._contains(level[node], x[point], y[point])
+            point, node = point[hit], node[hit]
+        return point, self.order[node]
+
+class GeofenceIndex:
+    """Zones indexed by polygon-part bounding boxes; locates many positions at once"""
+
+    def __init__(self, zones: List[Zone], node_size: int = 16):
+        self.zones = zones
+        self._parts: List[Tuple[int, List[np.ndarray]]] = [
+            (zone_index, part) for zone_index, zone in enumerate(zones) for part in zone.parts
+        ]
+        boxes = np.array([
+            [part[0][:, 0].min(), part[0][:, 1].min(), part[0][:, 0].max(), part[0][:, 1].max()]
+            for _, part in self._parts
+        ]).reshape(-1, 4)
+        self.tree = BBoxIndex(boxes, node_size)
+
+    def __len__(self) -> int:
+        return len(self.zones)
+
+    def locate(self, lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(point index, zone index) pairs for every position inside a zone, sorted by point"""
+        x, y = np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64)
+        point, item = self.tree.query(x, y)
+        hits_point, hits_zone = [], []
+        order = np.argsort(item, kind="stable")
+        point, item = point[order], item[order]
+        bounds = np.flatnonzero(np.diff(item)) + 1
+        for points, items in zip(np.split(point, bounds), np.split(item, bounds)):
+            if len(points) == 0:
+                continue
+            zone_index, rings = self._parts[int(items[0])]
+            inside = points_in_ring(x[points], y[points], rings[0])
+            for hole in rings[1:]:
+                candidates = np.flatnonzero(inside)
+                inside[candidates[points_in_ring(x[points[candidates]], y[points[candidates]], hole)]] = False
+            hits_point.append(points[inside])
+            hits_zone.append(np.full(np.count_nonzero(inside), zone_index, dtype=np.int64))
+        if not hits_point:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        point, zone = np.concatenate(hits_point), np.concatenate(hits_zone)
+        # A point covered by two parts of the same zone counts once
+        pairs = np.unique(np.column_stack([point, zone]), axis=0)
+        return pairs[:, 0], pairs[:, 1]
+
+    def zones_at(self, lat: float, lon: float) -> List[Zone]:
+        _, zone = self.locate(np.array([lat]), np.array([lon]))
+        return [self.zones[i] for i in zone.tolist()]
+
+class GeofenceMonitor:
+    """Tracks which zones each vessel is in and reports ZONE_ENTRY / ZONE_EXIT transitions.
+
+    Positions are located in bulk through the GeofenceIndex; only the
+    per-vessel membership comparison walks rows in Python. As with
+    PortTracker, a vessel first seen inside a zone has no entry to report: its
+    zones are recorded silently and only its exit is reported, so a cold
+    monitor does not raise an entry for every vessel already in an MPA or
+    EEZ. State persists across `observe` calls, and positions no newer than
+    the last one seen for a vessel are skipped, so overlapping windows can be
+    fed cycle after cycle.
+    """
+
+    def __init__(self, index: GeofenceIndex):
+        self.index = index
+        self._inside: Dict[str, Set[int]] = {}
+        # Zones a vessel was already in when first seen, until it leaves them
+        self._unseen_entries: Dict[str, Set[int]] = {}
+        self._last_seen: Dict[str, float] = {}
+
+    def reset(self, vessel_id: Optional[str] = None) -> None:
+        if vessel_id is None:
+            self._inside.clear()
+            self._unseen_entries.clear()
+            self._last_seen.clear()
+        else:
+            self._inside.pop(vessel_id, None)
+            self._unseen_entries.pop(vessel_id, None)
+            self._last_seen.pop(vessel_id, None)
+
+    def observe(self, batch: TrackBatch) -> List[AlertCandidate]:
+        """Feed time-ordered positions; returns entry/exit candidates in track order"""
+        if len(batch) == 0 or len(self.index) == 0:
+            return []
+        last_seen = np.array([self._last_seen.get(vessel_id, -np.inf) for vessel_id in batch.vessel_ids])
+        rows = np.flatnonzero(batch.t > last_seen[batch.vessel])
+        point, zone = self.index.locate(batch.lat[rows], batch.lon[rows])
+        membership: Dict[int, Set[int]] = {}
+        for p, z in zip(rows[point].tolist(), zone.tolist()):
+            membership.setdefault(p, set()).add(z)
+
+        candidates = []
+        for row in rows.tolist():
+            vessel_id = batch.vessel_ids[int(batch.vessel[row])]
+            current = membership.get(row, set())
+            before = self._inside.get(vessel_id)
+            self._inside[vessel_id] = current
+            self._last_seen[vessel_id] = float(batch.t[row])
+            if before is None:
+                self._unseen_entries[vessel_id] = set(current)
+                continue
+            unseen = self._unseen_entries.get(vessel_id, set())
+            for z in sorted(current - before):
+                candidates.append(self._describe(batch, row, vessel_id, self.index.zones[z], True, False))
+            for z in sorted(before - current):
+                candidates.append(self._describe(batch, row, vessel_id, self.index.zones[z], False, z in unseen))
+            unseen &= current
+        return candidates
+
+    def scan(self, batch: TrackBatch) -> List[AlertCandidate]:
+        """Replay whole tracks from a clean state"""
+        self.reset()
+        return self.observe(batch)
+
+    def _describe(self, batch: TrackBatch, row: int, vessel_id: str, zone: Zone, entered: bool, first: bool) -> AlertCandidate:
+        when = datetime.fromtimestamp(float(batch.t[row]), tz=timezone.utc)
+        if entered:
+            description = f"Entered {zone.kind} zone {zone.name}"
+        else:
+            description = f"Left {zone.kind} zone {zone.name}{' (inside since first observed)' if first else ''}"
+        return AlertCandidate(
+            ship_id=vessel_id,
+            alert_type=AlertType.ZONE_ENTRY if entered else AlertType.ZONE_EXIT,
+            severity=zone.severity if entered else AlertSeverity.LOW,
+            location=ShipLocation(latitude=batch.lat[row], longitude=batch.lon[row], timestamp=when),
+            started_at=when,
+            ended_at=when,
+            description=description,
+            evidence=[f"Position {batch.lat[row]:.4f},{batch.lon[row]:.4f} at {when.isoformat()}"],
+            details={"zone_id": zone.zone_id, "zone_name": zone.name, "zone_kind": zone.kind, "first_observation": first}
+        )
@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from models import AlertCandidate, AlertSeverity, AlertType, ShipLocation
+from .tracks import TrackPoint, haversine_km
+
+@dataclass
+class _Cluster:
+    lat: float
+    lon: float
+    started_at: TrackPoint
+    last: TrackPoint
+    count: int = 1
+    candidate: Optional[AlertCandidate] = None
+
+    def absorb(self, point: TrackPoint) -> None:
+        # Running centroid; unwrap longitude so clusters straddling the antimeridian stay put
+        lon = point.lon
+        if lon - self.lon > 180:
+            lon -= 360
+        elif self.lon - lon > 180:
+            lon += 360
+        self.count += 1
+        self.lat += (point.lat - self.lat) / self.count
+        self.lon += (lon - self.lon) / self.count
+        self.lon = (self.lon + 180) % 360 - 180
+        self.last = point
+
+    @property
+    def dwell(self) -> timedelta:
+        return self.last.timestamp - self.started_at.timestamp
+
+class LoiteringDetector:
+    """Streaming spatio-temporal clustering of position tracks.
+
+    Each vessel keeps one open cluster: a point within `radius_km` of the cluster
+    centroid (and no more than `max_gap` after the previous point) extends it,
+    anything else starts a new one. A cluster that has dwelt for `min_dwell` over
+    at least `min_points` positions yields a LOITERING candidate as soon as it
+    crosses the threshold; later points keep that candidate's extent up to date.
+    Every position is handled in constant time, so a track is O(n).
+    """
+
+    def __init__(self, radius_km: float = 2.0, min_dwell: timedelta = timedelta(hours=2),
+                 min_points: int = 3, max_gap: timedelta = timedelta(hours=3)):
+        self.radius_km = radius_km
+        self.min_dwell = min_dwell
+        self.min_points = min_points
+        self.max_gap = max_gap
+        self._clusters: Dict[str, _Cluster] = {}
+
+    def update(self, vessel_id: str, point: TrackPoint) -> Optional[AlertCandidate]:
+        """Feed the next position of a vessel; returns a candidate when loitering starts"""
+        cluster = self._clusters.get(vessel_id)
+        if cluster is not None and point.timestamp < cluster.last.timestamp:
+            return None
+        if (
+            cluster is None
+            or point.timestamp - cluster.last.timestamp > self.max_gap
+            or haversine_km(cluster.lat, cluster.lon, point.lat, point.lon) > self.radius_km
+        ):
+            self._clusters[vessel_id] = _Cluster(lat=point.lat, lon=point.lon, started_at=point, last=point)
+            return None
+
+        cluster.absorb(point)
+        if cluster.candidate is not None:
+            self._describe(vessel_id, cluster, cluster.candidate)
+            return None
+        if cluster.dwell >= self.min_dwell and cluster.count >= self.min_points:
+            cluster.candidate = self._describe(vessel_id, cluster)
+            return cluster.candidate
+        return None
+
+    def scan(self, vessel_id: str, points: List[TrackPoint]) -> List[AlertCandidate]:
+        """Run a whole time-ordered track through the detector from a clean state"""
+        self.reset(vessel_id)
+        candidates = []
+        for point in points:
+            candidate = self.update(vessel_id, point)
+            if candidate is not None:
+                candidates.append(candidate)
+        return candidates
+
+    def reset(self, vessel_id: Optional[str] = None) -> None:
+        if vessel_id is None:
+            self._clusters.clear()
+        else:
+            self._clusters.pop(vessel_id, None)
+
+    def _describe(self, vessel_id: str, cluster: _Cluster, candidate: Optional[AlertCandidate] = None) -> AlertCandidate:
+        hours = cluster.dwell.total_seconds() / 3600
+        severity = AlertSeverity.HIGH if cluster.dwell >= 3 * self.min_dwell else AlertSeverity.MEDIUM
+        fields = dict(
+            ship_id=vessel_id,
+            alert_type=AlertType.LOITERING,
+            severity=severity,
+            location=ShipLocation(latitude=cluster.lat, longitude=cluster.lon, timestamp=cluster.last.timestamp),
+            started_at=cluster.started_at.timestamp,
+            ended_at=cluster.last.timestamp,
+            description=f"Loitering for {hours:.1f}h within {self.radius_km:g} km",
+            evidence=[
+                f"{cluster.count} positions between {cluster.started_at.timestamp.isoformat()} and {cluster.last.timestamp.isoformat()}",
+                f"Cluster centre {cluster.lat:.4f},{cluster.lon:.4f}"
+            ],
+            details={"dwell_hours": round(hours, 2), "positions": cluster.count, "radius_km": self.radius_km}
+        )
+        if candidate is None:
+            return AlertCandidate(**fields)
+        for name, value in fields.items():
+            setattr(candidate, name, value)
+        return candidate
@@ -0,0 +1,161 @@
+import csv
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from models import AlertCandidate, AlertSeverity, AlertType, ShipLocation
+from .spatial import SphereGrid
+from .tracks import TrackPoint, haversine_km
+
+class Port(NamedTuple):
+    port_id: str
+    name: str
+    country: Optional[str]
+    lat: float
+    lon: float
+    radius_km: float
+    severity: AlertSeverity = AlertSeverity.LOW
+
+def load_ports(path: str, default_radius_km: float = 5.0) -> List[Port]:
+    """Read a port gazetteer CSV (port_id, name, country, lat, lon, radius_km[, severity])"""
+    ports = []
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            lat = row.get("lat") or row.get("latitude")
+            lon = row.get("lon") or row.get("longitude")
+            if not lat or not lon:
+                continue
+            ports.append(Port(
+                port_id=(row.get("port_id") or row.get("id") or row.get("name") or "").strip(),
+                name=(row.get("name") or "").strip(),
+                country=(row.get("country") or "").strip() or None,
+                lat=float(lat),
+                lon=float(lon),
+                radius_km=float(row.get("radius_km") or default_radius_km),
+                severity=AlertSeverity(row["severity"].strip()) if (row.get("severity") or "").strip() else AlertSeverity.LOW
+            ))
+    return ports
+
+class PortIndex:
+    """Nearest-port lookups over a gazetteer, backed by a SphereGrid.
+
+    The grid cell is the search radius (at least the largest port radius), so
+    a lookup only inspects the 27 cells around the position.
+    """
+
+    def __init__(self, ports: List[Port], search_km: float = 50.0):
+        self.ports = ports
+        self.search_km = max([search_km] + [port.radius_km for port in ports])
+        self._grid: SphereGrid[Port] = SphereGrid(self.search_km)
+        for port in ports:
+            self._grid.insert(port, port.lat, port.lon)
+
+    def __len__(self) -> int:
+        return len(self.ports)
+
+    def nearest(self, lat: float, lon: float, max_km: Optional[float] = None) -> Optional[Tuple[Port, float]]:
+        """Closest port within `max_km` (default and upper bound: the search radius) with its distance"""
+        found = self._grid.within(lat, lon, min(max_km or self.search_km, self.search_km))
+        return found[0] if found else None
+
+    def containing(self, lat: float, lon: float) -> Optional[Tuple[Port, float]]:
+        """Closest port whose radius covers the position"""
+        for port, distance in self._grid.within(lat, lon, self.search_km):
+            if distance <= port.radius_km:
+                return port, distance
+        return None
+
+@dataclass
+class _PortStay:
+    port: Port
+    entered_at: datetime
+    last: TrackPoint
+    # False when the vessel was already in port when first observed
+    entry_seen: bool = True
+
+class PortTracker:
+    """Per-vessel port state machine emitting PORT_ENTRY / PORT_EXIT transitions.
+
+    Each update costs one distance check against the current port and, when
+    the vessel is outside it, one PortIndex lookup, so it is O(1) per position.
+    A vessel only leaves a port once it is beyond `exit_factor` times the port
+    radius, which stops anchorage traffic near the boundary from flapping. A
+    vessel first seen inside a port has no entry to report; its stay is
+    tracked silently and reported when it leaves. State persists across
+    calls and positions no newer than a vessel's last one are skipped, so
+    overlapping windows can be fed cycle after cycle.
+    """
+
+    def __init__(self, index: PortIndex, exit_factor: float = 1.2):
+        self.index = index
+        self.exit_factor = exit_factor
+        self._stays: Dict[str, Optional[_PortStay]] = {}
+        self._last_seen: Dict[str, datetime] = {}
+
+    def update(self, vessel_id: str, point: TrackPoint) -> List[AlertCandidate]:
+        """Feed the next position of a vessel; returns any exit and entry it caused"""
+        last_seen = self._last_seen.get(vessel_id)
+        if last_seen is not None and point.timestamp <= last_seen:
+            return []
+        self._last_seen[vessel_id] = point.timestamp
+        first = last_seen is None
+        stay = self._stays.get(vessel_id)
+        if stay is not None:
+            if haversine_km(stay.port.lat, stay.port.lon, point.lat, point.lon) <= stay.port.radius_km * self.exit_factor:
+                stay.last = point
+                return []
+
+        candidates = []
+        if stay is not None:
+            candidates.append(self._describe(vessel_id, stay, point, entered=False))
+        hit = self.index.containing(point.lat, point.lon)
+        if hit is None:
+            self._stays[vessel_id] = None
+            return candidates
+        stay = _PortStay(port=hit[0], entered_at=point.timestamp, last=point, entry_seen=not first)
+        self._stays[vessel_id] = stay
+        if not first:
+            candidates.append(self._describe(vessel_id, stay, point, entered=True))
+        return candidates
+
+    def scan(self, vessel_id: str, points: List[TrackPoint]) -> List[AlertCandidate]:
+        """Feed a time-ordered track; positions already seen are skipped"""
+        candidates = []
+        for point in points:
+            candidates.extend(self.update(vessel_id, point))
+        return candidates
+
+    def reset(self, vessel_id: Optional[str] = None) -> None:
+        if vessel_id is None:
+            self._stays.clear()
+            self._last_seen.clear()
+        else:
+            self._stays.pop(vessel_id, None)
+            self._last_seen.pop(vessel_id, None)
+
+    def current_port(self, vessel_id: str) -> Optional[Port]:
+        stay = self._stays.get(vessel_id)
+        return stay.port if stay else None
+
+    def _describe(self, vessel_id: str, stay: _PortStay, point: TrackPoint, entered: bool) -> AlertCandidate:
+        port = stay.port
+        details = {"port_id": port.port_id, "port_name": port.name, "country": port.country, "first_observation": not stay.entry_seen}
+        if entered:
+            description = f"Entered port {port.name}"
+            started_at = ended_at = point.timestamp
+        else:
+            hours = (stay.last.timestamp - stay.entered_at).total_seconds() / 3600
+            details["stay_hours"] = round(hours, 2)
+            description = f"Left port {port.name} after {'at least ' if not stay.entry_seen else ''}{hours:.1f}h"
+            started_at, ended_at = stay.entered_at, point.timestamp
+        return AlertCandidate(
+            ship_id=vessel_id,
+            alert_type=AlertType.PORT_ENTRY if entered else AlertType.PORT_EXIT,
+            severity=port.severity,
+            location=ShipLocation(latitude=point.lat, longitude=point.lon, timestamp=point.timestamp),
+            started_at=started_at,
+            ended_at=ended_at,
+            description=description,
+            evidence=[f"Position {point.lat:.4f},{point.lon:.4f} at {point.timestamp.isoformat()}, port {port.port_id} ({port.lat:.4f},{port.lon:.4f}, radius {port.radius_km:g} km)"],
+            details=details
+        )
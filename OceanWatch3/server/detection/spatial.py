@@ -0,0 +1,91 @@
+import math
+from typing import Dict, Generic, Iterator, List, Tuple, TypeVar
+
+from .tracks import EARTH_RADIUS_KM
+
+T = TypeVar("T")
+
+Vector = Tuple[float, float, float]
+
+def to_unit_vector(lat: float, lon: float) -> Vector:
+    """Position on the unit sphere; straight-line (chord) distance grows monotonically with great-circle distance"""
+    phi, lam = math.radians(lat), math.radians(lon)
+    cos_phi = math.cos(phi)
+    return (cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi))
+
+def chord_for_km(distance_km: float) -> float:
+    """Unit-sphere chord length matching a great-circle distance"""
+    return 2 * math.sin(min(distance_km / (2 * EARTH_RADIUS_KM), math.pi / 2))
+
+def km_for_chord(chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+class SphereGrid(Generic[T]):
+    """Spatial hash of points on the unit sphere.
+
+    Points are bucketed into cubic cells whose edge is the chord for `cell_km`,
+    so everything within `cell_km` of a point sits in its cell or one of the 26
+    around it. Working in 3-D avoids the distortions of a lat/lon grid at high
+    latitudes and across the antimeridian. Inserts and radius lookups are O(1)
+    expected for bounded density.
+    """
+
+    def __init__(self, cell_km: float):
+        self.cell = chord_for_km(cell_km)
+        self._cells: Dict[Tuple[int, int, int], List[Tuple[T, Vector]]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(items) for items in self._cells.values())
+
+    def _key(self, v: Vector) -> Tuple[int, int, int]:
+        return (math.floor(v[0] / self.cell), math.floor(v[1] / self.cell), math.floor(v[2] / self.cell))
+
+    def insert(self, item: T, lat: float, lon: float) -> None:
+        v = to_unit_vector(lat, lon)
+        self._cells.setdefault(self._key(v), []).append((item, v))
+
+    def _nearby(self, v: Vector) -> Iterator[Tuple[T, Vector]]:
+        kx, ky, kz = self._key(v)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for dz in (-1, 0, 1):
+                    yield from self._cells.get((kx + dx, ky + dy, kz + dz), ())
+
+    def within(self, lat: float, lon: float, distance_km: float) -> List[Tuple[T, float]]:
+        """Items within `distance_km` (at most the grid's cell size) with their distances, nearest first"""
+        v = to_unit_vector(lat, lon)
+        limit = chord_for_km(distance_km)
+        found = []
+        for item, w in self._nearby(v):
+            chord = math.dist(v, w)
+            if chord <= limit:
+                found.append((item, km_for_chord(chord)))
+        found.sort(key=lambda pair: pair[1])
+        return found
+
+    def pairs_within(self, distance_km: float) -> Iterator[Tuple[T, T, float]]:
+        """Every unordered pair of items within `distance_km` of each other"""
+        limit = chord_for_km(distance_km)
+        for key, items in self._cells.items():
+            kx, ky, kz = key
+            # Compare within the cell, then against the 13 "forward" neighbours so each cell pair is visited once
+            for i, (a, va) in enumerate(items):
+                for b, vb in items[i + 1:]:
+                    chord = math.dist(va, vb)
+                    if chord <= limit:
+                        yield a, b, km_for_chord(chord)
+            for offset in _FORWARD_OFFSETS:
+                other = self._cells.get((kx + offset[0], ky + offset[1], kz + offset[2]))
+                if not other:
+                    continue
+                for a, va in items:
+                    for b, vb in other:
+                        chord = math.dist(va, vb)
+                        if chord <= limit:
+                            yield a, b, km_for_chord(chord)
+
+_FORWARD_OFFSETS = [
+    (dx, dy, dz)
+    for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)
+    if (dx, dy, dz) > (0, 0, 0)
+]
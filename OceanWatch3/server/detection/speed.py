@@ -0,0 +1,125 @@
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import numpy as np
+
+from models import AlertCandidate, AlertSeverity, AlertType, ShipLocation
+from .batch import TrackBatch
+from .tracks import KM_PER_NAUTICAL_MILE
+
+def _utc(epoch_seconds: float) -> datetime:
+    return datetime.fromtimestamp(float(epoch_seconds), tz=timezone.utc)
+
+class SpeedAnomalyDetector:
+    """Vectorized implied-speed analysis over a TrackBatch.
+
+    Computes haversine segment distances, implied speeds (knots) and
+    accelerations (knots per hour) for every track in one pass, then flags:
+    - implausible jumps: a segment covering at least `min_jump_km` faster than
+      `max_speed_knots` (spoofed or corrupted positions);
+    - speed regime changes: consecutive plausible segments whose speeds differ
+      by at least `min_regime_delta_knots` and a factor of `regime_ratio`.
+    Python only loops over flagged segments to build candidates.
+    """
+
+    def __init__(self, max_speed_knots: float = 50.0, min_jump_km: float = 1.0, regime_ratio: float = 3.0,
+                 min_regime_delta_knots: float = 8.0, min_segment_seconds: float = 60.0):
+        self.max_speed_knots = max_speed_knots
+        self.min_jump_km = min_jump_km
+        self.regime_ratio = regime_ratio
+        self.min_regime_delta_knots = min_regime_delta_knots
+        self.min_segment_seconds = min_segment_seconds
+
+    def segment_metrics(self, batch: TrackBatch) -> Dict[str, np.ndarray]:
+        """Per-segment distance, duration and implied speed, plus per-segment-pair acceleration"""
+        distance = batch.segment_distance_km()
+        dt = batch.dt_seconds
+        with np.errstate(divide="ignore", invalid="ignore"):
+            speed = np.where(dt > 0, distance / (dt / 3600.0) / KM_PER_NAUTICAL_MILE, np.where(distance > 0, np.inf, 0.0))
+            midpoint_hours = (dt[:-1] + dt[1:]) / 2 / 3600.0
+            acceleration = np.where(midpoint_hours > 0, (speed[1:] - speed[:-1]) / midpoint_hours, 0.0)
+        return {
+            "distance_km": distance,
+            "dt_seconds": dt,
+            "speed_knots": speed,
+            "acceleration_knots_per_hour": acceleration,
+            "same_vessel": batch.same_vessel,
+        }
+
+    def detect(self, batch: TrackBatch) -> List[AlertCandidate]:
+        if len(batch) < 2:
+            return []
+        metrics = self.segment_metrics(batch)
+        same = metrics["same_vessel"]
+        distance = metrics["distance_km"]
+        dt = metrics["dt_seconds"]
+        speed = metrics["speed_knots"]
+
+        jump = same & (distance >= self.min_jump_km) & (speed > self.max_speed_knots)
+
+        plausible = same & ~jump & (dt >= self.min_segment_seconds)
+        before, after = speed[:-1], speed[1:]
+        with np.errstate(invalid="ignore"):
+            ratio = np.maximum(before, after) / np.maximum(np.minimum(before, after), 0.5)
+        regime = (
+            plausible[:-1] & plausible[1:]
+            & (np.abs(after - before) >= self.min_regime_delta_knots)
+            & (ratio >= self.regime_ratio)
+        )
+
+        candidates = []
+        candidates.extend(self._jump_candidates(batch, np.flatnonzero(jump), metrics))
+        candidates.extend(self._regime_candidates(batch, np.flatnonzero(regime), metrics))
+        return candidates
+
+    def _group_by_vessel(self, batch: TrackBatch, rows: np.ndarray) -> Dict[int, List[int]]:
+        groups: Dict[int, List[int]] = {}
+        for row in rows.tolist():
+            groups.setdefault(int(batch.vessel[row]), []).append(row)
+        return groups
+
+    def _jump_candidates(self, batch: TrackBatch, segments: np.ndarray, metrics: Dict[str, np.ndarray]) -> List[AlertCandidate]:
+        candidates = []
+        for vessel, segs in self._group_by_vessel(batch, segments).items():
+            worst = max(segs, key=lambda i: metrics["distance_km"][i])
+            evidence = [
+                f"Moved {metrics['distance_km'][i]:.1f} km in {metrics['dt_seconds'][i] / 60:.1f} min "
+                f"({metrics['speed_knots'][i]:.0f} kn) at {_utc(batch.t[i + 1]).isoformat()}"
+                for i in segs[:3]
+            ]
+            candidates.append(AlertCandidate(
+                ship_id=batch.vessel_ids[vessel],
+                alert_type=AlertType.SPEED_ANOMALY,
+                severity=AlertSeverity.HIGH,
+                location=ShipLocation(latitude=batch.lat[worst + 1], longitude=batch.lon[worst + 1], timestamp=_utc(batch.t[worst + 1])),
+                started_at=_utc(batch.t[segs[0]]),
+                ended_at=_utc(batch.t[segs[-1] + 1]),
+                description=f"{len(segs)} physically implausible position jump(s) above {self.max_speed_knots:g} kn",
+                evidence=evidence,
+                details={"kind": "implausible_jump", "segments": len(segs), "max_distance_km": round(float(metrics["distance_km"][worst]), 2)}
+            ))
+        return candidates
+
+    def _regime_candidates(self, batch: TrackBatch, pairs: np.ndarray, metrics: Dict[str, np.ndarray]) -> List[AlertCandidate]:
+        speed = metrics["speed_knots"]
+        acceleration = metrics["acceleration_knots_per_hour"]
+        candidates = []
+        for vessel, segs in self._group_by_vessel(batch, pairs).items():
+            # Pair i compares segment i with segment i + 1; the change happens at row i + 1
+            evidence = [
+                f"Speed {speed[i]:.1f} -> {speed[i + 1]:.1f} kn ({acceleration[i]:+.0f} kn/h) at {_utc(batch.t[i + 1]).isoformat()}"
+                for i in segs[:3]
+            ]
+            last = segs[-1] + 1
+            candidates.append(AlertCandidate(
+                ship_id=batch.vessel_ids[vessel],
+                alert_type=AlertType.SPEED_ANOMALY,
+                severity=AlertSeverity.MEDIUM,
+                location=ShipLocation(latitude=batch.lat[last], longitude=batch.lon[last], timestamp=_utc(batch.t[last]), speed=float(speed[last])),
+                started_at=_utc(batch.t[segs[0] + 1]),
+                ended_at=_utc(batch.t[last]),
+                description=f"{len(segs)} abrupt speed regime change(s)",
+                evidence=evidence,
+                details={"kind": "regime_change", "changes": len(segs)}
+            ))
+        return candidates
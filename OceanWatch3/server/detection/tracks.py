@@ -0,0 +1,69 @@
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_NAUTICAL_MILE = 1.852
+
+class TrackPoint(NamedTuple):
+    lat: float
+    lon: float
+    timestamp: datetime
+    speed: Optional[float] = None
+    heading: Optional[float] = None
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def _as_utc(value: Any) -> Optional[datetime]:
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def point_from_doc(doc: Dict[str, Any]) -> Optional[TrackPoint]:
+    """Read a position document ({lat, lon}, {latitude, longitude} or {position: {lat, lon}})"""
+    position = doc.get("position") or {}
+    lat = doc.get("lat", doc.get("latitude", position.get("lat")))
+    lon = doc.get("lon", doc.get("longitude", position.get("lon")))
+    timestamp = _as_utc(doc.get("timestamp"))
+    if lat is None or lon is None or timestamp is None:
+        return None
+    heading = doc.get("heading", doc.get("course"))
+    return TrackPoint(float(lat), float(lon), timestamp, doc.get("speed"), heading)
+
+def group_tracks(docs: Iterable[Dict[str, Any]]) -> Dict[str, List[TrackPoint]]:
+    """Group position documents into time-ordered tracks per vessel"""
+    tracks: Dict[str, List[TrackPoint]] = {}
+    for doc in docs:
+        vessel_id = doc.get("vessel_id")
+        point = point_from_doc(doc)
+        if vessel_id and point:
+            tracks.setdefault(vessel_id, []).append(point)
+    for points in tracks.values():
+        points.sort(key=lambda p: p.timestamp)
+    return tracks
+
+POSITION_PROJECTION = {
+    "_id": 0, "vessel_id": 1, "timestamp": 1, "lat": 1, "lon": 1, "latitude": 1, "longitude": 1,
+    "position": 1, "speed": 1, "heading": 1, "course": 1
+}
+
+def load_tracks(collection, since: datetime) -> Dict[str, List[TrackPoint]]:
+    """Load per-vessel tracks with positions newer than `since`"""
+    cursor = collection.find({"timestamp": {"$gte": since}}, POSITION_PROJECTION)
+    return group_tracks(cursor.sort([("vessel_id", 1), ("timestamp", 1)]))
+
+async def aload_tracks(collection, since: datetime) -> Dict[str, List[TrackPoint]]:
+    """Async variant of load_tracks"""
+    cursor = collection.find({"timestamp": {"$gte": since}}, POSITION_PROJECTION)
+    return group_tracks(await cursor.sort([("vessel_id", 1), ("timestamp", 1)]).to_list())
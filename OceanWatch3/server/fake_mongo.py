@@ -0,0 +1,379 @@
+"""In-memory stand-ins for the parts of pymongo the server tests exercise.
+
+Covers the query, update and aggregation operators this codebase uses, not
+Mongo as a whole. `FakeDatabase` behaves like a sync `Database` and
+`AsyncFakeDatabase` like an `AsyncDatabase`; both share their documents.
+"""
+import copy
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateMany
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+_MISSING = object()
+
+def get_path(doc: Dict[str, Any], path: str) -> Any:
+    value: Any = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+def set_path(doc: Dict[str, Any], path: str, value: Any) -> None:
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+def path_values(doc: Any, path: str) -> List[Any]:
+    """Every value `path` reaches, descending into arrays as Mongo queries do; [_MISSING] if none"""
+    values = [doc]
+    for part in path.split("."):
+        reached = []
+        for value in values:
+            items = value if isinstance(value, list) else [value]
+            reached += [item[part] for item in items if isinstance(item, dict) and part in item]
+        values = reached
+    expanded = []
+    for value in values:
+        expanded.append(value)
+        if isinstance(value, list):
+            expanded += value
+    return expanded or [_MISSING]
+
+def _in_ring(point: List[float], ring: List[List[float]]) -> bool:
+    """Planar ray casting; close to $geoWithin for the densely stepped polygons the server builds"""
+    x, y = point
+    inside = False
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:]):
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+    return inside
+
+def _compare(value: Any, op: str, operand: Any, options: str = "") -> bool:
+    if op == "$exists":
+        return (value is not _MISSING) == bool(operand)
+    if op == "$in":
+        # null matches missing fields too
+        return value in operand or (value is _MISSING and None in operand)
+    if op == "$nin":
+        return not _compare(value, "$in", operand)
+    if op == "$regex":
+        return isinstance(value, str) and re.search(operand, value, re.IGNORECASE if "i" in options else 0) is not None
+    if op == "$ne":
+        return value != operand
+    if op == "$eq":
+        return value == operand
+    if op == "$geoWithin":
+        return isinstance(value, dict) and value.get("type") == "Point" and _in_ring(value["coordinates"], operand["$geometry"]["coordinates"][0])
+    if op == "$type":
+        types = {"string": str, "number": (int, float), "date": datetime}
+        return isinstance(value, types[operand]) and not isinstance(value, bool)
+    if value is _MISSING or value is None:
+        return False
+    try:
+        return {"$gt": value > operand, "$gte": value >= operand, "$lt": value < operand, "$lte": value <= operand}[op]
+    except TypeError:
+        return False
+
+def matches(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, branch) for branch in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, branch) for branch in condition):
+                return False
+        elif isinstance(condition, dict) and condition and all(op.startswith("$") for op in condition):
+            values = path_values(doc, key)
+            options = condition.get("$options", "")
+            operators = [(op, operand) for op, operand in condition.items() if op != "$options"]
+            # Each operator needs one matching value, except negations, which must hold for all of them
+            if not all(
+                all(_compare(value, op, operand) for value in values) if op in ("$nin", "$ne")
+                else _compare(values[0], op, operand) if op == "$exists"
+                else any(_compare(value, op, operand, options) for value in values)
+                for op, operand in operators
+            ):
+                return False
+        elif not any(value == condition or (condition is None and value is _MISSING) for value in path_values(doc, key)):
+            return False
+    return True
+
+def apply_update(doc: Dict[str, Any], update: Dict[str, Any], inserting: bool) -> None:
+    for op, fields in update.items():
+        for path, value in fields.items():
+            current = get_path(doc, path)
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                set_path(doc, path, copy.deepcopy(value))
+            elif op == "$inc":
+                set_path(doc, path, (0 if current is _MISSING else current) + value)
+            elif op == "$max" and (current is _MISSING or value > current):
+                set_path(doc, path, value)
+            elif op == "$min" and (current is _MISSING or value < current):
+                set_path(doc, path, value)
+
+def project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not projection:
+        return copy.deepcopy(doc)
+    included = [key for key, flag in projection.items() if flag and key != "_id"]
+    if included:
+        result = {key: copy.deepcopy(doc[key]) for key in included if key in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    return {key: copy.deepcopy(value) for key, value in doc.items() if projection.get(key, 1)}
+
+def _sort_key(value: Any) -> Any:
+    # Missing and null sort before everything else, as in Mongo
+    return (0, 0) if value is _MISSING or value is None else (1, value)
+
+def sort_docs(docs: List[Dict[str, Any]], sort: Any) -> List[Dict[str, Any]]:
+    pairs = list(sort.items()) if isinstance(sort, dict) else [sort] if isinstance(sort, tuple) else list(sort)
+    for field, direction in reversed(pairs):
+        docs.sort(key=lambda doc: _sort_key(get_path(doc, field)), reverse=direction < 0)
+    return docs
+
+def evaluate(expression: Any, doc: Dict[str, Any]) -> Any:
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = get_path(doc, expression[1:])
+        return None if value is _MISSING else value
+    if isinstance(expression, dict):
+        if len(expression) == 1:
+            op, argument = next(iter(expression.items()))
+            dates = {"$year": "year", "$month": "month", "$dayOfMonth": "day", "$hour": "hour"}
+            if op in dates:
+                return getattr(evaluate(argument, doc), dates[op])
+        return {key: evaluate(value, doc) for key, value in expression.items()}
+    return expression
+
+def _group(docs: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    groups: Dict[Any, Dict[str, Any]] = {}
+    for doc in docs:
+        key = evaluate(spec["_id"], doc)
+        hashable = repr(key)
+        row = groups.setdefault(hashable, {"_id": key})
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            op, argument = next(iter(accumulator.items()))
+            value = evaluate(argument, doc)
+            if op == "$sum":
+                row[field] = row.get(field, 0) + value
+            elif op == "$first":
+                row.setdefault(field, value)
+            elif op == "$max":
+                row[field] = value if field not in row or value > row[field] else row[field]
+            elif op == "$addToSet":
+                row.setdefault(field, [])
+                if value not in row[field]:
+                    row[field].append(value)
+    return list(groups.values())
+
+def run_pipeline(docs: List[Dict[str, Any]], pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    docs = [copy.deepcopy(doc) for doc in docs]
+    for stage in pipeline:
+        op, spec = next(iter(stage.items()))
+        if op == "$match":
+            docs = [doc for doc in docs if matches(doc, spec)]
+        elif op == "$sort":
+            docs = sort_docs(docs, spec)
+        elif op == "$limit":
+            docs = docs[:spec]
+        elif op == "$group":
+            docs = _group(docs, spec)
+        elif op == "$count":
+            docs = [{spec: len(docs)}] if docs else []
+        elif op == "$facet":
+            docs = [{name: run_pipeline(docs, stages) for name, stages in spec.items()}]
+        else:
+            raise NotImplementedError(op)
+    return docs
+
+class FakeCursor:
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self.docs = docs
+
+    def sort(self, key: Any, direction: Optional[int] = None) -> "FakeCursor":
+        sort_docs(self.docs, [(key, direction)] if direction is not None else key)
+        return self
+
+    def limit(self, limit: int) -> "FakeCursor":
+        if limit:
+            self.docs = self.docs[:limit]
+        return self
+
+    def skip(self, skip: int) -> "FakeCursor":
+        self.docs = self.docs[skip:]
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+    def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.docs
+
+class AsyncFakeCursor(FakeCursor):
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.docs
+
+class BulkResult:
+    def __init__(self, upserted_count: int = 0, modified_count: int = 0):
+        self.upserted_count = upserted_count
+        self.modified_count = modified_count
+
+class FakeCollection:
+    """Documents plus the operations the server runs on them.
+
+    `unique` names fields that reject duplicate values like a unique index.
+    `before_write` is called with the filter of every upsert, so a test can
+    insert a competing document to simulate a lost race.
+    """
+
+    def __init__(self, docs: Optional[List[Dict[str, Any]]] = None, unique: Optional[List[str]] = None):
+        self.docs: List[Dict[str, Any]] = [dict(doc) for doc in docs or []]
+        self.unique = unique or []
+        self.indexes: List[Any] = []
+        self.before_write: Optional[Callable[[Dict[str, Any]], None]] = None
+        self.calls: List[str] = []
+
+    def insert(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        doc = {"_id": ObjectId(), **doc}
+        for field in self.unique:
+            value = get_path(doc, field)
+            if value is not _MISSING and any(get_path(other, field) == value for other in self.docs):
+                raise DuplicateKeyError(f"E11000 duplicate key on {field}")
+        self.docs.append(doc)
+        return doc
+
+    def _update(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool, many: bool):
+        self.calls.append("update")
+        targets = [doc for doc in self.docs if matches(doc, query)]
+        if not targets and upsert:
+            if self.before_write is not None:
+                hook, self.before_write = self.before_write, None
+                hook(query)
+            seed = {key: copy.deepcopy(value) for key, value in query.items() if not key.startswith("$") and not isinstance(value, dict)}
+            doc = {"_id": seed.pop("_id", ObjectId())}
+            for key, value in seed.items():
+                set_path(doc, key, value)
+            apply_update(doc, update, inserting=True)
+            return [self.insert(doc)], True
+        for doc in targets[:None if many else 1]:
+            apply_update(doc, update, inserting=False)
+        return targets[:None if many else 1], False
+
+    def find(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None, limit: int = 0, sort: Any = None):
+        self.calls.append("find")
+        docs = [project(doc, projection) for doc in self.docs if matches(doc, query or {})]
+        cursor = self._cursor(docs)
+        if sort:
+            cursor.sort(sort)
+        return cursor.limit(limit)
+
+    def _cursor(self, docs: List[Dict[str, Any]]) -> FakeCursor:
+        return FakeCursor(docs)
+
+    def find_one(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None, sort: Any = None):
+        docs = self.find(query, projection, sort=sort).docs
+        return docs[0] if docs else None
+
+    def find_one_and_update(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False,
+                            return_document: bool = ReturnDocument.BEFORE, projection: Optional[Dict[str, Any]] = None):
+        before = [copy.deepcopy(doc) for doc in self.docs if matches(doc, query)][:1]
+        docs, inserted = self._update(query, update, upsert, many=False)
+        if return_document == ReturnDocument.AFTER:
+            return project(docs[0], projection) if docs else None
+        return project(before[0], projection) if before else None
+
+    def update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
+        docs, inserted = self._update(query, update, upsert, many=False)
+        return BulkResult(int(inserted), 0 if inserted else len(docs))
+
+    def update_many(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
+        docs, inserted = self._update(query, update, upsert, many=True)
+        return BulkResult(int(inserted), 0 if inserted else len(docs))
+
+    def bulk_write(self, requests: List[Any], ordered: bool = True):
+        upserted = modified = 0
+        for request in requests:
+            doc = request._doc
+            upsert = bool(getattr(request, "_upsert", False))
+            result = (self.update_many if isinstance(request, UpdateMany) else self.update_one)(request._filter, doc, upsert=upsert)
+            upserted += result.upserted_count
+            modified += result.modified_count
+        return BulkResult(upserted, modified)
+
+    def insert_one(self, doc: Dict[str, Any]):
+        inserted = self.insert(dict(doc))
+        doc.setdefault("_id", inserted["_id"])
+        return inserted
+
+    def count_documents(self, query: Dict[str, Any]) -> int:
+        return sum(1 for doc in self.docs if matches(doc, query))
+
+    def aggregate(self, pipeline: List[Dict[str, Any]]):
+        self.calls.append("aggregate")
+        return self._cursor(run_pipeline(self.docs, pipeline))
+
+    def create_indexes(self, indexes: List[Any]) -> None:
+        self.indexes.extend(indexes)
+
+class AsyncFakeCollection:
+    """Async facade over a FakeCollection with AsyncCollection's signatures"""
+
+    def __init__(self, collection: FakeCollection):
+        self.sync = collection
+
+    def find(self, *args: Any, **kwargs: Any) -> AsyncFakeCursor:
+        return AsyncFakeCursor(self.sync.find(*args, **kwargs).docs)
+
+    async def aggregate(self, pipeline: List[Dict[str, Any]]) -> AsyncFakeCursor:
+        return AsyncFakeCursor(self.sync.aggregate(pipeline).docs)
+
+    async def watch(self, *args: Any, **kwargs: Any) -> Any:
+        # Like a standalone server, which has no change streams
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+
+    def __getattr__(self, name: str) -> Any:
+        method = getattr(self.sync, name)
+        if not callable(method):
+            return method
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return method(*args, **kwargs)
+        return call
+
+class FakeDatabase:
+    def __init__(self, unique: Optional[Dict[str, List[str]]] = None):
+        self.collections: Dict[str, FakeCollection] = {}
+        self.unique = unique or {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(unique=self.unique.get(name))
+        return self.collections[name]
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def asynchronous(self) -> "AsyncFakeDatabase":
+        return AsyncFakeDatabase(self)
+
+class AsyncFakeDatabase:
+    def __init__(self, sync: FakeDatabase):
+        self.sync = sync
+
+    def __getitem__(self, name: str) -> AsyncFakeCollection:
+        return AsyncFakeCollection(self.sync[name])
+
+    def __getattr__(self, name: str) -> AsyncFakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
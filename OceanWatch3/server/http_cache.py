@@ -0,0 +1,90 @@
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Sequence
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+from cache import SWRCache
+
+def etag_for(payload: Any) -> str:
+    """Weak ETag over raw bytes or the canonical JSON of a response body"""
+    if not isinstance(payload, bytes):
+        payload = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":")).encode()
+    return f'W/"{hashlib.sha1(payload).hexdigest()}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # Weak comparison: W/"x" and "x" name the same representation
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+def conditional_json(request: Request, payload: Any, volatile: Sequence[str] = ("timestamp",)) -> Response:
+    """JSON response carrying an ETag, or 304 Not Modified when the client already has it.
+
+    Keys in `volatile` (the generation time) are left out of the ETag so an
+    unchanged result keeps its tag between requests.
+    """
+    etag = etag_for({key: value for key, value in payload.items() if key not in volatile})
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(jsonable_encoder(payload), headers=headers)
+
+def parse_ttls(spec: str) -> Dict[str, float]:
+    """Parse "health:10,ships:30" (seconds per endpoint) into TTLs"""
+    ttls = {}
+    for item in spec.split(","):
+        endpoint, _, seconds = item.partition(":")
+        if endpoint.strip() and seconds.strip():
+            ttls[endpoint.strip()] = float(seconds)
+    return ttls
+
+class ResponseCache:
+    """Stale-while-revalidate cache of read endpoint payloads, one SWRCache per endpoint.
+
+    An endpoint is cached for its TTL and then served stale for up to
+    `stale_seconds` more while one background call refreshes it. Endpoints
+    without a positive TTL always call their loader.
+    """
+
+    def __init__(self, ttls: Dict[str, float], stale_seconds: float = 0, max_entries: int = 256):
+        self.ttls = ttls
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self._caches: Dict[str, SWRCache] = {}
+        self.bypassed: Dict[str, int] = {}
+
+    def cache(self, endpoint: str) -> Optional[SWRCache]:
+        ttl = self.ttls.get(endpoint, 0)
+        if ttl <= 0:
+            return None
+        if endpoint not in self._caches:
+            self._caches[endpoint] = SWRCache(ttl, self.stale_seconds, self.max_entries, name=endpoint)
+        return self._caches[endpoint]
+
+    async def get(self, endpoint: str, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        cache = self.cache(endpoint)
+        if cache is None:
+            self.bypassed[endpoint] = self.bypassed.get(endpoint, 0) + 1
+            return await loader()
+        return await cache.get_or_load(key, loader)
+
+    def invalidate(self, endpoint: str, key: Hashable) -> None:
+        if endpoint in self._caches:
+            self._caches[endpoint].invalidate(key)
+
+    def clear(self) -> None:
+        for cache in self._caches.values():
+            cache.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Hit/miss counters per endpoint"""
+        return {
+            "ttls": self.ttls,
+            "stale_seconds": self.stale_seconds,
+            "endpoints": {name: cache.snapshot() for name, cache in self._caches.items()},
+            "bypassed": self.bypassed
+        }
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+@dataclass
+class JobRecord:
+    job_id: str
+    kind: str
+    params: Dict[str, Any]
+    status: JobStatus = JobStatus.QUEUED
+    result: Any = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status.value,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "duration_seconds": round((self.finished_at - self.started_at).total_seconds(), 3)
+                if self.started_at and self.finished_at else None
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+class QueueFull(Exception):
+    pass
+
+class JobQueue:
+    """In-process queue for long-running LLM work, drained by a fixed pool of workers.
+
+    `submit` returns immediately with a queued JobRecord; records stay
+    queryable until `result_ttl_seconds` after they finish. Every finished job
+    is also pushed to every subscribed inbox, which backs the completion
+    stream. Inboxes hold at most `inbox_max` jobs; a subscriber that falls
+    that far behind is dropped, as AlertStream does, and receives None in
+    place of the jobs it missed.
+    """
+
+    def __init__(self, workers: int = 2, max_queued: int = 100, result_ttl_seconds: float = 3600, inbox_max: int = 256):
+        self.workers = max(1, workers)
+        self.result_ttl_seconds = result_ttl_seconds
+        self.inbox_max = max(1, inbox_max)
+        self.dropped_subscribers = 0
+        self.jobs: Dict[str, JobRecord] = {}
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self._workers: List[asyncio.Task] = []
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._expiry: Dict[str, float] = {}
+
+    def start(self) -> None:
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def close(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, kind: str, func: Callable[[], Awaitable[Any]], **params: Any) -> JobRecord:
+        """Queue `func`; raises QueueFull when the backlog is at capacity"""
+        self._purge_expired()
+        job = JobRecord(job_id=uuid.uuid4().hex, kind=kind, params=params)
+        try:
+            self._queue.put_nowait((job, func))
+        except asyncio.QueueFull:
+            raise QueueFull(f"Job queue is full ({self._queue.maxsize} queued)")
+        self.jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[JobRecord]:
+        self._purge_expired()
+        return self.jobs.get(job_id)
+
+    def recent(self, status: Optional[JobStatus] = None, limit: int = 50) -> List[JobRecord]:
+        self._purge_expired()
+        jobs = [job for job in self.jobs.values() if status is None or job.status == status]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        counts = {status.value: 0 for status in JobStatus}
+        for job in self.jobs.values():
+            counts[job.status.value] += 1
+        return {"workers": self.workers, "subscribers": len(self._subscribers), "dropped_subscribers": self.dropped_subscribers, **counts}
+
+    def subscribe(self) -> asyncio.Queue:
+        """Inbox that receives every job finishing from now on, then None if it is dropped; pass it to `unsubscribe` when done"""
+        inbox: asyncio.Queue = asyncio.Queue(self.inbox_max)
+        self._subscribers.add(inbox)
+        return inbox
+
+    def unsubscribe(self, inbox: asyncio.Queue) -> None:
+        self._subscribers.discard(inbox)
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            job, func = await self._queue.get()
+            job.status = JobStatus.RUNNING
+            job.started_at = datetime.now(timezone.utc)
+            try:
+                job.result = await func()
+                job.status = JobStatus.SUCCEEDED
+            except asyncio.CancelledError:
+                job.status = JobStatus.FAILED
+                job.error = "cancelled"
+                raise
+            except Exception as e:
+                logger.error(f"Job {job.job_id} ({job.kind}) failed: {e}")
+                job.status = JobStatus.FAILED
+                job.error = str(e)
+            finally:
+                job.finished_at = datetime.now(timezone.utc)
+                self._expiry[job.job_id] = time.monotonic() + self.result_ttl_seconds
+                self._queue.task_done()
+                self._deliver(job)
+
+    def _deliver(self, job: JobRecord) -> None:
+        for inbox in list(self._subscribers):
+            try:
+                inbox.put_nowait(job)
+            except asyncio.QueueFull:
+                # Too far behind: make room for the end-of-stream marker
+                while not inbox.empty():
+                    inbox.get_nowait()
+                inbox.put_nowait(None)
+                self._subscribers.discard(inbox)
+                self.dropped_subscribers += 1
+
+    def _purge_expired(self) -> None:
+        now = time.monotonic()
+        for job_id in [job_id for job_id, expires in self._expiry.items() if expires <= now]:
+            del self._expiry[job_id]
+            self.jobs.pop(job_id, None)
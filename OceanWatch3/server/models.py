@@ -0,0 +1,96 @@
+from datetime import datetime
+from enum import Enum
+from typing import List, Dict, Any, Optional
+
+from pydantic import BaseModel
+
+class AlertSeverity(str, Enum):
+    LOW = "low"
+    MEDIUM = "medium"
+    HIGH = "high"
+    CRITICAL = "critical"
+
+class AlertType(str, Enum):
+    LOITERING = "loitering"
+    PORT_ENTRY = "port_entry"
+    PORT_EXIT = "port_exit"
+    SUSPICIOUS_ROUTE = "suspicious_route"
+    SPEED_ANOMALY = "speed_anomaly"
+    ENCOUNTER = "encounter"
+    GAP_IN_TRACKING = "gap_in_tracking"
+    ZONE_ENTRY = "zone_entry"
+    ZONE_EXIT = "zone_exit"
+
+class ShipLocation(BaseModel):
+    latitude: float
+    longitude: float
+    timestamp: datetime
+    speed: Optional[float] = None
+    heading: Optional[float] = None
+
+class ShipEvent(BaseModel):
+    event_id: str
+    event_type: str
+    timestamp: datetime
+    location: Optional[ShipLocation] = None
+    details: Dict[str, Any] = {}
+    dataset: str
+
+class Ship(BaseModel):
+    vessel_id: str
+    name: Optional[str] = None
+    mmsi: Optional[str] = None
+    imo: Optional[str] = None
+    flag: Optional[str] = None
+    vessel_type: Optional[str] = None
+    last_known_location: Optional[ShipLocation] = None
+    events: List[ShipEvent] = []
+    risk_score: float = 0.0
+
+class Alert(BaseModel):
+    alert_id: str
+    timestamp: datetime
+    ship_id: str
+    ship_name: Optional[str] = None
+    alert_type: AlertType
+    severity: AlertSeverity
+    location: Optional[ShipLocation] = None
+    description: str
+    reasoning: str
+    evidence: List[str] = []
+    status: str = "active"
+    dedup_key: Optional[str] = None
+    occurrences: int = 1
+    last_seen: Optional[datetime] = None
+
+class BehaviorPattern(BaseModel):
+    pattern_type: str
+    description: str
+    confidence: float
+    evidence: List[str] = []
+
+class ShipBehaviorAnalysis(BaseModel):
+    ship_id: str
+    ship_name: Optional[str] = None
+    analysis_timestamp: datetime
+    patterns: List[BehaviorPattern] = []
+    risk_factors: List[str] = []
+    overall_risk_score: float = 0.0
+    recommendations: List[str] = []
+
+class AlertCandidate(BaseModel):
+    """Suspicious behavior found by an in-process detector, not yet stored as an Alert"""
+    ship_id: str
+    alert_type: AlertType
+    severity: AlertSeverity
+    location: Optional[ShipLocation] = None
+    started_at: datetime
+    ended_at: datetime
+    description: str
+    evidence: List[str] = []
+    details: Dict[str, Any] = {}
+
+    def summary(self) -> str:
+        """One-line rendering for agent prompts"""
+        where = f" at {self.location.latitude:.4f},{self.location.longitude:.4f}" if self.location else ""
+        return f"{self.ship_id} [{self.alert_type.value}/{self.severity.value}]{where}: {self.description}"
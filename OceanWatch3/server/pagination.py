@@ -0,0 +1,76 @@
+import base64
+import binascii
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from bson import ObjectId, json_util
+from bson.json_util import JSONMode, JSONOptions
+
+# Cursor values round-trip datetimes and ObjectIds exactly
+_CURSOR_JSON = JSONOptions(json_mode=JSONMode.RELAXED, tz_aware=True, tzinfo=timezone.utc)
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Opaque URL-safe cursor for the sort key values of the last row of a page"""
+    raw = json_util.dumps(values, json_options=_CURSOR_JSON, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, keys: Sequence[str]) -> Dict[str, Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json_util.loads(raw, json_options=_CURSOR_JSON)
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f"Malformed cursor: {e}")
+    if not isinstance(values, dict) or set(values) != set(keys):
+        raise InvalidCursor("Cursor does not match this listing")
+    return values
+
+def keyset_filter(sort: Sequence[Tuple[str, int]], after: Dict[str, Any]) -> Dict[str, Any]:
+    """Rows strictly after `after` in `sort` order, as an $or of equality prefixes.
+
+    For [(timestamp, -1), (_id, -1)] this is
+    {$or: [{timestamp: {$lt: t}}, {timestamp: t, _id: {$lt: id}}]}, which a
+    compound index on the same keys answers with one range scan.
+    """
+    branches = []
+    for i, (field, direction) in enumerate(sort):
+        branch = {prefix: after[prefix] for prefix, _ in sort[:i]}
+        branch[field] = {"$lt" if direction < 0 else "$gt": after[field]}
+        branches.append(branch)
+    return branches[0] if len(branches) == 1 else {"$or": branches}
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str], default: Sequence[str]) -> Dict[str, int]:
+    """Projection from a comma-separated `fields` parameter; unknown names raise ValueError"""
+    allowed = set(allowed)
+    requested = [name.strip() for name in fields.split(",") if name.strip()] if fields else list(default)
+    unknown = sorted(set(requested) - allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(sorted(allowed))}")
+    return {name: 1 for name in requested}
+
+def jsonable(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Document with ObjectIds as strings, ready for a JSON response"""
+    return {key: str(value) if isinstance(value, ObjectId) else value for key, value in doc.items()}
+
+async def keyset_page(collection, query: Dict[str, Any], sort: Sequence[Tuple[str, int]], limit: int,
+                      cursor: Optional[str] = None, projection: Optional[Dict[str, int]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of `collection` in `sort` order after `cursor`, plus the cursor of the next page (None on the last)"""
+    keys = [field for field, _ in sort]
+    if cursor:
+        after = keyset_filter(sort, decode_cursor(cursor, keys))
+        query = {"$and": [query, after]} if query else after
+    if projection is not None:
+        # Sort keys are always fetched so the next cursor can be built
+        projection = {**projection, **{key: 1 for key in keys}}
+    docs = await collection.find(query, projection).sort(list(sort)).limit(limit + 1).to_list()
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor({key: docs[-1].get(key) for key in keys})
+    return docs, next_cursor
+
+def window_start(hours: float, now: Optional[datetime] = None) -> datetime:
+    """Start of a trailing window of `hours`, valid across day and month boundaries"""
+    return (now or datetime.now(timezone.utc)) - timedelta(hours=hours)
@@ -0,0 +1,113 @@
+import gzip
+import struct
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Fields of the map's `vessel` documents the positions payload is built from
+COUNTER_FIELDS = [
+    "aisOff_count", "eventsInNoTakeMpas_count",
+    "eventsInRfmoWithoutKnownAuthorization_count", "totalTimesListed_count"
+]
+POSITION_PROJECTION = {"_id": 0, "vessel_id": 1, "name": 1, "lat": 1, "lon": 1, "bearing": 1, **{field: 1 for field in COUNTER_FIELDS}}
+POSITION_QUERY = {"noEvents": {"$ne": True}, "vessel_id": {"$type": "string"}, "lat": {"$type": "number"}, "lon": {"$type": "number"}}
+
+MAGIC = b"OWVP"
+VERSION = 1
+FLAG_NAMES = 1
+# Coordinates are sent as integers of 1e-5 degrees (about 1.1 m)
+COORD_SCALE = 100_000
+MEDIA_TYPE = "application/vnd.oceanwatch.positions"
+
+_HEADER = struct.Struct("<4sBBII")
+
+def _front_code(ids: List[str]) -> bytes:
+    """Sorted ids as (shared prefix length, suffix length) pairs plus the suffixes.
+
+    GFW vessel ids are long hex strings, so sorted neighbours share much of
+    their prefix; this is the string counterpart of delta-encoding numbers.
+    """
+    prefixes = np.zeros(len(ids), dtype=np.uint8)
+    suffixes = []
+    previous = b""
+    for i, vessel_id in enumerate(ids):
+        current = vessel_id.encode()[:255]
+        shared = 0
+        limit = min(len(previous), len(current), 255)
+        while shared < limit and previous[shared] == current[shared]:
+            shared += 1
+        prefixes[i] = shared
+        suffixes.append(current[shared:])
+        previous = current
+    lengths = np.array([len(suffix) for suffix in suffixes], dtype=np.uint8)
+    return prefixes.tobytes() + lengths.tobytes() + b"".join(suffixes)
+
+def encode_positions(vessels: List[Dict[str, Any]], names: bool = True, compresslevel: int = 6) -> bytes:
+    """Gzipped columnar payload of vessel positions, sorted by vessel id.
+
+    Layout (little-endian), after a header of magic, version, flags, row
+    count and coordinate scale:
+    lat int32[n], lon int32[n] (degrees * scale), bearing uint16[n] (tenths
+    of a degree), one uint16[n] column per counter in COUNTER_FIELDS
+    (saturating), front-coded ids (uint8[n] prefix lengths, uint8[n] suffix
+    lengths, suffix bytes) and, with FLAG_NAMES, uint16[n] name lengths and
+    the UTF-8 names.
+    """
+    rows = sorted((v for v in vessels if v.get("vessel_id")), key=lambda v: str(v["vessel_id"]))
+    count = len(rows)
+    lat = np.array([row["lat"] for row in rows], dtype=np.float64)
+    lon = np.array([row["lon"] for row in rows], dtype=np.float64)
+    bearing = np.array([row.get("bearing") if isinstance(row.get("bearing"), (int, float)) else 0.0 for row in rows], dtype=np.float64)
+    parts = [
+        _HEADER.pack(MAGIC, VERSION, FLAG_NAMES if names else 0, count, COORD_SCALE),
+        np.rint(lat * COORD_SCALE).astype("<i4").tobytes(),
+        np.rint(lon * COORD_SCALE).astype("<i4").tobytes(),
+        (np.rint(np.mod(np.nan_to_num(bearing), 360.0) * 10) % 3600).astype("<u2").tobytes()
+    ]
+    for field in COUNTER_FIELDS:
+        counts = np.array([row.get(field) if isinstance(row.get(field), (int, float)) else 0 for row in rows], dtype=np.float64)
+        parts.append(np.clip(counts, 0, 65535).astype("<u2").tobytes())
+    parts.append(_front_code([str(row["vessel_id"]) for row in rows]))
+    if names:
+        encoded = [str(row.get("name") or "").encode()[:65535] for row in rows]
+        parts.append(np.array([len(name) for name in encoded], dtype="<u2").tobytes())
+        parts.append(b"".join(encoded))
+    return gzip.compress(b"".join(parts), compresslevel=compresslevel)
+
+def decode_positions(payload: bytes) -> List[Dict[str, Any]]:
+    """Reference decoder for `encode_positions` (the browser does the same with DataView)"""
+    data = gzip.decompress(payload)
+    magic, version, flags, count, scale = _HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a vessel positions payload")
+    offset = _HEADER.size
+
+    def column(dtype: str, width: int) -> np.ndarray:
+        nonlocal offset
+        values = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+        offset += width * count
+        return values
+
+    lat, lon, bearing = column("<i4", 4) / scale, column("<i4", 4) / scale, column("<u2", 2) / 10
+    counters = {field: column("<u2", 2) for field in COUNTER_FIELDS}
+    prefixes, lengths = column("u1", 1), column("u1", 1)
+    ids: List[str] = []
+    previous = b""
+    for shared, length in zip(prefixes.tolist(), lengths.tolist()):
+        previous = previous[:shared] + data[offset:offset + length]
+        offset += length
+        ids.append(previous.decode(errors="replace"))
+    names: Optional[List[str]] = None
+    if flags & FLAG_NAMES:
+        names = []
+        for length in column("<u2", 2).tolist():
+            names.append(data[offset:offset + length].decode(errors="replace"))
+            offset += length
+    return [
+        {
+            "vessel_id": ids[i], "lat": float(lat[i]), "lon": float(lon[i]), "bearing": float(bearing[i]),
+            **{field: int(values[i]) for field, values in counters.items()},
+            **({"name": names[i]} if names is not None else {})
+        }
+        for i in range(count)
+    ]
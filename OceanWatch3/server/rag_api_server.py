@@ -2,6 +2,7 @@ from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
+import asyncio
 import logging
 import os
 from datetime import datetime
@@ -9,6 +10,8 @@ import json
 
 # Import RAG components
 from rag import maritime_rag_pipeline
+from config import config
+from http_cache import ResponseCache, parse_ttls
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -67,6 +70,20 @@ class ContextInfoResponse(BaseModel):
 # Global conversation storage (in production, use a proper database)
 conversation_store: Dict[str, List[ChatMessage]] = {}
 
+response_cache = ResponseCache(
+    parse_ttls(config.RESPONSE_CACHE_TTLS), config.RESPONSE_CACHE_STALE_SECONDS, config.RESPONSE_CACHE_MAX_ENTRIES
+)
+
+async def cached_context_info() -> Dict[str, Any]:
+    """Context info behind /context-info; the pipeline call blocks, so it runs in a thread"""
+    info = await response_cache.get(
+        "context_info", "context_info", lambda: asyncio.to_thread(maritime_rag_pipeline.get_context_info)
+    )
+    if info.get("error"):
+        # Don't keep serving a failure for the whole TTL
+        response_cache.invalidate("context_info", "context_info")
+    return info
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -81,8 +98,8 @@ async def root():
 async def health_check():
     """Detailed health check"""
     try:
-        # Test database connection
-        context_info = maritime_rag_pipeline.get_context_info()
+        # Test database connection, bypassing the response cache so an outage shows up at once
+        context_info = await asyncio.to_thread(maritime_rag_pipeline.get_context_info)
         
         return {
             "status": "healthy",
@@ -147,7 +164,7 @@ async def chat(request: ChatRequest):
 async def get_context_info():
     """Get information about available data context"""
     try:
-        context_info = maritime_rag_pipeline.get_context_info()
+        context_info = await cached_context_info()
         return ContextInfoResponse(**context_info)
     except Exception as e:
         logger.error(f"Error getting context info: {e}")
@@ -222,6 +239,7 @@ async def get_stats():
             "active_conversations": len(conversation_store),
             "total_sessions": len(conversation_store),
             "api_version": "1.0.0",
+            "response_cache": response_cache.snapshot(),
             "timestamp": datetime.utcnow().isoformat()
         }
     except Exception as e:
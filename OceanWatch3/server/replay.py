@@ -0,0 +1,221 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field
+
+class CassetteMiss(Exception):
+    """Replay found no recorded response for a request"""
+
+class Cassette:
+    """Request/response pairs for external calls, stored as JSON lines.
+
+    Requests are keyed by a hash of their canonical JSON. Identical requests
+    recorded several times are replayed in recording order, so a replayed agent
+    run sees exactly the sequence of responses the recorded one did. In
+    `record` mode the file is started afresh and every call is appended as it
+    completes.
+    """
+
+    def __init__(self, path: str, mode: str = "replay"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Cassette mode must be record or replay, not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._recorded: Dict[str, Deque[Any]] = defaultdict(deque)
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0}
+        if mode == "replay":
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Cassette not found: {path}")
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._recorded[entry["key"]].append(entry["response"])
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            # A recording replaces the previous one rather than piling onto it
+            open(path, "w").close()
+
+    @staticmethod
+    def key(kind: str, request: Any) -> str:
+        canonical = json.dumps({"kind": kind, "request": request}, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def replay(self, kind: str, request: Any) -> Any:
+        key = self.key(kind, request)
+        with self._lock:
+            recorded = self._recorded.get(key)
+            if not recorded:
+                self.stats["misses"] += 1
+                raise CassetteMiss(f"No recorded {kind} response for request {key[:12]}")
+            self.stats["replayed"] += 1
+            # Keep the last response around so extra identical calls still replay
+            return recorded.popleft() if len(recorded) > 1 else recorded[0]
+
+    def record(self, kind: str, request: Any, response: Any) -> None:
+        entry = {"key": self.key(kind, request), "kind": kind, "request": request, "response": response}
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+            self.stats["recorded"] += 1
+
+_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?")
+_DECIMAL = re.compile(r"-?\d+\.\d+")
+
+def _is_context_line(line: str) -> bool:
+    """Lines of the compact data tables (see context.py) embedded in monitoring prompts"""
+    line = line.strip()
+    return line.startswith("## ") or "|" in line or line == "none" or re.fullmatch(r"\+\d+ more", line) is not None
+
+def stable_prompt(content: Any) -> Any:
+    """A prompt with its live data taken out: context tables dropped, timestamps and decimals masked"""
+    if not isinstance(content, str):
+        return content
+    lines = [line for line in content.splitlines() if not _is_context_line(line)]
+    return _DECIMAL.sub("<num>", _TIMESTAMP.sub("<time>", "\n".join(lines)))
+
+def _chat_request(messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Canonical, JSON-safe form of one chat call.
+
+    Tool results are represented by their call id only and prompts by
+    `stable_prompt`: both carry live Mongo data (positions, timestamps), so
+    keying on them would make every replay miss. The prompt's wording and
+    the model's own tool calls still have to match.
+    """
+    return {
+        "messages": [
+            {"type": m.type, "content": None if isinstance(m, ToolMessage) else stable_prompt(m.content) if m.type == "human" else m.content,
+             "tool_calls": getattr(m, "tool_calls", None) or None, "tool_call_id": getattr(m, "tool_call_id", None)}
+            for m in messages
+        ],
+        "stop": stop,
+        "tools": [tool.get("function", {}).get("name") for tool in kwargs.get("tools") or []],
+        "tool_choice": kwargs.get("tool_choice")
+    }
+
+def _dump_result(result: ChatResult) -> Dict[str, Any]:
+    return {
+        "generations": [message_to_dict(generation.message) for generation in result.generations],
+        "llm_output": result.llm_output
+    }
+
+def _load_result(data: Dict[str, Any]) -> ChatResult:
+    return ChatResult(
+        generations=[ChatGeneration(message=message) for message in messages_from_dict(data["generations"])],
+        llm_output=data.get("llm_output")
+    )
+
+class _ToolBindingChatModel(BaseChatModel):
+    """Chat model that accepts `bind_tools` the way ChatOpenAI does (OpenAI tool schemas as a kwarg)"""
+
+    def bind_tools(self, tools: Sequence[Any], *, tool_choice: Optional[Any] = None, **kwargs: Any):
+        formatted = [convert_to_openai_tool(tool) for tool in tools]
+        if tool_choice:
+            kwargs["tool_choice"] = tool_choice
+        return self.bind(tools=formatted, **kwargs)
+
+class RecordReplayChatModel(_ToolBindingChatModel):
+    """Wraps a chat model: `record` passes calls through and saves them, `replay` answers from the cassette"""
+
+    inner: Optional[BaseChatModel] = Field(default=None, exclude=True)
+    cassette: Cassette = Field(exclude=True)
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    @property
+    def _llm_type(self) -> str:
+        return f"{self.cassette.mode}-chat"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        request = _chat_request(messages, stop, kwargs)
+        if self.cassette.mode == "replay":
+            return _load_result(self.cassette.replay("llm", request))
+        result = self.inner._generate(messages, stop=stop, **kwargs)
+        self.cassette.record("llm", request, _dump_result(result))
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        request = _chat_request(messages, stop, kwargs)
+        if self.cassette.mode == "replay":
+            return _load_result(self.cassette.replay("llm", request))
+        result = await self.inner._agenerate(messages, stop=stop, **kwargs)
+        self.cassette.record("llm", request, _dump_result(result))
+        return result
+
+class FakeChatModel(_ToolBindingChatModel):
+    """Deterministic offline stand-in for the agent LLM.
+
+    With `responses` it plays them back in order (strings become final
+    answers). Otherwise it follows a fixed script: the first turn calls each
+    of `tool_calls` that is bound, and the next turn answers with a summary of
+    what the tools returned. The position in the script is the number of
+    model turns already in the conversation, so concurrent runs each follow
+    it from the start. `latency_seconds` simulates model time and token usage
+    is estimated from text length, so timings and budgets behave like a real
+    run.
+    """
+
+    responses: List[Any] = Field(default_factory=list)
+    tool_calls: List[Tuple[str, Dict[str, Any]]] = Field(default_factory=lambda: [
+        ("mongodb_query", {"query_type": "get_recent_events"}),
+        ("mongodb_query", {"query_type": "detect_speed_anomalies"})
+    ])
+    latency_seconds: float = 0.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _next_message(self, messages: List[BaseMessage], kwargs: Dict[str, Any]) -> AIMessage:
+        index = sum(isinstance(m, AIMessage) for m in messages)
+        self.calls += 1
+        if index < len(self.responses):
+            response = self.responses[index]
+            return response if isinstance(response, AIMessage) else AIMessage(content=str(response))
+        bound = {tool.get("function", {}).get("name") for tool in kwargs.get("tools") or []}
+        tool_results = [m for m in messages if isinstance(m, ToolMessage)]
+        if not tool_results:
+            planned = [(name, args) for name, args in self.tool_calls if name in bound]
+            if planned:
+                return AIMessage(content="", tool_calls=[
+                    {"name": name, "args": args, "id": f"call_fake_{index}_{i}", "type": "tool_call"}
+                    for i, (name, args) in enumerate(planned)
+                ])
+        chars = sum(len(str(m.content)) for m in tool_results)
+        return AIMessage(content=f"Fake analysis: reviewed {len(tool_results)} tool results ({chars} characters). No live model was called.")
+
+    def _result(self, messages: List[BaseMessage], kwargs: Dict[str, Any]) -> ChatResult:
+        message = self._next_message(messages, kwargs)
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+        completion_tokens = len(str(message.content)) // 4 + 10 * len(message.tool_calls)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        return ChatResult(generations=[ChatGeneration(message=message)], llm_output={"token_usage": usage, "model_name": "fake"})
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return self._result(messages, kwargs)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return self._result(messages, kwargs)
@@ -0,0 +1,104 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+import numpy as np
+
+# Counters summed into a vessel's risk, as the map's heat layer does
+RISK_FIELDS = ["aisOff_count", "eventsInNoTakeMpas_count", "eventsInRfmoWithoutKnownAuthorization_count"]
+RISK_PROJECTION = {"_id": 0, "lat": 1, "lon": 1, **{field: 1 for field in RISK_FIELDS}}
+RISK_QUERY = {
+    "noEvents": {"$ne": True}, "lat": {"$type": "number"}, "lon": {"$type": "number"},
+    "$or": [{field: {"$gt": 0}} for field in RISK_FIELDS]
+}
+
+# Web Mercator stops at this latitude
+MAX_LATITUDE = 85.05112878
+
+@dataclass
+class GridLevel:
+    """Non-empty cells of one zoom level, as parallel arrays"""
+    x: np.ndarray
+    y: np.ndarray
+    risk: np.ndarray
+    vessels: np.ndarray
+    max_risk: np.ndarray
+
+def tile_cells(lat: np.ndarray, lon: np.ndarray, cell_zoom: int) -> np.ndarray:
+    """Slippy-map tile x/y at `cell_zoom` for every point, as an (n, 2) int64 array"""
+    n = 1 << cell_zoom
+    lat = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    x = np.floor((np.asarray(lon) + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.arcsinh(np.tan(lat)) / np.pi) / 2.0 * n)
+    return np.stack([np.clip(x, 0, n - 1), np.clip(y, 0, n - 1)], axis=1).astype(np.int64)
+
+def cell_centers(x: np.ndarray, y: np.ndarray, cell_zoom: int) -> np.ndarray:
+    """Latitude/longitude of the centre of each tile cell, as an (n, 2) array"""
+    n = 1 << cell_zoom
+    lon = (x + 0.5) / n * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * (y + 0.5) / n))))
+    return np.stack([lat, lon], axis=1)
+
+def _aggregate(x: np.ndarray, y: np.ndarray, risk: np.ndarray, vessels: np.ndarray, max_risk: np.ndarray) -> GridLevel:
+    cells, inverse = np.unique(np.stack([x, y], axis=1), axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    peak = np.zeros(len(cells))
+    np.maximum.at(peak, inverse, max_risk)
+    return GridLevel(
+        x=cells[:, 0], y=cells[:, 1],
+        risk=np.bincount(inverse, weights=risk, minlength=len(cells)),
+        vessels=np.bincount(inverse, weights=vessels, minlength=len(cells)).astype(np.int64),
+        max_risk=peak
+    )
+
+class RiskGrid:
+    """Vessel risk binned into a pyramid of map grid cells.
+
+    Zoom level z uses slippy-map tiles of zoom z + `cell_bits`, so every map
+    tile holds 2**cell_bits x 2**cell_bits cells whatever the zoom. The finest
+    level is binned from the vessels once; each coarser level halves the cell
+    indices of the one below and merges, as geohash prefixes do. Only
+    non-empty cells are stored.
+    """
+
+    def __init__(self, vessels: List[Dict[str, Any]], max_zoom: int = 12, cell_bits: int = 3):
+        self.max_zoom = max_zoom
+        self.cell_bits = cell_bits
+        self.levels: Dict[int, GridLevel] = {}
+        self._rows: Dict[int, List[List[Any]]] = {}
+        lat = np.array([v["lat"] for v in vessels], dtype=np.float64)
+        lon = np.array([v["lon"] for v in vessels], dtype=np.float64)
+        risk = np.array([sum(v.get(field) or 0 for field in RISK_FIELDS) for v in vessels], dtype=np.float64)
+        usable = np.isfinite(lat) & np.isfinite(lon) & (risk > 0)
+        lat, lon, risk = lat[usable], lon[usable], risk[usable]
+        self.vessel_count = int(usable.sum())
+        if not self.vessel_count:
+            return
+        cells = tile_cells(lat, lon, max_zoom + cell_bits)
+        level = _aggregate(cells[:, 0], cells[:, 1], risk, np.ones(len(risk)), risk)
+        self.levels[max_zoom] = level
+        for zoom in range(max_zoom - 1, -1, -1):
+            level = _aggregate(level.x >> 1, level.y >> 1, level.risk, level.vessels, level.max_risk)
+            self.levels[zoom] = level
+
+    def cells(self, zoom: int) -> Dict[str, Any]:
+        """Non-empty cells at `zoom` (clamped to the precomputed range) as compact rows"""
+        zoom = min(max(zoom, 0), self.max_zoom)
+        cell_zoom = zoom + self.cell_bits
+        level = self.levels.get(zoom)
+        if zoom not in self._rows:
+            rows: List[List[Any]] = []
+            if level is not None:
+                centers = np.round(cell_centers(level.x, level.y, cell_zoom), 5)
+                rows = [
+                    [lat, lon, risk, vessels, peak]
+                    for (lat, lon), risk, vessels, peak in zip(
+                        centers.tolist(), level.risk.tolist(), level.vessels.tolist(), level.max_risk.tolist()
+                    )
+                ]
+            self._rows[zoom] = rows
+        return {
+            "zoom": zoom,
+            "cell_zoom": cell_zoom,
+            "columns": ["lat", "lon", "riskScore", "vesselCount", "maxRisk"],
+            "cells": self._rows[zoom]
+        }
@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, IndexModel, UpdateMany, UpdateOne
+
+from models import AlertSeverity, AlertType
+
+# One document per UTC hour with alert counts, plus a coverage document
+ROLLUP_COLLECTION = "alert_rollups"
+COVERAGE_ID = "coverage"
+
+ROLLUP_INDEXES = [IndexModel([("hour", ASCENDING)], unique=True, name="hour_unique", partialFilterExpression={"hour": {"$exists": True}})]
+
+def hour_floor(dt: datetime) -> datetime:
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+def hour_ceil(dt: datetime) -> datetime:
+    floor = hour_floor(dt)
+    return floor if floor == dt else floor + timedelta(hours=1)
+
+def _utc(dt: datetime) -> datetime:
+    # Mongo hands back naive UTC datetimes unless the client is tz_aware
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+def empty_stats() -> Dict[str, Any]:
+    return {
+        "total": 0,
+        "by_severity": {severity.value: 0 for severity in AlertSeverity},
+        "by_type": {alert_type.value: 0 for alert_type in AlertType}
+    }
+
+def rollup_increment(alert: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Filter and update adding one newly inserted alert to its hour"""
+    hour = hour_floor(_utc(alert["timestamp"]))
+    # Enum members format as "AlertSeverity.HIGH"; the field path needs the value
+    severity = getattr(alert["severity"], "value", alert["severity"])
+    alert_type = getattr(alert["alert_type"], "value", alert["alert_type"])
+    return {"hour": hour}, {"$inc": {"total": 1, f"by_severity.{severity}": 1, f"by_type.{alert_type}": 1}}
+
+def coverage_update(since: datetime) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Record that every hour from `since` on is counted; coverage only ever extends backwards"""
+    return {"_id": COVERAGE_ID}, {"$min": {"since": since}}
+
+def first_counted_hour(now: datetime) -> datetime:
+    """A writer starting now has missed earlier alerts of the current hour, so coverage starts at the next one"""
+    return hour_ceil(now)
+
+def _add(stats: Dict[str, Any], total: int, by_severity: Dict[str, int], by_type: Dict[str, int]) -> None:
+    stats["total"] += total
+    for key, count in (by_severity or {}).items():
+        stats["by_severity"][key] = stats["by_severity"].get(key, 0) + count
+    for key, count in (by_type or {}).items():
+        stats["by_type"][key] = stats["by_type"].get(key, 0) + count
+
+def facet_pipeline(start: datetime, end: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Totals, severities and types of raw alerts in [start, end) in a single pass"""
+    window: Dict[str, Any] = {"$gte": start}
+    if end is not None:
+        window["$lt"] = end
+    return [
+        {"$match": {"timestamp": window}},
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "by_severity": [{"$group": {"_id": "$severity", "count": {"$sum": 1}}}],
+            "by_type": [{"$group": {"_id": "$alert_type", "count": {"$sum": 1}}}]
+        }}
+    ]
+
+async def _raw_stats(alerts, start: datetime, end: Optional[datetime] = None) -> Dict[str, Any]:
+    result = (await (await alerts.aggregate(facet_pipeline(start, end))).to_list() or [{}])[0]
+    stats = empty_stats()
+    _add(
+        stats,
+        result["total"][0]["count"] if result.get("total") else 0,
+        {row["_id"]: row["count"] for row in result.get("by_severity", []) if row["_id"]},
+        {row["_id"]: row["count"] for row in result.get("by_type", []) if row["_id"]}
+    )
+    return stats
+
+async def alert_stats(db, start: datetime, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Alert counts since `start`.
+
+    Whole hours that the rollups cover are summed from `alert_rollups`, so
+    the cost grows with the number of hours rather than the number of alerts.
+    The partial hour at the start of the window, and any hours before the
+    rollups' coverage, are counted from `ship_alerts` with one $facet query.
+    """
+    now = now or datetime.now(timezone.utc)
+    rollups = db[ROLLUP_COLLECTION]
+    coverage = await rollups.find_one({"_id": COVERAGE_ID})
+    if coverage is None:
+        stats = await _raw_stats(db.ship_alerts, start)
+        stats["source"] = {"rollup_hours": 0, "raw_until": None}
+        return stats
+
+    rollup_from = max(hour_ceil(start), _utc(coverage["since"]))
+    stats = empty_stats()
+    if start < rollup_from:
+        raw = await _raw_stats(db.ship_alerts, start, min(rollup_from, now))
+        _add(stats, raw["total"], raw["by_severity"], raw["by_type"])
+    hours = await rollups.find(
+        {"hour": {"$gte": rollup_from, "$lte": now}}, {"_id": 0, "total": 1, "by_severity": 1, "by_type": 1}
+    ).to_list()
+    for hour in hours:
+        _add(stats, hour.get("total", 0), hour.get("by_severity"), hour.get("by_type"))
+    stats["source"] = {"rollup_hours": len(hours), "raw_until": min(rollup_from, now).isoformat() if start < rollup_from else None}
+    return stats
+
+async def backfill_rollups(db, start: datetime, now: Optional[datetime] = None) -> int:
+    """Recount every hour from `start` up to the rollups' current coverage from raw alerts.
+
+    Hours are overwritten rather than incremented, so it is safe to rerun.
+    An alert inserted into one of those hours while the backfill runs may be
+    lost from the rollup; the window is the current hour at most.
+    """
+    now = now or datetime.now(timezone.utc)
+    rollups = db[ROLLUP_COLLECTION]
+    await rollups.create_indexes(ROLLUP_INDEXES)
+    start = hour_floor(start)
+    coverage = await rollups.find_one({"_id": COVERAGE_ID})
+    until = _utc(coverage["since"]) if coverage else first_counted_hour(now)
+    if start >= until:
+        return 0
+    grouped = await (await db.ship_alerts.aggregate([
+        {"$match": {"timestamp": {"$gte": start, "$lt": until}}},
+        {"$group": {
+            "_id": {
+                "year": {"$year": "$timestamp"}, "month": {"$month": "$timestamp"},
+                "day": {"$dayOfMonth": "$timestamp"}, "hour": {"$hour": "$timestamp"},
+                "severity": "$severity", "alert_type": "$alert_type"
+            },
+            "count": {"$sum": 1}
+        }}
+    ])).to_list()
+
+    hours: Dict[datetime, Dict[str, Any]] = {}
+    for row in grouped:
+        key = row["_id"]
+        hour = datetime(key["year"], key["month"], key["day"], key["hour"], tzinfo=timezone.utc)
+        stats = hours.setdefault(hour, empty_stats())
+        _add(stats, row["count"], {key["severity"]: row["count"]}, {key["alert_type"]: row["count"]})
+
+    writes = [UpdateOne({"hour": hour}, {"$set": stats}, upsert=True) for hour, stats in hours.items()]
+    # Hours without alerts must not keep counts from an earlier run
+    writes.append(UpdateMany(
+        {"hour": {"$gte": start, "$lt": until, "$nin": list(hours)}}, {"$set": empty_stats()}
+    ))
+    await rollups.bulk_write(writes, ordered=False)
+    await rollups.update_one(*coverage_update(start), upsert=True)
+    return len(hours)
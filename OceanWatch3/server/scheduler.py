@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Job:
+    name: str
+    func: Callable[[], Awaitable[Any]]
+    interval_seconds: float
+    time_budget_seconds: float
+    # Lower runs first when several jobs are due at once
+    priority: int = 0
+    next_run: float = 0.0
+    running: bool = False
+    stats: Dict[str, Any] = field(default_factory=lambda: {
+        "runs": 0, "succeeded": 0, "failed": 0, "timed_out": 0, "skipped_overlap": 0,
+        "last_started": None, "last_duration_seconds": None, "last_error": None
+    })
+
+class MonitorScheduler:
+    """Runs independent periodic async jobs.
+
+    Every job has its own interval and a time budget enforced with
+    `asyncio.wait_for`. A job that is still running when it comes due again is
+    skipped rather than stacked. Due jobs start in priority order, and at most
+    `max_concurrent_jobs` run at a time.
+    """
+
+    def __init__(self, max_concurrent_jobs: int = 2):
+        self.jobs: Dict[str, Job] = {}
+        self._slots = asyncio.Semaphore(max(1, max_concurrent_jobs))
+        self._tasks: Set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+
+    def add_job(self, name: str, func: Callable[[], Awaitable[Any]], interval_seconds: float,
+                time_budget_seconds: Optional[float] = None, priority: int = 0, run_immediately: bool = True) -> Job:
+        job = Job(
+            name=name,
+            func=func,
+            interval_seconds=interval_seconds,
+            time_budget_seconds=time_budget_seconds or interval_seconds,
+            priority=priority,
+            next_run=time.monotonic() if run_immediately else time.monotonic() + interval_seconds
+        )
+        self.jobs[name] = job
+        return job
+
+    def _dispatch_due(self, now: float) -> None:
+        for job in sorted(self.jobs.values(), key=lambda j: (j.priority, j.next_run)):
+            if job.next_run > now:
+                continue
+            job.next_run = now + job.interval_seconds
+            if job.running:
+                job.stats["skipped_overlap"] += 1
+                logger.warning(f"Skipping {job.name}: previous run still in progress")
+                continue
+            job.running = True
+            task = asyncio.create_task(self._run(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job: Job) -> None:
+        try:
+            async with self._slots:
+                started = time.monotonic()
+                job.stats["runs"] += 1
+                job.stats["last_started"] = datetime.now(timezone.utc).isoformat()
+                try:
+                    await asyncio.wait_for(job.func(), timeout=job.time_budget_seconds)
+                    job.stats["succeeded"] += 1
+                    job.stats["last_error"] = None
+                except asyncio.TimeoutError:
+                    job.stats["timed_out"] += 1
+                    job.stats["last_error"] = f"exceeded time budget of {job.time_budget_seconds:g}s"
+                    logger.warning(f"{job.name} exceeded its {job.time_budget_seconds:g}s budget")
+                except Exception as e:
+                    job.stats["failed"] += 1
+                    job.stats["last_error"] = str(e)
+                    logger.error(f"{job.name} failed: {e}")
+                job.stats["last_duration_seconds"] = round(time.monotonic() - started, 3)
+        finally:
+            job.running = False
+
+    async def run_forever(self) -> None:
+        """Dispatch due jobs until `stop` is called; running jobs are cancelled on exit"""
+        self._stopping.clear()
+        try:
+            while not self._stopping.is_set():
+                now = time.monotonic()
+                self._dispatch_due(now)
+                next_due = min((job.next_run for job in self.jobs.values()), default=now + 1.0)
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=max(0.05, next_due - time.monotonic()))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in list(self._tasks):
+                task.cancel()
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [
+            {
+                "name": job.name,
+                "priority": job.priority,
+                "interval_seconds": job.interval_seconds,
+                "time_budget_seconds": job.time_budget_seconds,
+                "running": job.running,
+                "next_run_in_seconds": round(max(0.0, job.next_run - now), 1),
+                **job.stats
+            }
+            for job in sorted(self.jobs.values(), key=lambda j: j.priority)
+        ]
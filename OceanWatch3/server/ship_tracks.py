@@ -0,0 +1,107 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+# Tracks come from the map's event documents (latitude, longitude, event_end or timestamp)
+TRACK_PROJECTION = {"_id": 0, "latitude": 1, "longitude": 1, "timestamp": 1, "event_end": 1, "event_type": 1}
+TRACK_SORT = [("event_end", ASCENDING), ("timestamp", ASCENDING)]
+TRACK_INDEXES = [
+    IndexModel([("vessel_id", ASCENDING), ("event_end", ASCENDING), ("timestamp", ASCENDING)], name="vessel_track_order"),
+    IndexModel([("vessel_id", ASCENDING), ("_id", DESCENDING)], name="vessel_latest_event")
+]
+MAX_ZOOM = 22
+
+def _iso(value: Any) -> Optional[str]:
+    if isinstance(value, datetime):
+        # Mongo hands back naive UTC datetimes; without an offset browsers would read local time
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).isoformat()
+    return str(value) if value else None
+
+def _epoch(value: Any) -> float:
+    """Sort key like the client's Date.parse, with unknown times first"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return 0.0
+    if isinstance(value, datetime):
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+    return 0.0
+
+def track_points(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Track points in time order, dropping events without usable coordinates"""
+    points, keys = [], []
+    for event in events:
+        try:
+            lat, lon = float(event.get("latitude")), float(event.get("longitude"))
+        except (TypeError, ValueError):
+            continue
+        if not (np.isfinite(lat) and np.isfinite(lon)):
+            continue
+        time = event.get("event_end") or event.get("timestamp")
+        point = {"lat": lat, "lon": lon}
+        iso = _iso(time)
+        # The client's TrackPoint guard accepts a missing `t` but not null
+        if iso:
+            point["t"] = iso
+        if isinstance(event.get("event_type"), str):
+            point["type"] = event["event_type"]
+        points.append(point)
+        keys.append(_epoch(time))
+    # The index order only differs when some events lack event_end; the stable sort is linear otherwise
+    order = sorted(range(len(points)), key=keys.__getitem__)
+    return [points[i] for i in order]
+
+def zoom_tolerance(zoom: int, pixels: float = 1.0) -> float:
+    """Degrees covered by `pixels` screen pixels at a web-map zoom level (256 px tiles)"""
+    return pixels * 360.0 / (256 * 2 ** zoom)
+
+def douglas_peucker(lat: np.ndarray, lon: np.ndarray, tolerance: float) -> np.ndarray:
+    """Indices of the points kept by Douglas-Peucker at `tolerance` degrees.
+
+    Iterative, with each segment's point distances computed in one numpy
+    pass, so long tracks neither recurse deeply nor loop per point in Python.
+    """
+    count = len(lat)
+    if count <= 2 or tolerance <= 0:
+        return np.arange(count)
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        x, y = lon[start + 1:end], lat[start + 1:end]
+        dx, dy = lon[end] - lon[start], lat[end] - lat[start]
+        length = np.hypot(dx, dy)
+        if length == 0:
+            distances = np.hypot(x - lon[start], y - lat[start])
+        else:
+            distances = np.abs(dy * (x - lon[start]) - dx * (y - lat[start])) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            index = start + 1 + farthest
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+    return np.flatnonzero(keep)
+
+def simplify(points: List[Dict[str, Any]], tolerance: float) -> List[Dict[str, Any]]:
+    if len(points) <= 2 or tolerance <= 0:
+        return points
+    lat = np.fromiter((point["lat"] for point in points), dtype=np.float64, count=len(points))
+    lon = np.fromiter((point["lon"] for point in points), dtype=np.float64, count=len(points))
+    return [points[i] for i in douglas_peucker(lat, lon, tolerance)]
+
+async def track_version(events, vessel_id: str) -> Tuple[int, Any]:
+    """Event count and newest event _id of a vessel; changes when events are added or removed"""
+    count = await events.count_documents({"vessel_id": vessel_id})
+    latest = await events.find_one({"vessel_id": vessel_id}, {"_id": 1}, sort=[("_id", DESCENDING)])
+    return count, latest["_id"] if latest else None
+
+async def load_track(events, vessel_id: str) -> List[Dict[str, Any]]:
+    docs = await events.find({"vessel_id": vessel_id}, TRACK_PROJECTION).sort(TRACK_SORT).to_list()
+    return track_points(docs)
@@ -0,0 +1,70 @@
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from detection import VESSEL_TYPE_PROJECTION, vessel_type_from_doc
+
+# Fields /ships may return; flag and vessel_type are derived from the GFW details when not set directly
+SHIP_FIELDS = [
+    "vessel_id", "name", "flag", "vessel_type", "risk_score", "updated_at",
+    "events_count", "events_counts_by_dataset", "insights", "details"
+]
+SHIP_LIST_FIELDS = ["vessel_id", "name", "flag", "vessel_type", "risk_score", "updated_at"]
+
+SHIP_SORTS: Dict[str, List[Tuple[str, int]]] = {
+    "vessel_id": [("vessel_id", ASCENDING)],
+    "risk": [("risk_score", DESCENDING), ("vessel_id", ASCENDING)]
+}
+
+SHIP_INDEXES = [IndexModel([("risk_score", DESCENDING), ("vessel_id", ASCENDING)], name="risk_vessel")]
+
+# Stored fields each returned field is computed from
+_SOURCE_FIELDS = {
+    "flag": ["flag", "details.self_reported_info.flag"],
+    "vessel_type": [field for field in VESSEL_TYPE_PROJECTION if field != "_id"]
+}
+# Fields a type filter matches; any of the GFW shiptypes counts
+_TYPE_FIELDS = ["vessel_type", "type", "details.combined_sources_info.shiptypes.name"]
+
+def ship_flag(doc: Dict[str, Any]) -> Optional[str]:
+    """Flag of a gfw_ships document (`flag` or the first self-reported one)"""
+    flag = doc.get("flag")
+    if not flag:
+        reported = (doc.get("details") or {}).get("self_reported_info") or []
+        flag = next((info.get("flag") for info in reported if info.get("flag")), None)
+    return flag
+
+def ship_projection(fields: Sequence[str]) -> Dict[str, int]:
+    """Mongo projection fetching everything needed to build `fields`"""
+    stored = {source for field in fields for source in _SOURCE_FIELDS.get(field, [field])}
+    if "details" in stored:
+        # Mongo rejects a projection holding both a path and one of its sub-paths
+        stored = {field for field in stored if not field.startswith("details.")}
+    return {"_id": 0, **{field: 1 for field in sorted(stored)}}
+
+def ship_row(doc: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    derived = {"flag": ship_flag, "vessel_type": vessel_type_from_doc}
+    return {field: derived[field](doc) if field in derived else doc.get(field) for field in fields}
+
+def ship_filter(flag: Optional[str] = None, vessel_type: Optional[str] = None,
+                min_risk: Optional[float] = None, max_risk: Optional[float] = None) -> Dict[str, Any]:
+    """gfw_ships query for the /ships filters; flag and type match case-insensitively"""
+    clauses: List[Dict[str, Any]] = []
+    if flag:
+        flag = flag.strip().upper()
+        # Same precedence as ship_flag: the self-reported flag only counts when `flag` is unset
+        clauses.append({"$or": [{"flag": flag}, {"flag": {"$in": [None, ""]}, "details.self_reported_info.flag": flag}]})
+    if vessel_type:
+        pattern = {"$regex": f"^{re.escape(vessel_type.strip())}$", "$options": "i"}
+        clauses.append({"$or": [{field: pattern} for field in _TYPE_FIELDS]})
+    if min_risk is not None or max_risk is not None:
+        risk: Dict[str, Any] = {"$type": "number"}
+        if min_risk is not None:
+            risk["$gte"] = min_risk
+        if max_risk is not None:
+            risk["$lte"] = max_risk
+        clauses.append({"risk_score": risk})
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
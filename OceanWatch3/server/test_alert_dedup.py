@@ -0,0 +1,98 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from config import config
+from fake_mongo import FakeDatabase
+from models import AlertSeverity
+from ship_monitor_agent import AlertGeneratorTool
+
+ALERT = {"ship_id": "v1", "alert_type": "loitering", "description": "Loitering", "reasoning": "Dwell of 3h"}
+
+@pytest.fixture
+def db():
+    return FakeDatabase(unique={"ship_alerts": ["dedup_key"], "alert_rollups": ["hour"]})
+
+def tool(db, use_async=False, written=None):
+    # model_construct skips the Database isinstance check so the fake can stand in
+    generator = AlertGeneratorTool.model_construct(db=db, async_db=db.asynchronous() if use_async else None)
+    if written is not None:
+        generator._on_write = written.append
+    return generator
+
+def generate(generator, use_async=False, **fields):
+    arguments = {**ALERT, "severity": "medium", **fields}
+    if use_async:
+        return asyncio.run(generator._arun(**arguments))
+    return generator._run(**arguments)
+
+def test_dedup_key_buckets_ship_type_cell_and_window(db, monkeypatch):
+    monkeypatch.setattr(config, "ALERT_SUPPRESSION_WINDOW_MINUTES", 60)
+    monkeypatch.setattr(config, "ALERT_DEDUP_CELL_DEGREES", 0.5)
+    location = {"latitude": 1.2, "longitude": -3.7, "timestamp": datetime(2026, 1, 1, tzinfo=timezone.utc)}
+    alert = tool(db)._build_alert(severity="high", location=location, **ALERT)
+    bucket = int(alert.timestamp.timestamp() // 3600)
+    assert alert.dedup_key == f"v1|loitering|2:-8|{bucket}"
+    assert tool(db)._build_alert(severity="high", **ALERT).dedup_key == f"v1|loitering|-|{bucket}"
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_repeats_merge_into_one_alert(db, use_async):
+    written = []
+    generator = tool(db, use_async, written)
+    first = generate(generator, use_async)
+    second = generate(generator, use_async)
+    assert first.startswith("Alert generated successfully")
+    assert second.startswith("Duplicate alert suppressed") and "occurrences: 2" in second
+    [stored] = db.ship_alerts.docs
+    assert stored["occurrences"] == 2 and stored["last_seen"] >= stored["timestamp"]
+    assert written == ["v1", "v1"]
+    # Only the first sighting is a new alert for the hourly rollups
+    [hour] = [doc for doc in db.alert_rollups.docs if "hour" in doc]
+    assert hour["total"] == 1
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_more_severe_repeat_escalates(db, use_async):
+    generator = tool(db, use_async)
+    generate(generator, use_async, severity="medium")
+    generate(generator, use_async, severity="critical", description="Loitering in an MPA", evidence=["inside MPA"])
+    generate(generator, use_async, severity="low", description="Brief stop")
+    [stored] = db.ship_alerts.docs
+    assert stored["occurrences"] == 3
+    assert stored["severity"] == AlertSeverity.CRITICAL
+    assert stored["description"] == "Loitering in an MPA" and stored["evidence"] == ["inside MPA"]
+
+def test_escalation_only_for_more_severe_repeats(db):
+    alert = tool(db)._build_alert(severity="high", **ALERT)
+    assert AlertGeneratorTool._escalation(alert, {"severity": "critical"}) is None
+    assert AlertGeneratorTool._escalation(alert, {"severity": "high"}) is None
+    query, update = AlertGeneratorTool._escalation(alert, {"severity": "low"})
+    assert sorted(query["severity"]["$in"]) == ["low", "medium"]
+    assert update["$set"]["severity"] == "high"
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_lost_upsert_race_merges_into_the_winner(db, use_async):
+    generator = tool(db, use_async)
+    alert = generator._build_alert(severity="medium", **ALERT)
+
+    def competing_insert(query):
+        # Another writer inserts the same dedup_key between our match and our insert
+        db.ship_alerts.insert({**alert.model_dump(exclude={"occurrences"}), "alert_id": "winner", "occurrences": 1})
+
+    db.ship_alerts.before_write = competing_insert
+    result = generate(generator, use_async)
+    assert result == "Duplicate alert suppressed: merged into winner (occurrences: 2)"
+    assert len(db.ship_alerts.docs) == 1
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_rollup_failure_does_not_fail_the_stored_alert(db, use_async):
+    written = []
+    generator = tool(db, use_async, written)
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("rollups unavailable")
+
+    db.alert_rollups.update_one = broken
+    result = generate(generator, use_async)
+    assert result.startswith("Alert generated successfully")
+    assert len(db.ship_alerts.docs) == 1 and written == ["v1"]
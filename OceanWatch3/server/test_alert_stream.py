@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from alert_stream import AlertStream, alert_filter, event_id, filter_matches
+from fake_mongo import AsyncFakeCollection, FakeCollection
+from models import AlertSeverity, AlertType
+
+T0 = datetime(2026, 3, 10, 12, 0, tzinfo=timezone.utc)
+
+def alert(n, minutes=0.0, severity="high", alert_type="zone_entry", ship_id="s1"):
+    return {"_id": n, "alert_id": f"a{n}", "timestamp": T0 + timedelta(minutes=minutes),
+            "severity": severity, "alert_type": alert_type, "ship_id": ship_id}
+
+def stream(docs=(), **kwargs):
+    collection = FakeCollection(list(docs))
+    return collection, AlertStream(AsyncFakeCollection(collection), ["alert_id", "severity", "timestamp"], **kwargs)
+
+def drain(queue):
+    items = []
+    while not queue.empty():
+        items.append(queue.get_nowait())
+    return items
+
+def test_filters_parse_comma_separated_values():
+    assert alert_filter() == {}
+    assert alert_filter(severity="high, critical,", ship_id="s1") == {"severity": {"high", "critical"}, "ship_id": {"s1"}}
+
+def test_filters_match_enums_and_strings():
+    filters = alert_filter(severity="high,critical", alert_type="zone_entry")
+    assert filter_matches(filters, alert(1))
+    assert filter_matches(filters, {**alert(1), "severity": AlertSeverity.CRITICAL, "alert_type": AlertType.ZONE_ENTRY})
+    assert not filter_matches(filters, alert(1, severity="low"))
+    assert not filter_matches(filters, {"severity": "high"})
+    assert filter_matches({}, {})
+
+def test_replay_resumes_after_the_event_in_order():
+    # Out of insertion order and with a timestamp tie, as concurrent writers leave them
+    docs = [alert(3, 2), alert(1, 0), alert(4, 2, severity="low"), alert(2, 1), alert(5, 3)]
+    _, alerts = stream(docs)
+
+    async def run():
+        after = event_id(alert(1, 0))
+        everything = await alerts.replay(after, {}, limit=10)
+        high = await alerts.replay(after, alert_filter(severity="high"), limit=10)
+        capped = await alerts.replay(after, {}, limit=2)
+        return everything, high, capped
+
+    everything, high, capped = asyncio.run(run())
+    assert [doc["_id"] for doc in everything[0]] == [2, 3, 4, 5] and not everything[1]
+    assert [doc["_id"] for doc in high[0]] == [2, 3, 5]
+    assert [doc["_id"] for doc in capped[0]] == [2, 3] and capped[1]
+
+def test_slow_subscribers_are_dropped_with_an_end_marker():
+    _, alerts = stream(poll_seconds=60, queue_max=2)
+
+    async def run():
+        slow = alerts.subscribe({})
+        picky = alerts.subscribe(alert_filter(severity="critical"))
+        for n in range(3):
+            alerts._publish(alert(n, n))
+        alerts._publish(alert(9, 9, severity="critical"))
+        snapshot = alerts.snapshot()
+        await alerts.close()
+        return slow, picky, snapshot
+
+    slow, picky, snapshot = asyncio.run(run())
+    assert slow.dropped and drain(slow.queue) == [None]
+    assert not picky.dropped and [doc["_id"] for doc in drain(picky.queue)] == [9]
+    assert snapshot["subscribers"] == 1 and snapshot["dropped_subscribers"] == 1 and snapshot["delivered"] == 3
+
+def test_poll_fallback_catches_late_writes_inside_the_overlap_once():
+    collection, alerts = stream([alert(1, 0)], poll_seconds=60, overlap_seconds=5)
+
+    async def run():
+        subscription = alerts.subscribe({})
+        await asyncio.sleep(0.05)
+        # Within the overlap of the newest alert, outside it, and a newer one
+        collection.insert(alert(2, -3 / 60))
+        collection.insert(alert(3, -10 / 60))
+        collection.insert(alert(4, 1))
+        for _ in range(2):
+            alerts.notify()
+            await asyncio.sleep(0.05)
+        source = alerts.source
+        await alerts.close()
+        return source, drain(subscription.queue)
+
+    source, received = asyncio.run(run())
+    assert source == "poll"
+    # The alert already stored when the stream started is history, and nothing is sent twice
+    assert [doc["_id"] for doc in received] == [2, 4]
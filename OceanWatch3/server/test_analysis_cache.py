@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+import ship_monitor_agent
+from replay import FakeChatModel
+
+@pytest.fixture
+def agent(monkeypatch):
+    # Clients connect lazily, so nothing is contacted as long as no query runs
+    monkeypatch.setattr(ship_monitor_agent, "MONGODB_URI", "mongodb://localhost:27017")
+    agent = ship_monitor_agent.ShipMonitorAgent(llm=FakeChatModel())
+    versions = {"A": (1,), "B": (1,)}
+    runs = []
+
+    async def analysis_version(ship_id):
+        return versions[ship_id]
+
+    async def run_budgeted(prompt, tracer=None):
+        runs.append(prompt)
+        await asyncio.sleep(0.01)
+        return f"analysis {len(runs)}", 100
+
+    monkeypatch.setattr(agent, "_analysis_version", analysis_version)
+    monkeypatch.setattr(agent, "_run_budgeted", run_budgeted)
+    agent.versions, agent.runs = versions, runs
+    yield agent
+    agent.client.close()
+
+def test_analysis_is_reused_until_the_ship_changes(agent):
+    async def scenario():
+        first = await agent._analyze_ship("A")
+        again = await agent._analyze_ship("A")
+        agent.versions["A"] = (2,)
+        changed = await agent._analyze_ship("A")
+        return first, again, changed
+
+    first, again, changed = asyncio.run(scenario())
+    assert not first["cached"] and again["cached"] and not changed["cached"]
+    assert again["analysis"] == first["analysis"] != changed["analysis"]
+    assert len(agent.runs) == 2
+
+def test_stored_alert_invalidates_the_ship(agent):
+    async def scenario():
+        await agent._analyze_ship("A")
+        await agent._analyze_ship("B")
+        agent._alert_written("A")
+        return await agent._analyze_ship("A"), await agent._analyze_ship("B")
+
+    a, b = asyncio.run(scenario())
+    assert not a["cached"] and b["cached"]
+    assert len(agent.runs) == 3
+
+def test_concurrent_analyses_of_one_ship_share_a_run(agent):
+    async def scenario():
+        return await asyncio.gather(*(agent._analyze_ship("A") for _ in range(4)))
+
+    results = asyncio.run(scenario())
+    assert len({result["analysis"] for result in results}) == 1
+    assert len(agent.runs) == 1
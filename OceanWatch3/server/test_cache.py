@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+import cache
+from cache import SWRCache
+
+def counting_loader(results, delay=0.0):
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        result = results[min(len(calls), len(results)) - 1]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return load, calls
+
+def test_fresh_entry_is_served_without_loading():
+    async def scenario():
+        store = SWRCache(ttl_seconds=60)
+        load, calls = counting_loader(["a", "b"])
+        assert await store.get_or_load("k", load) == "a"
+        assert await store.get_or_load("k", load) == "a"
+        return calls, store.stats
+
+    calls, stats = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert stats["misses"] == 1 and stats["hits"] == 1
+
+def test_concurrent_misses_share_one_load():
+    async def scenario():
+        store = SWRCache(ttl_seconds=60)
+        load, calls = counting_loader(["a"], delay=0.01)
+        values = await asyncio.gather(*(store.get_or_load("k", load) for _ in range(5)))
+        return values, calls, store.stats
+
+    values, calls, stats = asyncio.run(scenario())
+    assert values == ["a"] * 5
+    assert len(calls) == 1 and stats["coalesced"] == 4
+
+def test_cancelled_caller_does_not_fail_coalesced_waiters():
+    async def scenario():
+        store = SWRCache(ttl_seconds=60)
+        load, calls = counting_loader(["a"], delay=0.05)
+        first = asyncio.create_task(store.get_or_load("k", load))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(store.get_or_load("k", load))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        value = await second
+        return first, value, calls, store.peek("k")
+
+    first, value, calls, cached = asyncio.run(scenario())
+    assert first.cancelled()
+    assert value == "a" and cached == "a" and len(calls) == 1
+
+def test_errors_propagate_and_are_not_cached():
+    async def scenario():
+        store = SWRCache(ttl_seconds=60)
+        load, calls = counting_loader([ValueError("boom"), "a"])
+        with pytest.raises(ValueError):
+            await store.get_or_load("k", load)
+        return await store.get_or_load("k", load), store.stats
+
+    value, stats = asyncio.run(scenario())
+    assert value == "a" and stats["errors"] == 1
+
+def test_stale_entry_is_served_while_refreshing(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: clock[0])
+
+    async def scenario():
+        store = SWRCache(ttl_seconds=10, stale_seconds=10)
+        load, calls = counting_loader(["old", "new"])
+        await store.get_or_load("k", load)
+        clock[0] += 15
+        stale = await store.get_or_load("k", load)
+        await asyncio.gather(*store._refreshes)
+        return stale, store.peek("k"), store.stats
+
+    stale, refreshed, stats = asyncio.run(scenario())
+    assert stale == "old" and refreshed == "new"
+    assert stats["stale_hits"] == 1 and stats["refreshes"] == 1
+
+def test_least_recently_used_entry_is_evicted():
+    store = SWRCache(ttl_seconds=60, max_entries=2)
+    store.set("a", 1)
+    store.set("b", 2)
+    store.get_fresh("a")
+    store.set("c", 3)
+    assert store.peek("a") == 1 and store.peek("b") is None and store.peek("c") == 3
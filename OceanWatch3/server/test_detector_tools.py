@@ -0,0 +1,34 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from config import config
+from fake_mongo import FakeDatabase
+from ship_monitor_agent import MongoDBTool
+
+DETECTORS = ["detect_loitering", "detect_encounters", "detect_speed_anomalies", "detect_gaps", "detect_port_calls"]
+
+def tool(db, use_async=False):
+    # model_construct skips the Database isinstance check so the fake can stand in
+    return MongoDBTool.model_construct(db=db, async_db=db.asynchronous() if use_async else None)
+
+def run(mongodb_tool, query_type, use_async):
+    if use_async:
+        return asyncio.run(mongodb_tool._arun(query_type))
+    return mongodb_tool._run(query_type)
+
+@pytest.mark.parametrize("use_async", [False, True])
+@pytest.mark.parametrize("query_type", DETECTORS)
+def test_empty_positions_collection_is_reported_as_missing_data(query_type, use_async):
+    result = run(tool(FakeDatabase(), use_async), query_type, use_async)
+    assert result.startswith(f"No vessel positions stored in {config.POSITIONS_COLLECTION}")
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_quiet_window_still_reports_zero_detections(use_async):
+    db = FakeDatabase()
+    # Positions exist, just not in the scanned window
+    db[config.POSITIONS_COLLECTION].insert({
+        "vessel_id": "v1", "timestamp": datetime.now(timezone.utc) - timedelta(days=3), "lat": 1.0, "lon": 1.0
+    })
+    assert run(tool(db, use_async), "detect_loitering", use_async) == "Detected 0 loitering candidates in the last 12 hours"
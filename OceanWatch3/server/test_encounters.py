@@ -0,0 +1,51 @@
+import itertools
+import random
+from datetime import datetime, timedelta, timezone
+
+from detection import EncounterDetector, SphereGrid, TrackPoint, haversine_km
+from models import AlertType
+
+START = datetime(2024, 5, 1, tzinfo=timezone.utc)
+
+def test_sphere_grid_pairs_match_brute_force():
+    rng = random.Random(7)
+    points = {f"v{i}": (rng.uniform(59.9, 60.1), rng.uniform(179.8, 180.2) % 360 - 180) for i in range(300)}
+    grid = SphereGrid(1.0)
+    for vessel_id, (lat, lon) in points.items():
+        grid.insert(vessel_id, lat, lon)
+    found = {frozenset((a, b)) for a, b, _ in grid.pairs_within(1.0)}
+    expected = {
+        frozenset((a, b)) for a, b in itertools.combinations(points, 2)
+        if haversine_km(*points[a], *points[b]) <= 1.0
+    }
+    assert len(grid) == 300 and found == expected
+
+def test_sphere_grid_within_is_nearest_first():
+    grid = SphereGrid(5.0)
+    grid.insert("far", 0.0, 0.04)
+    grid.insert("near", 0.0, 0.01)
+    grid.insert("out", 0.0, 1.0)
+    assert [item for item, _ in grid.within(0.0, 0.0, 5.0)] == ["near", "far"]
+
+def paired_tracks(hours, separation_deg=0.001, step=timedelta(minutes=10)):
+    count = int(hours * 6) + 1
+    return {
+        "a": [TrackPoint(10.0, 20.0, START + step * i) for i in range(count)],
+        "b": [TrackPoint(10.0, 20.0 + separation_deg, START + step * i + timedelta(minutes=1)) for i in range(count)]
+    }
+
+def test_sustained_proximity_reports_both_vessels_once():
+    candidates = EncounterDetector(max_distance_km=0.5, min_duration=timedelta(hours=2)).detect(paired_tracks(4))
+    assert sorted(c.ship_id for c in candidates) == ["a", "b"]
+    assert all(c.alert_type == AlertType.ENCOUNTER for c in candidates)
+    assert candidates[0].details["other_vessel_id"] == candidates[1].ship_id
+
+def test_brief_or_distant_pairs_are_not_encounters():
+    detector = EncounterDetector(max_distance_km=0.5, min_duration=timedelta(hours=2))
+    assert detector.detect(paired_tracks(1)) == []
+    assert detector.detect(paired_tracks(4, separation_deg=0.1)) == []
+
+def test_stale_positions_do_not_keep_a_pair_alive():
+    tracks = paired_tracks(4)
+    tracks["b"] = tracks["b"][:3]
+    assert EncounterDetector(min_duration=timedelta(hours=2)).detect(tracks) == []
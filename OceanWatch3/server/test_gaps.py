@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+
+from detection import GapDetector, TrackBatch, TrackPoint, parse_thresholds, reappearances, vessel_type_from_doc
+from models import AlertSeverity, AlertType
+
+NOW = datetime(2024, 5, 2, tzinfo=timezone.utc)
+
+def track(hours_ago):
+    return [TrackPoint(5.0, 5.0 + 0.01 * i, NOW - timedelta(hours=h)) for i, h in enumerate(hours_ago)]
+
+def test_parse_thresholds():
+    assert parse_thresholds("Fishing:180, cargo:720,,bad") == {"fishing": timedelta(hours=3), "cargo": timedelta(hours=12)}
+
+def test_vessel_type_from_doc():
+    assert vessel_type_from_doc({"vessel_type": "Cargo"}) == "cargo"
+    gfw = {"details": {"combined_sources_info": [{"shiptypes": [{"name": "OTHER"}, {"name": "FISHING"}]}]}}
+    assert vessel_type_from_doc(gfw) == "fishing"
+    assert vessel_type_from_doc({}) is None
+
+def test_closed_gap_uses_vessel_type_threshold():
+    detector = GapDetector(default_threshold=timedelta(hours=6), thresholds={"fishing": timedelta(hours=3)})
+    batch = TrackBatch.from_tracks({"f": track([10, 6]), "c": track([10, 6])})
+    candidates = detector.detect(batch, {"f": "fishing"})
+    assert [c.ship_id for c in candidates] == ["f"]
+    gap = candidates[0]
+    assert gap.alert_type == AlertType.GAP_IN_TRACKING
+    assert gap.details["gap_hours"] == 4.0 and not gap.details["ongoing"]
+    assert gap.started_at == NOW - timedelta(hours=10) and gap.ended_at == NOW - timedelta(hours=6)
+
+def test_ongoing_gap_and_severity():
+    candidates = GapDetector(default_threshold=timedelta(hours=6)).detect(TrackBatch.from_tracks({"v": track([30, 29])}), now=NOW)
+    assert len(candidates) == 1
+    assert candidates[0].details["ongoing"] and candidates[0].ended_at == NOW
+    assert candidates[0].severity == AlertSeverity.HIGH
+
+def test_recent_vessel_has_no_gap():
+    assert GapDetector().detect(TrackBatch.from_tracks({"v": track([3, 2, 1])}), now=NOW) == []
+
+def test_reappearance_closes_gap_that_started_before_the_window():
+    gap_start = (NOW - timedelta(hours=40)).replace(tzinfo=None)
+    open_gaps = [
+        {"_id": 1, "vessel_id": "v", "gap_start": gap_start},
+        {"_id": 2, "vessel_id": "silent", "gap_start": gap_start},
+        {"_id": 3, "vessel_id": "v", "gap_start": NOW - timedelta(hours=1)}
+    ]
+    closed = reappearances({"v": track([20, 19, 2]), "silent": []}, open_gaps)
+    assert [gap["_id"] for gap in closed] == [1]
+    assert closed[0]["gap_end"] == NOW - timedelta(hours=20)
+    assert closed[0]["gap_hours"] == 20.0
@@ -0,0 +1,101 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from config import config
+from detection import BBoxIndex, GeofenceIndex, GeofenceMonitor, TrackBatch, TrackPoint
+from detection.geofence import points_in_ring, zones_from_geojson
+from fake_mongo import FakeDatabase
+from models import AlertSeverity, AlertType
+from ship_monitor_agent import MongoDBTool
+
+START = datetime(2024, 5, 1, tzinfo=timezone.utc)
+
+def square(west, south, east, north):
+    return [[west, south], [east, south], [east, north], [west, north], [west, south]]
+
+def collection(*features):
+    return {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "properties": properties, "geometry": {"type": "Polygon", "coordinates": rings}}
+        for properties, rings in features
+    ]}
+
+def track(positions, start=START):
+    return [TrackPoint(lat, lon, start + timedelta(hours=i)) for i, (lat, lon) in enumerate(positions)]
+
+def test_points_in_ring():
+    ring = np.array(square(0, 0, 10, 10), dtype=float)
+    inside = points_in_ring(np.array([5.0, 15.0, -1.0]), np.array([5.0, 5.0, 5.0]), ring)
+    assert inside.tolist() == [True, False, False]
+
+def test_bbox_index_matches_brute_force():
+    rng = np.random.default_rng(1)
+    lower = rng.uniform(-50, 50, (200, 2))
+    boxes = np.column_stack([lower, lower + rng.uniform(0.5, 5, (200, 2))])
+    x, y = rng.uniform(-55, 55, 2000), rng.uniform(-55, 55, 2000)
+    point, item = BBoxIndex(boxes, node_size=4).query(x, y)
+    expected = {
+        (p, b) for p in range(len(x)) for b in range(len(boxes))
+        if boxes[b, 0] <= x[p] <= boxes[b, 2] and boxes[b, 1] <= y[p] <= boxes[b, 3]
+    }
+    assert set(zip(point.tolist(), item.tolist())) == expected
+
+def test_zone_properties_and_holes():
+    zones = zones_from_geojson(collection(
+        ({"name": "Reserve", "kind": "mpa"}, [square(0, 0, 10, 10), square(4, 4, 6, 6)]),
+        ({"name": "Waters", "kind": "eez"}, [square(20, 0, 30, 10)])
+    ))
+    assert [zone.severity for zone in zones] == [AlertSeverity.HIGH, AlertSeverity.LOW]
+    index = GeofenceIndex(zones)
+    assert [zone.name for zone in index.zones_at(2, 2)] == ["Reserve"]
+    assert index.zones_at(5, 5) == []
+    assert [zone.name for zone in index.zones_at(5, 25)] == ["Waters"]
+
+def test_zone_across_antimeridian():
+    index = GeofenceIndex(zones_from_geojson(collection(({"name": "Pacific"}, [square(170, -10, -170, 10)]))))
+    assert [zone.name for zone in index.zones_at(0, 175)] == ["Pacific"]
+    assert [zone.name for zone in index.zones_at(0, -175)] == ["Pacific"]
+    assert [zone.name for zone in index.zones_at(0, 180)] == ["Pacific"]
+    assert index.zones_at(0, 0) == []
+    assert index.zones_at(0, 160) == []
+
+def test_monitor_reports_transitions_once_across_overlapping_windows():
+    monitor = GeofenceMonitor(GeofenceIndex(zones_from_geojson(collection(({"name": "Reserve", "kind": "mpa"}, [square(0, 0, 10, 10)])))))
+    points = track([(5, -5), (5, 5), (5, 6), (5, 15)])
+    first = monitor.observe(TrackBatch.from_tracks({"v": points[:3]}))
+    assert [(c.alert_type, c.details["first_observation"]) for c in first] == [(AlertType.ZONE_ENTRY, False)]
+    # The next cycle's window overlaps the last one; only the new exit is reported
+    second = monitor.observe(TrackBatch.from_tracks({"v": points[1:]}))
+    assert [c.alert_type for c in second] == [AlertType.ZONE_EXIT]
+    assert monitor.observe(TrackBatch.from_tracks({"v": points})) == []
+
+def test_vessel_first_seen_inside_is_not_an_entry():
+    monitor = GeofenceMonitor(GeofenceIndex(zones_from_geojson(collection(
+        ({"name": "Reserve"}, [square(0, 0, 10, 10)]),
+        ({"name": "Shelf"}, [square(20, 0, 30, 10)])
+    ))))
+    # A cold monitor (e.g. after a restart) stays silent about zones vessels are already in
+    assert monitor.observe(TrackBatch.from_tracks({"v": track([(5, 5), (5, 6)])})) == []
+    later = START + timedelta(hours=5)
+    exit_, entry = monitor.observe(TrackBatch.from_tracks({"v": track([(5, 15), (5, 25)], start=later)}))
+    assert exit_.alert_type == AlertType.ZONE_EXIT and exit_.details["first_observation"]
+    assert "inside since first observed" in exit_.description
+    assert entry.alert_type == AlertType.ZONE_ENTRY and not entry.details["first_observation"]
+    assert entry.details["zone_name"] == "Shelf"
+
+def test_tool_queries_do_not_consume_the_sweeps_transitions():
+    db = FakeDatabase()
+    now = datetime.now(timezone.utc)
+    for i, (lat, lon) in enumerate([(5, -5), (5, 5)]):
+        db[config.POSITIONS_COLLECTION].insert({"vessel_id": "v", "timestamp": now - timedelta(hours=2 - i), "lat": lat, "lon": lon})
+    mongodb_tool = MongoDBTool.model_construct(db=db, async_db=db.asynchronous())
+    mongodb_tool._geofence = GeofenceIndex(zones_from_geojson(collection(({"name": "Reserve", "kind": "mpa"}, [square(0, 0, 10, 10)]))))
+
+    sweep = asyncio.run(mongodb_tool._acollect_candidates())
+    assert [c.alert_type for c in sweep if c.alert_type == AlertType.ZONE_ENTRY] == [AlertType.ZONE_ENTRY]
+    # The entry was reported to the sweep, but a query over the same window still sees it
+    assert mongodb_tool._run("detect_geofence").startswith("Detected 1 geofence candidates")
+    assert asyncio.run(mongodb_tool._arun("detect_geofence")).startswith("Detected 1 geofence candidates")
+    # The next sweep does not report it again
+    assert not [c for c in asyncio.run(mongodb_tool._acollect_candidates()) if c.alert_type == AlertType.ZONE_ENTRY]
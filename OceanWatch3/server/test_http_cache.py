@@ -0,0 +1,64 @@
+import asyncio
+
+from starlette.requests import Request
+
+from config import config
+
+from http_cache import ResponseCache, conditional_json, etag_for, etag_matches, parse_ttls
+
+def request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+def test_etag_is_stable_and_content_based():
+    assert etag_for({"b": 1, "a": [1, 2]}) == etag_for({"a": [1, 2], "b": 1})
+    assert etag_for({"a": 1}) != etag_for({"a": 2})
+    assert etag_for(b"payload").startswith('W/"')
+
+def test_etag_matching_is_weak_and_handles_lists():
+    etag = etag_for({"a": 1})
+    strong = etag.removeprefix("W/")
+    assert etag_matches(etag, etag)
+    assert etag_matches(strong, etag)
+    assert etag_matches(f'"other", {etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag) and not etag_matches('"other"', etag)
+
+def test_conditional_json_answers_304_for_a_known_etag():
+    payload = {"ships": [{"vessel_id": "a"}], "timestamp": "2026-01-01T00:00:00Z"}
+    first = conditional_json(request(), payload)
+    assert first.status_code == 200 and first.headers["cache-control"] == "no-cache"
+    etag = first.headers["etag"]
+
+    again = conditional_json(request(etag), {**payload, "timestamp": "2026-01-01T00:05:00Z"})
+    assert again.status_code == 304 and again.headers["etag"] == etag and again.body == b""
+
+    changed = conditional_json(request(etag), {**payload, "ships": []})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+
+def test_volatile_keys_can_be_chosen():
+    payload = {"count": 1, "generated": "now"}
+    assert conditional_json(request(), payload, volatile=("generated",)).headers["etag"] == etag_for({"count": 1})
+
+def test_parse_ttls():
+    assert parse_ttls("health:10, ships:30,,bad,risk_grid:0.5") == {"health": 10.0, "ships": 30.0, "risk_grid": 0.5}
+
+def test_uncached_endpoints_load_every_time():
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        cache = ResponseCache({"ships": 30}, stale_seconds=60)
+        cached = [await cache.get("ships", "k", load) for _ in range(2)]
+        uncached = [await cache.get("health", "health", load) for _ in range(2)]
+        return cached, uncached, cache.snapshot()
+
+    cached, uncached, snapshot = asyncio.run(run())
+    assert cached == [1, 1] and uncached == [2, 3]
+    assert snapshot["bypassed"] == {"health": 2}
+
+def test_health_is_not_cached_by_default():
+    assert "health" not in parse_ttls(config.RESPONSE_CACHE_TTLS)
@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from jobs import JobQueue, JobStatus, QueueFull
+
+async def wait_done(queue, *jobs):
+    while not all(job.done for job in jobs):
+        await asyncio.sleep(0.005)
+
+def test_submit_rejects_when_the_backlog_is_full():
+    async def scenario():
+        # Workers not started, so submissions stay queued
+        queue = JobQueue(workers=1, max_queued=2)
+
+        async def work():
+            return 1
+
+        queued = [queue.submit("analyze", work, ship_id=str(i)) for i in range(2)]
+        with pytest.raises(QueueFull):
+            queue.submit("analyze", work, ship_id="overflow")
+        return queue, queued
+
+    queue, queued = asyncio.run(scenario())
+    assert [job.status for job in queued] == [JobStatus.QUEUED, JobStatus.QUEUED]
+    assert queued[0].params == {"ship_id": "0"}
+    assert queue.stats()["queued"] == 2 and len(queue.jobs) == 2
+
+def test_workers_run_jobs_concurrently_and_record_results():
+    async def scenario():
+        queue = JobQueue(workers=2, max_queued=10)
+        queue.start()
+        running, peak = 0, 0
+
+        async def work(value):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+            if value == "bad":
+                raise ValueError("no such ship")
+            return value
+
+        jobs = [queue.submit("analyze", lambda v=v: work(v)) for v in ["a", "b", "bad", "c"]]
+        await wait_done(queue, *jobs)
+        await queue.close()
+        return queue, jobs, peak
+
+    queue, jobs, peak = asyncio.run(scenario())
+    assert peak == 2
+    assert [job.status for job in jobs] == [JobStatus.SUCCEEDED, JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.SUCCEEDED]
+    assert jobs[0].result == "a" and jobs[2].error == "no such ship"
+    assert jobs[0].to_dict()["duration_seconds"] >= 0
+    assert "result" not in jobs[0].to_dict(include_result=False)
+    assert queue.stats()["succeeded"] == 3 and queue.stats()["failed"] == 1
+
+def test_finished_jobs_expire_after_their_ttl():
+    async def scenario():
+        queue = JobQueue(workers=1, result_ttl_seconds=0.05)
+        queue.start()
+
+        async def work():
+            return "done"
+
+        job = queue.submit("analyze", work)
+        await wait_done(queue, job)
+        kept = queue.get(job.job_id)
+        await asyncio.sleep(0.06)
+        expired = queue.get(job.job_id)
+        await queue.close()
+        return job, kept, expired, queue
+
+    job, kept, expired, queue = asyncio.run(scenario())
+    assert kept is job and expired is None
+    assert queue.recent() == []
+
+def test_recent_lists_newest_first_with_status_filter():
+    async def scenario():
+        queue = JobQueue(workers=1)
+
+        async def work():
+            return None
+
+        first, second = queue.submit("analyze", work), queue.submit("alert", work)
+        second.created_at = first.created_at.replace(year=first.created_at.year + 1)
+        return queue, first, second
+
+    queue, first, second = asyncio.run(scenario())
+    assert queue.recent() == [second, first]
+    assert queue.recent(JobStatus.RUNNING) == []
+    assert queue.recent(limit=1) == [second]
+
+def test_subscribers_receive_finished_jobs():
+    async def scenario():
+        queue = JobQueue(workers=1)
+        queue.start()
+        inbox = queue.subscribe()
+
+        async def work():
+            return "ok"
+
+        job = queue.submit("analyze", work)
+        received = await asyncio.wait_for(inbox.get(), 1)
+        queue.unsubscribe(inbox)
+        await queue.close()
+        return job, received, queue
+
+    job, received, queue = asyncio.run(scenario())
+    assert received is job
+    assert queue.stats()["subscribers"] == 0
+
+def test_stalled_subscriber_is_dropped_not_buffered_forever():
+    async def scenario():
+        queue = JobQueue(workers=1, inbox_max=2)
+        queue.start()
+        stalled, reader = queue.subscribe(), queue.subscribe()
+        received = []
+
+        async def work():
+            return None
+
+        for _ in range(4):
+            job = queue.submit("analyze", work)
+            await wait_done(queue, job)
+            received.append(reader.get_nowait())
+        await queue.close()
+        return queue, stalled, reader, received
+
+    queue, stalled, reader, received = asyncio.run(scenario())
+    # The stalled inbox was emptied and closed with the end-of-stream marker
+    assert stalled.qsize() == 1 and stalled.get_nowait() is None
+    assert len(received) == 4 and all(received)
+    assert queue.stats()["subscribers"] == 1 and queue.stats()["dropped_subscribers"] == 1
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta, timezone
+
+from detection import LoiteringDetector, TrackPoint, group_tracks, haversine_km
+from models import AlertSeverity, AlertType
+
+START = datetime(2024, 5, 1, tzinfo=timezone.utc)
+
+def track(positions, step=timedelta(minutes=30)):
+    return [TrackPoint(lat, lon, START + step * i) for i, (lat, lon) in enumerate(positions)]
+
+def test_haversine_one_degree_of_latitude():
+    assert abs(haversine_km(0, 0, 1, 0) - 111.2) < 0.1
+    assert haversine_km(0, 179.9, 0, -179.9) < 23
+
+def test_group_tracks_reads_every_position_shape_in_time_order():
+    docs = [
+        {"vessel_id": "a", "lat": 1, "lon": 2, "timestamp": START + timedelta(hours=1)},
+        {"vessel_id": "a", "latitude": 3, "longitude": 4, "timestamp": START.isoformat()},
+        {"vessel_id": "b", "position": {"lat": 5, "lon": 6}, "timestamp": START},
+        {"vessel_id": "b", "lat": 5, "timestamp": START},
+        {"lat": 7, "lon": 8, "timestamp": START}
+    ]
+    tracks = group_tracks(docs)
+    assert [(p.lat, p.lon) for p in tracks["a"]] == [(3.0, 4.0), (1.0, 2.0)]
+    assert len(tracks["b"]) == 1
+
+def test_stationary_vessel_loiters_once_and_extends():
+    detector = LoiteringDetector(radius_km=2, min_dwell=timedelta(hours=2), min_points=3)
+    points = track([(10.0, 20.0 + 0.001 * i) for i in range(9)])
+    candidates = detector.scan("v", points)
+    assert len(candidates) == 1
+    candidate = candidates[0]
+    assert candidate.alert_type == AlertType.LOITERING
+    assert candidate.started_at == points[0].timestamp and candidate.ended_at == points[-1].timestamp
+    assert candidate.details["positions"] == 9 and candidate.details["dwell_hours"] == 4.0
+
+def test_transiting_vessel_does_not_loiter():
+    detector = LoiteringDetector(radius_km=2)
+    assert detector.scan("v", track([(10.0, 20.0 + 0.1 * i) for i in range(20)])) == []
+
+def test_gap_splits_cluster():
+    detector = LoiteringDetector(min_dwell=timedelta(hours=2), max_gap=timedelta(hours=3))
+    points = track([(10.0, 20.0)] * 3) + [TrackPoint(10.0, 20.0, START + timedelta(hours=10))]
+    assert detector.scan("v", points) == []
+
+def test_long_dwell_is_high_severity():
+    detector = LoiteringDetector(min_dwell=timedelta(hours=1))
+    candidates = detector.scan("v", track([(10.0, 20.0)] * 8))
+    assert candidates[0].severity == AlertSeverity.HIGH
+
+def test_cluster_straddling_antimeridian():
+    detector = LoiteringDetector(radius_km=5, min_dwell=timedelta(hours=1))
+    candidates = detector.scan("v", track([(0.0, 179.99), (0.0, -179.99)] * 3))
+    assert len(candidates) == 1
+    assert abs(abs(candidates[0].location.longitude) - 180) < 0.02
+
+def test_out_of_order_point_is_ignored():
+    detector = LoiteringDetector()
+    detector.update("v", TrackPoint(10.0, 20.0, START + timedelta(hours=1)))
+    assert detector.update("v", TrackPoint(50.0, 50.0, START)) is None
+    assert detector._clusters["v"].lat == 10.0
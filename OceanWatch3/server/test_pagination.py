@@ -0,0 +1,107 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+from pagination import (InvalidCursor, decode_cursor, encode_cursor, jsonable, keyset_filter, keyset_page,
+                        parse_fields, window_start)
+
+SORT = [("timestamp", -1), ("_id", -1)]
+
+def matches(doc, query):
+    """Enough of Mongo's query language for the filters keyset_page builds"""
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, branch) for branch in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, branch) for branch in condition):
+                return False
+        elif isinstance(condition, dict):
+            op, value = next(iter(condition.items()))
+            if not (doc[key] < value if op == "$lt" else doc[key] > value):
+                return False
+        elif doc[key] != condition:
+            return False
+    return True
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, sort):
+        for field, direction in reversed(sort):
+            self.docs.sort(key=lambda doc: doc[field], reverse=direction < 0)
+        return self
+
+    def limit(self, limit):
+        self.docs = self.docs[:limit]
+        return self
+
+    async def to_list(self):
+        return self.docs
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.projections = []
+
+    def find(self, query, projection=None):
+        self.projections.append(projection)
+        return FakeCursor([dict(doc) for doc in self.docs if matches(doc, query)])
+
+def alerts(count):
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    # Pairs share a timestamp so the _id tie-breaker is exercised
+    return [{"_id": ObjectId(), "timestamp": base + timedelta(minutes=i // 2), "ship_id": i} for i in range(count)]
+
+def test_cursor_round_trips_datetimes_and_object_ids():
+    values = {"timestamp": datetime(2026, 3, 1, 12, 30, 15, 250000, tzinfo=timezone.utc), "_id": ObjectId()}
+    cursor = encode_cursor(values)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, ["timestamp", "_id"]) == values
+
+@pytest.mark.parametrize("cursor", ["not-base64!", encode_cursor({"timestamp": 1})])
+def test_bad_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, ["timestamp", "_id"])
+
+def test_keyset_filter_expands_equality_prefixes():
+    after = {"timestamp": 5, "_id": 9}
+    assert keyset_filter(SORT, after) == {"$or": [{"timestamp": {"$lt": 5}}, {"timestamp": 5, "_id": {"$lt": 9}}]}
+    assert keyset_filter([("timestamp", 1)], after) == {"timestamp": {"$gt": 5}}
+
+def test_pages_cover_every_row_once_in_order():
+    docs = alerts(11)
+    collection = FakeCollection(docs)
+
+    async def walk():
+        seen, cursor = [], None
+        while True:
+            page, cursor = await keyset_page(collection, {}, SORT, limit=4, cursor=cursor)
+            seen.extend(page)
+            if cursor is None:
+                return seen
+
+    seen = asyncio.run(walk())
+    expected = sorted(docs, key=lambda doc: (doc["timestamp"], doc["_id"]), reverse=True)
+    assert [doc["_id"] for doc in seen] == [doc["_id"] for doc in expected]
+
+def test_projection_always_includes_sort_keys():
+    collection = FakeCollection(alerts(3))
+    docs, cursor = asyncio.run(keyset_page(collection, {"ship_id": 1}, SORT, limit=5, projection={"ship_id": 1}))
+    assert collection.projections == [{"ship_id": 1, "timestamp": 1, "_id": 1}]
+    assert len(docs) == 1 and cursor is None
+
+def test_parse_fields_validates_names():
+    assert parse_fields("ship_id, risk_score", ["ship_id", "risk_score"], ["ship_id"]) == {"ship_id": 1, "risk_score": 1}
+    assert parse_fields(None, ["ship_id"], ["ship_id"]) == {"ship_id": 1}
+    with pytest.raises(ValueError, match="Unknown fields: password"):
+        parse_fields("password", ["ship_id"], ["ship_id"])
+
+def test_jsonable_and_window_start():
+    oid = ObjectId()
+    assert jsonable({"_id": oid, "n": 1}) == {"_id": str(oid), "n": 1}
+    now = datetime(2026, 3, 1, 1, tzinfo=timezone.utc)
+    assert window_start(2, now) == datetime(2026, 2, 28, 23, tzinfo=timezone.utc)
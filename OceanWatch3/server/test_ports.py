@@ -0,0 +1,74 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+from config import config
+from detection import Port, PortIndex, PortTracker, TrackPoint, load_ports
+from fake_mongo import FakeDatabase
+from models import AlertType
+from ship_monitor_agent import MongoDBTool
+
+START = datetime(2024, 5, 1, tzinfo=timezone.utc)
+SINGAPORE = Port("SGSIN", "Singapore", "SGP", 1.264, 103.84, 15.0)
+JOHOR = Port("MYPGU", "Pasir Gudang", "MYS", 1.44, 103.9, 5.0)
+
+def track(positions, start=START):
+    return [TrackPoint(lat, lon, start + timedelta(hours=i)) for i, (lat, lon) in enumerate(positions)]
+
+def tracker():
+    return PortTracker(PortIndex([SINGAPORE, JOHOR], search_km=50), exit_factor=1.2)
+
+def test_load_bundled_gazetteer():
+    ports = load_ports(os.path.join(os.path.dirname(__file__), "data", "ports.csv"))
+    assert any(port.port_id == "SGSIN" for port in ports)
+    assert all(port.radius_km > 0 for port in ports)
+
+def test_index_lookups():
+    index = PortIndex([SINGAPORE, JOHOR], search_km=50)
+    port, distance = index.nearest(1.3, 103.85)
+    assert port.port_id == "SGSIN" and distance < 5
+    assert index.containing(1.44, 103.9)[0].port_id == "MYPGU"
+    assert index.containing(1.1, 104.3) is None
+    assert index.nearest(10.0, 110.0) is None
+
+def test_entry_and_exit():
+    candidates = tracker().scan("v", track([(0.9, 103.84), (1.26, 103.84), (1.27, 103.85), (0.9, 103.84)]))
+    assert [c.alert_type for c in candidates] == [AlertType.PORT_ENTRY, AlertType.PORT_EXIT]
+    assert candidates[1].details["stay_hours"] == 1.0 and not candidates[1].details["first_observation"]
+
+def test_hysteresis_at_the_boundary():
+    # 16 km out: outside the 15 km radius but inside 1.2x of it
+    just_outside = (1.264 + 16 / 111.2, 103.84)
+    candidates = tracker().scan("v", track([(0.9, 103.84), (1.264, 103.84), just_outside, (1.264, 103.84)]))
+    assert [c.alert_type for c in candidates] == [AlertType.PORT_ENTRY]
+
+def test_vessel_in_port_when_first_observed_is_not_an_entry():
+    ports = tracker()
+    assert ports.scan("v", track([(1.26, 103.84), (1.27, 103.84)])) == []
+    assert ports.current_port("v").port_id == "SGSIN"
+    exit_ = ports.scan("v", track([(0.9, 103.84)], start=START + timedelta(hours=5)))
+    assert [c.alert_type for c in exit_] == [AlertType.PORT_EXIT]
+    assert exit_[0].details["first_observation"] and "at least" in exit_[0].description
+
+def test_rescanning_overlapping_windows_reports_each_transition_once():
+    ports = tracker()
+    points = track([(0.9, 103.84), (1.26, 103.84), (1.27, 103.84), (1.26, 103.85)])
+    assert len(ports.scan("v", points[:2])) == 1
+    assert ports.scan("v", points) == []
+    assert ports.scan("v", points[1:]) == []
+
+def test_tool_queries_do_not_consume_the_sweeps_transitions():
+    db = FakeDatabase()
+    now = datetime.now(timezone.utc)
+    for i, (lat, lon) in enumerate([(0.9, 103.84), (1.26, 103.84), (1.27, 103.85)]):
+        db[config.POSITIONS_COLLECTION].insert({"vessel_id": "v", "timestamp": now - timedelta(hours=3 - i), "lat": lat, "lon": lon})
+    mongodb_tool = MongoDBTool.model_construct(db=db, async_db=db.asynchronous())
+    mongodb_tool._ports = PortIndex([SINGAPORE, JOHOR], search_km=50)
+
+    sweep = asyncio.run(mongodb_tool._acollect_candidates())
+    assert [c.alert_type for c in sweep if c.alert_type == AlertType.PORT_ENTRY] == [AlertType.PORT_ENTRY]
+    # The entry was reported to the sweep, but a query over the same window still sees it
+    assert mongodb_tool._run("detect_port_calls").startswith("Detected 1 port call candidates")
+    assert asyncio.run(mongodb_tool._arun("detect_port_calls")).startswith("Detected 1 port call candidates")
+    # The next sweep does not report it again
+    assert not [c for c in asyncio.run(mongodb_tool._acollect_candidates()) if c.alert_type == AlertType.PORT_ENTRY]
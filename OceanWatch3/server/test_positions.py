@@ -0,0 +1,58 @@
+import gzip
+import struct
+
+import pytest
+
+from positions import COUNTER_FIELDS, FLAG_NAMES, MAGIC, decode_positions, encode_positions
+
+def vessel(vessel_id, **fields):
+    return {"vessel_id": vessel_id, "lat": 12.345678, "lon": -45.678912, "bearing": 90.0, "name": "Sea Star", **fields}
+
+def test_round_trip_sorts_by_id_and_keeps_precision():
+    vessels = [
+        vessel("b7c1f00d-aaaa", lat=-33.1, lon=179.99999, bearing=359.96, aisOff_count=4, name="Ørnen"),
+        vessel("a3f9e2c1-0001", totalTimesListed_count=2),
+        vessel("a3f9e2c1-0002", bearing=None)
+    ]
+    decoded = decode_positions(encode_positions(vessels))
+    assert [row["vessel_id"] for row in decoded] == ["a3f9e2c1-0001", "a3f9e2c1-0002", "b7c1f00d-aaaa"]
+    assert decoded[0]["lat"] == pytest.approx(12.345678, abs=1e-5)
+    assert decoded[0]["lon"] == pytest.approx(-45.678912, abs=1e-5)
+    assert decoded[0]["totalTimesListed_count"] == 2 and decoded[0]["aisOff_count"] == 0
+    assert decoded[1]["bearing"] == 0.0
+    # 359.96 rounds to 360.0 and wraps back to north
+    assert decoded[2]["bearing"] == 0.0
+    assert decoded[2]["name"] == "Ørnen" and decoded[2]["aisOff_count"] == 4
+
+def test_rows_without_an_id_are_dropped():
+    decoded = decode_positions(encode_positions([vessel(None), vessel("x")]))
+    assert [row["vessel_id"] for row in decoded] == ["x"]
+
+def test_names_can_be_left_out():
+    payload = encode_positions([vessel("x")], names=False)
+    flags = struct.unpack_from("<4sBB", gzip.decompress(payload))[2]
+    assert not flags & FLAG_NAMES
+    assert "name" not in decode_positions(payload)[0]
+
+def test_front_coding_shares_prefixes():
+    ids = [f"{'f' * 40}{i:04d}" for i in range(50)]
+    raw = gzip.decompress(encode_positions([vessel(vessel_id) for vessel_id in ids], names=False))
+    # Every id after the first only stores the differing tail
+    assert len(raw) < 50 * 44
+    assert [row["vessel_id"] for row in decode_positions(gzip.compress(raw))] == ids
+
+def test_counters_saturate():
+    counters = {field: 10 ** 6 for field in COUNTER_FIELDS}
+    counters["aisOff_count"] = -3
+    decoded = decode_positions(encode_positions([vessel("x", **counters)]))
+    assert decoded[0]["aisOff_count"] == 0
+    assert all(decoded[0][field] == 65535 for field in COUNTER_FIELDS[1:])
+
+def test_empty_payload():
+    assert decode_positions(encode_positions([])) == []
+
+def test_foreign_payload_is_rejected():
+    with pytest.raises(ValueError):
+        decode_positions(gzip.compress(struct.pack("<4sBBII", b"NOPE", 1, 0, 0, 1)))
+    with pytest.raises(ValueError):
+        decode_positions(gzip.compress(struct.pack("<4sBBII", MAGIC, 99, 0, 0, 1)))
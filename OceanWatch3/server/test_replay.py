@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from replay import Cassette, CassetteMiss, FakeChatModel, RecordReplayChatModel, stable_prompt
+
+SWEEP = """
+Analyze the following maritime data.
+
+## Detector signals ({count})
+vessel|signal|sev|lat,lon|at
+{vessel}|gap_in_tracking|high|{lat},10.000|{at}
++3 more
+
+Please generate alerts.
+"""
+
+def sweep(count, vessel, lat, at):
+    return SWEEP.format(count=count, vessel=vessel, lat=lat, at=at)
+
+def test_stable_prompt_drops_live_data():
+    first = stable_prompt(sweep(4, "abc", "1.234", "2024-05-01T10:00:00+00:00"))
+    second = stable_prompt(sweep(9, "def", "-7.5", "2024-05-02 11:30:00"))
+    assert first == second
+    assert "Analyze the following maritime data." in first and "abc" not in first
+    assert stable_prompt("Analyze ship 123456789") != stable_prompt("Analyze ship 987654321")
+
+def test_replay_matches_prompt_with_different_live_data(tmp_path):
+    path = str(tmp_path / "agent.jsonl")
+    recorder = RecordReplayChatModel(inner=FakeChatModel(responses=["recorded answer"]), cassette=Cassette(path, "record"))
+    recorder.invoke([SystemMessage(content="system"), HumanMessage(content=sweep(4, "abc", "1.234", "2024-05-01T10:00:00Z"))])
+
+    player = RecordReplayChatModel(cassette=Cassette(path, "replay"))
+    reply = player.invoke([SystemMessage(content="system"), HumanMessage(content=sweep(2, "xyz", "3.5", "2024-06-01T09:00:00Z"))])
+    assert reply.content == "recorded answer"
+    with pytest.raises(CassetteMiss):
+        player.invoke([SystemMessage(content="system"), HumanMessage(content="A different question")])
+
+def test_recording_replaces_the_previous_cassette(tmp_path):
+    path = tmp_path / "agent.jsonl"
+    for answer in ("first", "second"):
+        cassette = Cassette(str(path), "record")
+        cassette.record("llm", {"q": 1}, answer)
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["response"] for line in lines] == ["second"]
+
+def test_fake_model_script_is_per_conversation():
+    model = FakeChatModel(latency_seconds=0.01)
+    tools = [{"type": "function", "function": {"name": "mongodb_query"}}]
+
+    async def run(prompt):
+        messages = [HumanMessage(content=prompt)]
+        first = await model._agenerate(messages, tools=tools)
+        call = first.generations[0].message
+        messages += [call] + [ToolMessage(content="rows", tool_call_id=c["id"]) for c in call.tool_calls]
+        second = await model._agenerate(messages, tools=tools)
+        return call, second.generations[0].message
+
+    async def scenario():
+        return await asyncio.gather(*(run(f"ship {i}") for i in range(3)))
+
+    for call, answer in asyncio.run(scenario()):
+        assert [c["name"] for c in call.tool_calls] == ["mongodb_query", "mongodb_query"]
+        assert isinstance(answer, AIMessage) and not answer.tool_calls
+        assert answer.content.startswith("Fake analysis: reviewed 2 tool results")
+    assert model.calls == 6
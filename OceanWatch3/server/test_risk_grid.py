@@ -0,0 +1,82 @@
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from risk_grid import RISK_FIELDS, RiskGrid, cell_centers, tile_cells
+
+def random_vessels(count, seed=7):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "lat": float(lat), "lon": float(lon),
+            "aisOff_count": int(ais), "eventsInNoTakeMpas_count": int(mpa), "eventsInRfmoWithoutKnownAuthorization_count": None
+        }
+        for lat, lon, ais, mpa in zip(
+            rng.uniform(-80, 80, count), rng.uniform(-180, 180, count), rng.integers(0, 5, count), rng.integers(0, 3, count)
+        )
+    ]
+
+def vessel_risk(vessel):
+    return sum(vessel.get(field) or 0 for field in RISK_FIELDS)
+
+def test_totals_are_conserved_across_levels():
+    vessels = random_vessels(500)
+    grid = RiskGrid(vessels, max_zoom=8, cell_bits=2)
+    expected_risk = sum(vessel_risk(v) for v in vessels)
+    expected_count = sum(1 for v in vessels if vessel_risk(v) > 0)
+    assert grid.vessel_count == expected_count
+    for zoom, level in grid.levels.items():
+        assert level.risk.sum() == pytest.approx(expected_risk)
+        assert level.vessels.sum() == expected_count
+        assert level.max_risk.max() == max(vessel_risk(v) for v in vessels)
+
+def test_levels_match_brute_force_binning():
+    vessels = random_vessels(300, seed=3)
+    grid = RiskGrid(vessels, max_zoom=6, cell_bits=3)
+    for zoom in (0, 3, 6):
+        expected = defaultdict(lambda: [0.0, 0, 0.0])
+        for vessel in vessels:
+            risk = vessel_risk(vessel)
+            if risk <= 0:
+                continue
+            x, y = tile_cells(np.array([vessel["lat"]]), np.array([vessel["lon"]]), zoom + 3)[0].tolist()
+            cell = expected[(x, y)]
+            cell[0] += risk
+            cell[1] += 1
+            cell[2] = max(cell[2], risk)
+        level = grid.levels[zoom]
+        actual = {
+            (x, y): [risk, vessels_in_cell, peak]
+            for x, y, risk, vessels_in_cell, peak in zip(
+                level.x.tolist(), level.y.tolist(), level.risk.tolist(), level.vessels.tolist(), level.max_risk.tolist()
+            )
+        }
+        assert actual == dict(expected)
+
+def test_tile_cells_and_centers_agree():
+    lat, lon = np.array([51.5, -33.9, 89.9]), np.array([-0.12, 151.2, 180.0])
+    cells = tile_cells(lat, lon, 10)
+    assert cells[2].tolist() == [1023, 0]
+    centers = cell_centers(cells[:2, 0], cells[:2, 1], 10)
+    assert np.allclose(centers, np.stack([lat[:2], lon[:2]], axis=1), atol=0.36)
+
+def test_cells_rows_follow_columns_and_clamp_zoom():
+    grid = RiskGrid([{"lat": 10.0, "lon": 20.0, "aisOff_count": 2}, {"lat": 10.001, "lon": 20.001, "aisOff_count": 3}], max_zoom=5, cell_bits=2)
+    result = grid.cells(40)
+    assert result["zoom"] == 5 and result["cell_zoom"] == 7
+    assert result["columns"] == ["lat", "lon", "riskScore", "vesselCount", "maxRisk"]
+    [[lat, lon, risk, count, peak]] = result["cells"]
+    assert (risk, count, peak) == (5.0, 2, 3.0)
+    assert abs(lat - 10.0) < 1.5 and abs(lon - 20.0) < 1.5
+    assert grid.cells(-3)["zoom"] == 0
+    assert grid.cells(5) is not result and grid.cells(5)["cells"] is result["cells"]
+
+def test_vessels_without_risk_or_position_are_ignored():
+    grid = RiskGrid([
+        {"lat": 1.0, "lon": 1.0, "aisOff_count": 0},
+        {"lat": float("nan"), "lon": 1.0, "aisOff_count": 4}
+    ])
+    assert grid.vessel_count == 0 and grid.levels == {}
+    assert grid.cells(3)["cells"] == []
+    assert RiskGrid([]).cells(0)["cells"] == []
@@ -0,0 +1,133 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from fake_mongo import FakeDatabase
+from models import AlertSeverity, AlertType
+from rollups import (COVERAGE_ID, ROLLUP_COLLECTION, alert_stats, backfill_rollups, coverage_update, first_counted_hour,
+                     rollup_increment)
+
+NOW = datetime(2026, 3, 10, 12, 20, tzinfo=timezone.utc)
+
+def store(db, timestamp, severity="high", alert_type="loitering", counted=True):
+    """Insert a raw alert and, like AlertGeneratorTool, count it in its hourly rollup"""
+    alert = {"timestamp": timestamp, "severity": severity, "alert_type": alert_type, "ship_id": "v"}
+    db.ship_alerts.insert(alert)
+    if counted:
+        db[ROLLUP_COLLECTION].update_one(*rollup_increment(alert), upsert=True)
+
+def start_writer(db, at):
+    """Coverage as recorded by a writer starting at `at`"""
+    db[ROLLUP_COLLECTION].update_one(*coverage_update(first_counted_hour(at)), upsert=True)
+
+def brute_force(db, start):
+    alerts = [alert for alert in db.ship_alerts.docs if start <= alert["timestamp"] <= NOW]
+    return len(alerts), sum(alert["severity"] == "critical" for alert in alerts)
+
+def stats(db, start):
+    return asyncio.run(alert_stats(db.asynchronous(), start, NOW))
+
+def test_increment_floors_to_the_hour_and_accepts_enums():
+    query, update = rollup_increment({
+        "timestamp": datetime(2026, 3, 10, 12, 59), "severity": AlertSeverity.HIGH, "alert_type": AlertType.ENCOUNTER
+    })
+    assert query == {"hour": datetime(2026, 3, 10, 12, tzinfo=timezone.utc)}
+    assert update == {"$inc": {"total": 1, "by_severity.high": 1, "by_type.encounter": 1}}
+
+def test_coverage_starts_after_the_writers_first_partial_hour():
+    assert first_counted_hour(datetime(2026, 3, 10, 9, 15, tzinfo=timezone.utc)) == datetime(2026, 3, 10, 10, tzinfo=timezone.utc)
+    assert first_counted_hour(datetime(2026, 3, 10, 9, tzinfo=timezone.utc)) == datetime(2026, 3, 10, 9, tzinfo=timezone.utc)
+
+def test_without_coverage_everything_is_counted_raw():
+    db = FakeDatabase()
+    store(db, NOW - timedelta(hours=2), counted=False)
+    store(db, NOW - timedelta(hours=30), counted=False)
+    result = stats(db, NOW - timedelta(hours=24))
+    assert result["total"] == 1 and result["source"] == {"rollup_hours": 0, "raw_until": None}
+
+def test_partial_first_and_last_hours():
+    db = FakeDatabase()
+    start_writer(db, NOW - timedelta(hours=10))
+    # 02:50 is outside a window starting at 03:20; 03:30 is inside the partial first hour
+    for timestamp, severity in [
+        (datetime(2026, 3, 10, 2, 50, tzinfo=timezone.utc), "critical"),
+        (datetime(2026, 3, 10, 3, 30, tzinfo=timezone.utc), "critical"),
+        (datetime(2026, 3, 10, 3, 10, tzinfo=timezone.utc), "low"),
+        (datetime(2026, 3, 10, 7, 0, tzinfo=timezone.utc), "high"),
+        (datetime(2026, 3, 10, 12, 5, tzinfo=timezone.utc), "critical")
+    ]:
+        store(db, timestamp, severity)
+    start = datetime(2026, 3, 10, 3, 20, tzinfo=timezone.utc)
+    result = stats(db, start)
+    assert (result["total"], result["by_severity"]["critical"]) == brute_force(db, start) == (3, 2)
+    # 03:20-04:00 from raw alerts, then whole hours up to and including the current one from rollups
+    assert result["source"]["raw_until"] == "2026-03-10T04:00:00+00:00"
+    assert result["source"]["rollup_hours"] == 2
+    assert result["by_type"]["loitering"] == 3
+
+def test_window_starting_before_coverage_counts_the_gap_raw():
+    db = FakeDatabase()
+    store(db, NOW - timedelta(hours=20), "critical", counted=False)
+    store(db, NOW - timedelta(hours=8), counted=False)
+    start_writer(db, NOW - timedelta(hours=5))
+    store(db, NOW - timedelta(hours=2))
+    result = stats(db, NOW - timedelta(hours=24))
+    assert (result["total"], result["by_severity"]["critical"]) == brute_force(db, NOW - timedelta(hours=24)) == (3, 1)
+    assert result["source"]["raw_until"] == "2026-03-10T08:00:00+00:00"
+
+def hour_totals(db):
+    return sorted((doc["hour"], doc["total"]) for doc in db[ROLLUP_COLLECTION].docs if "hour" in doc)
+
+def backfill(db):
+    return asyncio.run(backfill_rollups(db.asynchronous(), NOW - timedelta(hours=24), NOW))
+
+def reset_coverage(db, writer_start):
+    """As if a backfill stopped before recording its coverage"""
+    rollups = db[ROLLUP_COLLECTION]
+    rollups.docs = [doc for doc in rollups.docs if doc.get("_id") != COVERAGE_ID]
+    start_writer(db, writer_start)
+
+def test_backfill_counts_uncovered_hours_and_is_idempotent():
+    db = FakeDatabase()
+    store(db, datetime(2026, 3, 9, 23, 10, tzinfo=timezone.utc), "critical", counted=False)
+    store(db, datetime(2026, 3, 9, 23, 40, tzinfo=timezone.utc), counted=False)
+    store(db, datetime(2026, 3, 10, 4, 5, tzinfo=timezone.utc), counted=False)
+    start_writer(db, NOW - timedelta(hours=5))
+    store(db, NOW - timedelta(hours=1))
+
+    assert backfill(db) == 2
+    snapshot = hour_totals(db)
+    assert snapshot == [
+        (datetime(2026, 3, 9, 23, tzinfo=timezone.utc), 2),
+        (datetime(2026, 3, 10, 4, tzinfo=timezone.utc), 1),
+        (datetime(2026, 3, 10, 11, tzinfo=timezone.utc), 1)
+    ]
+    assert db[ROLLUP_COLLECTION].find_one({"_id": COVERAGE_ID})["since"] == datetime(2026, 3, 9, 12, tzinfo=timezone.utc)
+    # Once covered there is nothing left to recount
+    assert backfill(db) == 0
+    # A rerun over the same hours overwrites them instead of adding to them
+    reset_coverage(db, NOW - timedelta(hours=5))
+    assert backfill(db) == 2
+    assert hour_totals(db) == snapshot
+
+    result = stats(db, NOW - timedelta(hours=24))
+    assert (result["total"], result["by_severity"]["critical"]) == brute_force(db, NOW - timedelta(hours=24)) == (4, 1)
+    # Only the partial first hour is still read from raw alerts
+    assert result["source"]["raw_until"] == "2026-03-09T13:00:00+00:00"
+
+def test_backfill_clears_hours_whose_alerts_are_gone():
+    db = FakeDatabase()
+    store(db, datetime(2026, 3, 10, 4, 5, tzinfo=timezone.utc), counted=False)
+    start_writer(db, NOW - timedelta(hours=5))
+    backfill(db)
+    db.ship_alerts.docs.clear()
+    reset_coverage(db, NOW - timedelta(hours=5))
+    assert backfill(db) == 0
+    [hour] = [doc for doc in db[ROLLUP_COLLECTION].docs if "hour" in doc]
+    assert hour["total"] == 0 and hour["by_severity"]["high"] == 0
+
+def test_backfill_with_nothing_uncovered():
+    db = FakeDatabase()
+    start_writer(db, NOW - timedelta(hours=30))
+    assert asyncio.run(backfill_rollups(db.asynchronous(), NOW - timedelta(hours=24), NOW)) == 0
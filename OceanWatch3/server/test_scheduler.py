@@ -0,0 +1,137 @@
+import asyncio
+
+from scheduler import MonitorScheduler
+
+def recorder(order, name, delay=0.0, error=None):
+    async def job():
+        order.append(name)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+    return job
+
+async def drain(scheduler):
+    while scheduler._tasks:
+        await asyncio.gather(*list(scheduler._tasks))
+
+def test_due_jobs_start_in_priority_order():
+    async def scenario():
+        order = []
+        # One slot, so start order is the order the semaphore is acquired in
+        scheduler = MonitorScheduler(max_concurrent_jobs=1)
+        scheduler.add_job("rollup", recorder(order, "rollup"), 60, priority=2, run_immediately=False)
+        scheduler.add_job("sweep", recorder(order, "sweep"), 60, priority=0, run_immediately=False)
+        scheduler.add_job("refresh", recorder(order, "refresh"), 60, priority=1, run_immediately=False)
+        now = max(job.next_run for job in scheduler.jobs.values())
+        scheduler._dispatch_due(now)
+        await drain(scheduler)
+        return order, scheduler
+
+    order, scheduler = asyncio.run(scenario())
+    assert order == ["sweep", "refresh", "rollup"]
+    assert [row["name"] for row in scheduler.snapshot()] == ["sweep", "refresh", "rollup"]
+
+def test_jobs_only_run_when_due():
+    async def scenario():
+        order = []
+        scheduler = MonitorScheduler()
+        job = scheduler.add_job("sweep", recorder(order, "sweep"), 60, run_immediately=False)
+        scheduler._dispatch_due(job.next_run - 1)
+        await drain(scheduler)
+        before = list(order)
+        scheduler._dispatch_due(job.next_run)
+        await drain(scheduler)
+        return before, order, job
+
+    before, order, job = asyncio.run(scenario())
+    assert before == [] and order == ["sweep"]
+    assert job.stats["runs"] == 1 and job.stats["succeeded"] == 1
+
+def test_overlapping_run_is_skipped_not_stacked():
+    async def scenario():
+        order = []
+        scheduler = MonitorScheduler()
+        job = scheduler.add_job("sweep", recorder(order, "sweep", delay=0.05), 0.01)
+        scheduler._dispatch_due(job.next_run)
+        await asyncio.sleep(0)
+        # Due again while the first run is still going
+        scheduler._dispatch_due(job.next_run)
+        await drain(scheduler)
+        return order, job
+
+    order, job = asyncio.run(scenario())
+    assert order == ["sweep"]
+    assert job.stats["skipped_overlap"] == 1 and job.stats["runs"] == 1
+    assert not job.running
+
+def test_time_budget_cancels_the_run():
+    async def scenario():
+        scheduler = MonitorScheduler()
+        job = scheduler.add_job("slow", recorder([], "slow", delay=1.0), 60, time_budget_seconds=0.02)
+        scheduler._dispatch_due(job.next_run)
+        await drain(scheduler)
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.stats["timed_out"] == 1 and job.stats["succeeded"] == 0
+    assert job.stats["last_error"] == "exceeded time budget of 0.02s"
+    assert job.stats["last_duration_seconds"] < 0.5
+    assert not job.running
+
+def test_failures_are_recorded_and_cleared_by_a_success():
+    async def scenario():
+        outcomes = [RuntimeError("mongo down"), None]
+        scheduler = MonitorScheduler()
+
+        async def flaky():
+            error = outcomes.pop(0)
+            if error:
+                raise error
+
+        job = scheduler.add_job("flaky", flaky, 60)
+        scheduler._dispatch_due(job.next_run)
+        await drain(scheduler)
+        failed = dict(job.stats)
+        scheduler._dispatch_due(job.next_run)
+        await drain(scheduler)
+        return failed, job.stats
+
+    failed, stats = asyncio.run(scenario())
+    assert failed["failed"] == 1 and failed["last_error"] == "mongo down"
+    assert stats["runs"] == 2 and stats["succeeded"] == 1 and stats["last_error"] is None
+
+def test_concurrency_is_capped():
+    async def scenario():
+        running, peak = 0, 0
+        scheduler = MonitorScheduler(max_concurrent_jobs=2)
+
+        async def job():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+
+        for i in range(4):
+            scheduler.add_job(f"job{i}", job, 60)
+        scheduler._dispatch_due(max(j.next_run for j in scheduler.jobs.values()))
+        await drain(scheduler)
+        return peak
+
+    assert asyncio.run(scenario()) == 2
+
+def test_run_forever_repeats_jobs_and_cancels_them_on_stop():
+    async def scenario():
+        order = []
+        scheduler = MonitorScheduler()
+        scheduler.add_job("tick", recorder(order, "tick"), 0.05)
+        blocked = scheduler.add_job("stuck", recorder(order, "stuck", delay=10), 60)
+        runner = asyncio.create_task(scheduler.run_forever())
+        await asyncio.sleep(0.18)
+        scheduler.stop()
+        await asyncio.wait_for(runner, 1)
+        return order, blocked
+
+    order, blocked = asyncio.run(scenario())
+    assert order.count("tick") >= 3 and order.count("stuck") == 1
+    assert not blocked.running
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from ship_tracks import douglas_peucker, simplify, track_points, zoom_tolerance
+
+T0 = datetime(2026, 1, 1)
+
+def test_points_are_time_ordered_with_utc_offsets():
+    events = [
+        {"latitude": 2, "longitude": 2, "event_end": T0 + timedelta(hours=2), "event_type": "fishing"},
+        {"latitude": 1, "longitude": 1, "timestamp": "2026-01-01T01:00:00Z"},
+        {"latitude": 0, "longitude": 0, "event_end": T0}
+    ]
+    points = track_points(events)
+    assert [point["lat"] for point in points] == [0, 1, 2]
+    assert points[0]["t"] == "2026-01-01T00:00:00+00:00"
+    assert points[2]["type"] == "fishing" and "type" not in points[0]
+
+def test_missing_time_omits_t_and_sorts_first():
+    points = track_points([
+        {"latitude": 1, "longitude": 1, "event_end": T0},
+        {"latitude": 0, "longitude": 0, "event_end": None, "timestamp": None}
+    ])
+    assert points[0] == {"lat": 0.0, "lon": 0.0}
+    assert "t" in points[1]
+
+def test_unusable_coordinates_are_dropped():
+    events = [
+        {"latitude": None, "longitude": 1},
+        {"latitude": "nan", "longitude": 1},
+        {"latitude": "abc", "longitude": 1},
+        {"latitude": "1.5", "longitude": "2.5", "event_end": T0}
+    ]
+    assert [(point["lat"], point["lon"]) for point in track_points(events)] == [(1.5, 2.5)]
+
+def test_zoom_tolerance_halves_per_level():
+    assert zoom_tolerance(0) == pytest.approx(360 / 256)
+    assert zoom_tolerance(5) == pytest.approx(zoom_tolerance(4) / 2)
+    assert zoom_tolerance(3, pixels=2) == pytest.approx(2 * zoom_tolerance(3))
+
+def test_douglas_peucker_keeps_corners_and_drops_collinear_points():
+    lon = np.array([0.0, 1.0, 2.0, 3.0, 3.0, 3.0])
+    lat = np.array([0.0, 0.001, 0.0, 0.0, 1.0, 2.0])
+    assert douglas_peucker(lat, lon, 0.01).tolist() == [0, 3, 5]
+    assert douglas_peucker(lat, lon, 0.0).tolist() == list(range(6))
+
+def test_douglas_peucker_handles_closed_loops():
+    lon = np.array([0.0, 1.0, 1.0, 0.0])
+    lat = np.array([0.0, 0.0, 1.0, 0.0])
+    assert douglas_peucker(lat, lon, 0.8).tolist() == [0, 2, 3]
+    assert douglas_peucker(lat, lon, 0.1).tolist() == [0, 1, 2, 3]
+
+def test_simplify_keeps_endpoints_of_long_tracks():
+    points = [{"lat": float(np.sin(i / 50)), "lon": i / 100} for i in range(2000)]
+    coarse, fine = simplify(points, zoom_tolerance(2)), simplify(points, zoom_tolerance(12))
+    assert coarse[0] is points[0] and coarse[-1] is points[-1]
+    assert len(coarse) < len(fine) <= len(points)
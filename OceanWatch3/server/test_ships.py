@@ -0,0 +1,61 @@
+import pytest
+
+from fake_mongo import matches
+from pagination import parse_fields
+from ships import SHIP_FIELDS, SHIP_LIST_FIELDS, ship_filter, ship_flag, ship_projection, ship_row
+
+SHIPS = [
+    {"vessel_id": "a", "flag": "PAN", "details": {"self_reported_info": [{"flag": "LBR"}]}, "risk_score": 0.9, "vessel_type": "Fishing"},
+    {"vessel_id": "b", "flag": "", "details": {"self_reported_info": [{"flag": None}, {"flag": "PAN"}]}, "risk_score": 0.4},
+    {"vessel_id": "c", "details": {"self_reported_info": [{"flag": "LBR"}], "combined_sources_info": [
+        {"shiptypes": [{"name": "CARGO"}, {"name": "CARRIER"}]}
+    ]}, "risk_score": "high"},
+    {"vessel_id": "d", "type": "fishing", "risk_score": 0.1}
+]
+
+def matching(query):
+    return [ship["vessel_id"] for ship in SHIPS if matches(ship, query)]
+
+def test_flag_filter_follows_ship_flag_precedence():
+    # `a` self-reports LBR but its own flag wins, exactly as ship_flag reads it
+    assert matching(ship_filter(flag="lbr ")) == ["c"]
+    assert matching(ship_filter(flag="PAN")) == ["a", "b"]
+    assert [ship_flag(ship) for ship in SHIPS] == ["PAN", "PAN", "LBR", None]
+
+def test_type_filter_is_case_insensitive_and_exact():
+    assert matching(ship_filter(vessel_type="FISHING")) == ["a", "d"]
+    # Any GFW shiptype counts, not just the one ship_row reports
+    assert matching(ship_filter(vessel_type="cargo")) == ["c"]
+    assert matching(ship_filter(vessel_type="fish")) == []
+    # Regex characters in the parameter are literal
+    assert matching(ship_filter(vessel_type=".*")) == []
+
+def test_risk_range_skips_non_numeric_scores():
+    assert matching(ship_filter(min_risk=0.4)) == ["a", "b"]
+    assert matching(ship_filter(max_risk=0.4)) == ["b", "d"]
+    assert matching(ship_filter(min_risk=0.2, max_risk=0.5)) == ["b"]
+
+def test_filters_combine_with_and():
+    assert ship_filter() == {}
+    query = ship_filter(flag="PAN", vessel_type="fishing", min_risk=0.5)
+    assert len(query["$and"]) == 3
+    assert matching(query) == ["a"]
+
+def test_projection_fetches_the_sources_of_derived_fields():
+    assert ship_projection(["vessel_id", "flag"]) == {"_id": 0, "details.self_reported_info.flag": 1, "flag": 1, "vessel_id": 1}
+    projection = ship_projection(SHIP_LIST_FIELDS)
+    assert {"details.combined_sources_info.shiptypes", "type", "vessel_type", "risk_score"} <= set(projection)
+
+def test_projection_never_mixes_a_path_with_its_sub_paths():
+    projection = ship_projection(["flag", "vessel_type", "details"])
+    assert "details" in projection
+    assert not [field for field in projection if field.startswith("details.")]
+
+def test_fields_are_allow_listed():
+    assert list(parse_fields(None, SHIP_FIELDS, SHIP_LIST_FIELDS)) == SHIP_LIST_FIELDS
+    with pytest.raises(ValueError, match="Unknown fields: _id, password"):
+        parse_fields("name,password,_id", SHIP_FIELDS, SHIP_LIST_FIELDS)
+
+def test_rows_hold_exactly_the_requested_fields():
+    row = ship_row(SHIPS[2], ["vessel_id", "flag", "vessel_type", "name"])
+    assert row == {"vessel_id": "c", "flag": "LBR", "vessel_type": "carrier", "name": None}
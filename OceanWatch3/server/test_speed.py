@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from detection import SpeedAnomalyDetector, TrackBatch, TrackPoint, haversine_km, haversine_km_np
+
+START = datetime(2024, 5, 1, tzinfo=timezone.utc)
+STEP = timedelta(minutes=10)
+
+def steady(lat=10.0, lon=20.0, knots=10.0, count=12, start=START):
+    # Due north; one knot is 1.852 km/h and a degree of latitude about 111.2 km
+    degrees_per_step = knots * 1.852 / 6 / 111.195
+    return [TrackPoint(lat + degrees_per_step * i, lon, start + STEP * i) for i in range(count)]
+
+def test_haversine_np_matches_scalar():
+    lat1, lon1, lat2, lon2 = np.array([0.0, 50.0]), np.array([179.9, -3.0]), np.array([0.0, 51.0]), np.array([-179.9, 2.0])
+    expected = [haversine_km(*args) for args in zip(lat1, lon1, lat2, lon2)]
+    assert np.allclose(haversine_km_np(lat1, lon1, lat2, lon2), expected)
+
+def test_batch_orders_rows_by_vessel_then_time():
+    batch = TrackBatch.from_tracks({"b": steady(count=3)[::-1], "a": steady(count=2), "empty": []})
+    assert batch.vessel_ids == ["b", "a"]
+    assert len(batch) == 5
+    assert np.all(np.diff(batch.t[:3]) > 0)
+    assert batch.same_vessel.tolist() == [True, True, False, True]
+
+def test_implied_speed_of_steady_track():
+    detector = SpeedAnomalyDetector()
+    metrics = detector.segment_metrics(TrackBatch.from_tracks({"v": steady(knots=12)}))
+    assert np.allclose(metrics["speed_knots"], 12, atol=0.1)
+    assert detector.detect(TrackBatch.from_tracks({"v": steady(knots=12)})) == []
+
+def test_position_jump_is_flagged_once_per_vessel():
+    points = steady()
+    points[6] = TrackPoint(points[6].lat + 1.0, points[6].lon, points[6].timestamp)
+    candidates = SpeedAnomalyDetector().detect(TrackBatch.from_tracks({"v": points, "ok": steady(lat=30)}))
+    assert len(candidates) == 1
+    assert candidates[0].ship_id == "v"
+    assert candidates[0].details["kind"] == "implausible_jump" and candidates[0].details["segments"] == 2
+
+def test_speed_regime_change():
+    slow = steady(knots=2, count=6)
+    fast = steady(lat=slow[-1].lat, knots=20, count=6, start=slow[-1].timestamp)[1:]
+    candidates = SpeedAnomalyDetector().detect(TrackBatch.from_tracks({"v": slow + fast}))
+    assert [c.details["kind"] for c in candidates] == ["regime_change"]
+    assert candidates[0].started_at == slow[-1].timestamp
+
+def test_segments_never_span_vessels():
+    far = steady(lat=-40.0, lon=100.0)
+    assert SpeedAnomalyDetector().detect(TrackBatch.from_tracks({"a": steady(), "b": far})) == []
@@ -0,0 +1,29 @@
+import asyncio
+
+import ship_monitor_agent
+from ship_monitor_agent import TokenBudget
+
+def test_settle_corrects_reservation_in_place(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(ship_monitor_agent.time, "monotonic", lambda: clock[0])
+    budget = TokenBudget(10_000)
+
+    reservation = asyncio.run(budget.acquire(4000))
+    clock[0] += 30
+    budget.settle(reservation, 1000)
+    assert budget._used(clock[0]) == 1000
+
+    # The corrected reservation expires with its original timestamp and never goes negative
+    clock[0] += 31
+    assert budget._used(clock[0]) == 0
+
+def test_acquire_caps_at_budget():
+    budget = TokenBudget(5000)
+    reservation = asyncio.run(budget.acquire(8000))
+    assert reservation[1] == 5000
+
+def test_disabled_budget_reserves_nothing():
+    budget = TokenBudget(0)
+    reservation = asyncio.run(budget.acquire(8000))
+    budget.settle(reservation, 3000)
+    assert reservation is None and not budget._usage
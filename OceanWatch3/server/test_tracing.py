@@ -0,0 +1,74 @@
+from uuid import uuid4
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from tracing import RunTracer, llm_token_usage
+
+def chat_result(text="ok", usage=None, tool_calls=None, llm_output=None):
+    message = AIMessage(content=text, tool_calls=tool_calls or [], usage_metadata=usage)
+    return LLMResult(generations=[[ChatGeneration(message=message)]], llm_output=llm_output)
+
+def test_token_usage_prefers_llm_output():
+    response = chat_result(llm_output={"token_usage": {"prompt_tokens": 7, "completion_tokens": 3, "total_tokens": 10}})
+    assert llm_token_usage(response) == {"prompt": 7, "completion": 3, "total": 10}
+
+def test_token_usage_falls_back_to_message_metadata():
+    response = chat_result(usage={"input_tokens": 5, "output_tokens": 2, "total_tokens": 7})
+    assert llm_token_usage(response) == {"prompt": 5, "completion": 2, "total": 7}
+
+def test_llm_and_tool_spans_are_recorded():
+    tracer = RunTracer("cycle", categories={"find_ships": "mongo"}, ships=3)
+    llm_id, tool_id = uuid4(), uuid4()
+    tracer.on_chat_model_start({"kwargs": {"model_name": "gpt-test"}}, [[HumanMessage(content="hello")]], run_id=llm_id)
+    tracer.on_llm_end(chat_result(
+        text="calling",
+        usage={"input_tokens": 5, "output_tokens": 2, "total_tokens": 7},
+        tool_calls=[{"name": "find_ships", "args": {}, "id": "call-1"}]
+    ), run_id=llm_id)
+    tracer.on_tool_start({"name": "find_ships"}, "{}", run_id=tool_id, parent_run_id=llm_id)
+    tracer.on_tool_end("three ships", run_id=tool_id)
+    tracer.finish()
+
+    llm_span, tool_span = sorted(tracer.spans, key=lambda span: span["kind"])
+    assert llm_span["name"] == "gpt-test" and llm_span["input_chars"] == 5
+    assert llm_span["tool_calls"] == 1 and llm_span["tokens"]["total"] == 7
+    assert tool_span["category"] == "mongo" and tool_span["parent_id"] == str(llm_id)
+    assert tool_span["output_chars"] == len("three ships")
+    assert tracer.total_tokens == 7
+
+    totals = tracer.totals()
+    assert totals["llm_calls"] == 1 and totals["tool_calls"] == 1
+    assert totals["prompt_tokens"] == 5 and totals["completion_tokens"] == 2
+    assert totals["by_category"]["mongo"]["calls"] == 1
+    assert totals["by_tool"]["find_ships"] == {"calls": 1, "ms": tool_span["duration_ms"], "output_chars": 11, "errors": 0}
+    assert "7 tokens" in tracer.summary()
+
+def test_unknown_tools_fall_back_to_tool_category():
+    tracer = RunTracer("cycle")
+    run_id = uuid4()
+    tracer.on_tool_start({"name": "mystery"}, "", run_id=run_id)
+    tracer.on_tool_error(RuntimeError("boom"), run_id=run_id)
+    span = tracer.spans[0]
+    assert span["category"] == "tool" and span["error"] == "boom"
+    assert tracer.totals()["by_tool"]["mystery"]["errors"] == 1
+
+def test_unmatched_end_is_ignored():
+    tracer = RunTracer("cycle")
+    tracer.on_tool_end("orphan", run_id=uuid4())
+    assert tracer.spans == []
+
+def test_document_records_status_and_sorted_spans():
+    tracer = RunTracer("cycle", trigger="manual")
+    first, second = uuid4(), uuid4()
+    tracer.on_tool_start({"name": "a"}, "", run_id=first)
+    tracer.on_tool_start({"name": "b"}, "", run_id=second)
+    tracer.on_tool_end("", run_id=second)
+    tracer.on_tool_end("", run_id=first)
+    tracer.finish(ValueError())
+
+    document = tracer.to_document()
+    assert document["status"] == "failed" and document["error"] == "ValueError"
+    assert document["attributes"] == {"trigger": "manual"}
+    assert [span["name"] for span in document["spans"]] == ["a", "b"]
+    assert document["ended_at"] is not None and document["duration_ms"] is not None
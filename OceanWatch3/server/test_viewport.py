@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from fake_mongo import AsyncFakeCollection, FakeCollection, matches
+from viewport import _MAX_PIECE_DEGREES, _PAD_DEGREES, _pieces, _split, bbox_query, bbox_zoom, cluster, in_bbox, parse_bbox, viewport
+
+PACIFIC = (170.0, -10.0, -170.0, 10.0)
+
+def vessel(vessel_id, lat, lon, **fields):
+    return {"vessel_id": vessel_id, "lat": lat, "lon": lon, "location": {"type": "Point", "coordinates": [lon, lat]}, **fields}
+
+def run_viewport(docs, bbox, zoom=None, max_points=10, cluster_max_zoom=12, cell_bits=2):
+    collection = AsyncFakeCollection(FakeCollection(docs))
+    return asyncio.run(viewport(collection, bbox, zoom, max_points, cluster_max_zoom, cell_bits))
+
+def test_parse_bbox():
+    assert parse_bbox("170,-10,-170,10") == PACIFIC
+    for bad in ("1,2,3", "a,0,1,1", "0,0,nan,1", "0,10,1,5", "0,-91,1,0", "5,0,5,1", "-181,0,1,1"):
+        with pytest.raises(ValueError):
+            parse_bbox(bad)
+
+def test_zoom_follows_the_width_across_the_antimeridian():
+    assert bbox_zoom((-180.0, -90.0, 180.0, 90.0)) == 0
+    assert bbox_zoom(PACIFIC) == bbox_zoom((-10.0, -10.0, 10.0, 10.0)) == 4
+
+def test_boxes_crossing_the_antimeridian_split_in_two():
+    assert _split((-10.0, 0.0, 10.0, 1.0)) == [(-10.0, 0.0, 10.0, 1.0)]
+    assert _split(PACIFIC) == [(170.0, -10.0, 180.0, 10.0), (-180.0, -10.0, -170.0, 10.0)]
+    assert in_bbox(PACIFIC, 0, 175) and in_bbox(PACIFIC, 0, -175) and in_bbox(PACIFIC, 10, 180)
+    assert not in_bbox(PACIFIC, 0, 0) and not in_bbox(PACIFIC, 11, 175)
+
+def test_wide_boxes_become_bounded_pieces():
+    pieces = _pieces((-180.0, -80.0, 180.0, 80.0))
+    assert len(pieces) == 3 and all(box[2] - box[0] <= _MAX_PIECE_DEGREES for box in pieces)
+    assert pieces[0][0] == -180.0 and pieces[-1][2] == 180.0
+
+def test_query_pads_the_box_and_skips_vessels_without_events():
+    query = bbox_query(PACIFIC)
+    assert query["noEvents"] == {"$ne": True} and len(query["$or"]) == 2
+    ring = query["$or"][0]["location"]["$geoWithin"]["$geometry"]["coordinates"][0]
+    # Counter-clockwise (positive signed area), as the strict-winding CRS requires
+    assert sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(ring, ring[1:])) > 0
+    assert matches(vessel("padding", 10 + _PAD_DEGREES / 2, 175), query)
+    assert not matches(vessel("outside", 12, 175), query)
+    assert not matches({**vessel("quiet", 0, 175), "noEvents": True}, query)
+
+def test_points_are_clipped_exactly_to_the_box():
+    docs = [vessel("east", 0, 175), vessel("west", 0, -175), vessel("padding", 10 + _PAD_DEGREES / 2, 175), vessel("far", 0, 0)]
+    result = run_viewport(docs, PACIFIC)
+    assert result["mode"] == "points" and not result["truncated"]
+    assert [point["vessel_id"] for point in result["points"]] == ["east", "west"]
+    assert "location" not in result["points"][0]
+
+def test_padding_alone_never_switches_to_clusters():
+    docs = [vessel("a", 0, 175), vessel("b", 1, 176), vessel("padding", 10 + _PAD_DEGREES / 2, 175)]
+    result = run_viewport(docs, PACIFIC, max_points=2)
+    assert result["mode"] == "points" and result["count"] == 2 and not result["truncated"]
+
+def test_crowded_viewports_cluster_until_zoomed_in():
+    docs = [vessel(f"v{i}", 1 + i * 0.001, 175 + i * 0.001, aisOff_count=i % 2) for i in range(5)] + [vessel("lone", -5, -175)]
+    clustered = run_viewport(docs, PACIFIC, max_points=3)
+    assert clustered["mode"] == "clusters" and clustered["count"] == 6
+    assert [(c["count"], c["riskyVessels"]) for c in clustered["clusters"]] == [(5, 2), (1, 0)]
+    assert (clustered["clusters"][1]["lat"], clustered["clusters"][1]["lon"]) == (-5, -175)
+
+    zoomed = run_viewport(docs, PACIFIC, zoom=12, max_points=3)
+    assert zoomed["mode"] == "points" and zoomed["count"] == 3 and zoomed["truncated"]
+
+def test_clusters_sit_at_their_members_mean():
+    clusters = cluster([vessel("a", 1.0, 1.0, aisOff_count=2), vessel("b", 1.002, 1.004, eventsInNoTakeMpas_count=1)], zoom=4, cell_bits=2)
+    assert clusters == [{"lat": 1.001, "lon": 1.002, "count": 2, "riskScore": 3.0, "riskyVessels": 2}]
+    assert cluster([], zoom=4, cell_bits=2) == []
@@ -0,0 +1,170 @@
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+
+def llm_token_usage(response: LLMResult) -> Dict[str, int]:
+    """Prompt/completion/total tokens reported for one LLM call (OpenAI llm_output or message usage_metadata)"""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage.get("total_tokens"):
+        return {
+            "prompt": usage.get("prompt_tokens", 0),
+            "completion": usage.get("completion_tokens", 0),
+            "total": usage["total_tokens"]
+        }
+    totals = {"prompt": 0, "completion": 0, "total": 0}
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if metadata:
+                totals["prompt"] += metadata.get("input_tokens", 0)
+                totals["completion"] += metadata.get("output_tokens", 0)
+                totals["total"] += metadata.get("total_tokens", 0)
+    return totals
+
+class RunTracer(BaseCallbackHandler):
+    """Records a span for every LLM call and tool invocation of one agent run.
+
+    Spans carry wall-clock duration, token usage (LLM spans) and input/output
+    sizes in characters. Tools are grouped into categories (for example mongo
+    or news) so a cycle's time can be split into LLM, database and external
+    API time. Tool spans that ran concurrently are summed, so category totals
+    can exceed the run's wall-clock duration.
+    """
+
+    # Called on the event loop thread rather than in an executor, so span timing is not skewed
+    run_inline = True
+
+    def __init__(self, name: str, categories: Optional[Dict[str, str]] = None, **attributes: Any):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.attributes = attributes
+        self.categories = categories or {}
+        self.started_at = datetime.now(timezone.utc)
+        self._t0 = time.perf_counter()
+        self.ended_at: Optional[datetime] = None
+        self.duration_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self.spans: List[Dict[str, Any]] = []
+        self._open: Dict[UUID, Dict[str, Any]] = {}
+
+    def _offset_ms(self) -> float:
+        return round((time.perf_counter() - self._t0) * 1000, 2)
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], kind: str, name: str, category: str, input_chars: int) -> None:
+        self._open[run_id] = {
+            "span_id": str(run_id),
+            "parent_id": str(parent_run_id) if parent_run_id else None,
+            "kind": kind,
+            "name": name,
+            "category": category,
+            "start_ms": self._offset_ms(),
+            "input_chars": input_chars
+        }
+
+    def _end(self, run_id: UUID, **fields: Any) -> None:
+        span = self._open.pop(run_id, None)
+        if span is None:
+            return
+        span["duration_ms"] = round(self._offset_ms() - span["start_ms"], 2)
+        span.update(fields)
+        self.spans.append(span)
+
+    @staticmethod
+    def _model_name(serialized: Optional[Dict[str, Any]], metadata: Optional[Dict[str, Any]]) -> str:
+        if metadata and metadata.get("ls_model_name"):
+            return metadata["ls_model_name"]
+        serialized = serialized or {}
+        return (serialized.get("kwargs") or {}).get("model_name") or (serialized.get("id") or ["llm"])[-1]
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[BaseMessage]], *, run_id: UUID,
+                            parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        chars = sum(len(str(message.content)) for batch in messages for message in batch)
+        self._start(run_id, parent_run_id, "llm", self._model_name(serialized, metadata), "llm", chars)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID,
+                     parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        self._start(run_id, parent_run_id, "llm", self._model_name(serialized, metadata), "llm", sum(len(p) for p in prompts))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        messages = [getattr(g, "message", None) for generations in response.generations for g in generations]
+        self._end(
+            run_id,
+            tokens=llm_token_usage(response),
+            output_chars=sum(len(g.text or "") for generations in response.generations for g in generations),
+            tool_calls=sum(len(getattr(m, "tool_calls", None) or []) for m in messages)
+        )
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error=str(error))
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID,
+                      parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self._start(run_id, parent_run_id, "tool", name, self.categories.get(name, "tool"), len(input_str or ""))
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, output_chars=len(str(getattr(output, "content", output))))
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error=str(error))
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.ended_at = datetime.now(timezone.utc)
+        self.duration_ms = self._offset_ms()
+        if error is not None:
+            self.error = str(error) or type(error).__name__
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(span.get("tokens", {}).get("total", 0) for span in self.spans if span["kind"] == "llm")
+
+    def totals(self) -> Dict[str, Any]:
+        by_category: Dict[str, Dict[str, Any]] = {}
+        by_tool: Dict[str, Dict[str, Any]] = {}
+        for span in self.spans:
+            category = by_category.setdefault(span["category"], {"calls": 0, "ms": 0.0})
+            category["calls"] += 1
+            category["ms"] = round(category["ms"] + span["duration_ms"], 2)
+            if span["kind"] == "tool":
+                tool = by_tool.setdefault(span["name"], {"calls": 0, "ms": 0.0, "output_chars": 0, "errors": 0})
+                tool["calls"] += 1
+                tool["ms"] = round(tool["ms"] + span["duration_ms"], 2)
+                tool["output_chars"] += span.get("output_chars", 0)
+                tool["errors"] += 1 if span.get("error") else 0
+        llm_spans = [span for span in self.spans if span["kind"] == "llm"]
+        return {
+            "llm_calls": len(llm_spans),
+            "llm_ms": round(sum(span["duration_ms"] for span in llm_spans), 2),
+            "tool_calls": len(self.spans) - len(llm_spans),
+            "tool_ms": round(sum(span["duration_ms"] for span in self.spans if span["kind"] == "tool"), 2),
+            "prompt_tokens": sum(span.get("tokens", {}).get("prompt", 0) for span in llm_spans),
+            "completion_tokens": sum(span.get("tokens", {}).get("completion", 0) for span in llm_spans),
+            "total_tokens": self.total_tokens,
+            "by_category": by_category,
+            "by_tool": by_tool
+        }
+
+    def summary(self) -> str:
+        totals = self.totals()
+        categories = ", ".join(f"{name} {c['ms'] / 1000:.2f}s/{c['calls']}" for name, c in sorted(totals["by_category"].items()))
+        return f"{self.name} took {(self.duration_ms or self._offset_ms()) / 1000:.2f}s ({categories}), {totals['total_tokens']} tokens"
+
+    def to_document(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "attributes": self.attributes,
+            "started_at": self.started_at,
+            "ended_at": self.ended_at,
+            "duration_ms": self.duration_ms,
+            "status": "failed" if self.error else "completed",
+            "error": self.error,
+            "totals": self.totals(),
+            "spans": sorted(self.spans, key=lambda span: span["start_ms"])
+        }
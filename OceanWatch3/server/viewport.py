@@ -0,0 +1,141 @@
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from pymongo import GEOSPHERE, IndexModel
+
+from positions import COUNTER_FIELDS
+from risk_grid import RISK_FIELDS, tile_cells
+
+LOCATION_INDEXES = [IndexModel([("location", GEOSPHERE)], name="location_2dsphere")]
+
+VIEWPORT_PROJECTION = {"_id": 0, "vessel_id": 1, "name": 1, "lat": 1, "lon": 1, "bearing": 1, **{field: 1 for field in COUNTER_FIELDS}}
+CLUSTER_PROJECTION = {"_id": 0, "lat": 1, "lon": 1, **{field: 1 for field in RISK_FIELDS}}
+
+# Lets big polygons (a zoomed-out viewport) cover more than a hemisphere
+_BIG_POLYGON_CRS = {"type": "name", "properties": {"name": "urn:x-mongodb:crs:strictwinding:EPSG:4326"}}
+# Polygon edges are geodesics; short steps keep them close to the viewport's lines of latitude
+_EDGE_STEP_DEGREES = 1.0
+# Pad the polygon so bowed edges never cut into the viewport; results are then clipped exactly
+_PAD_DEGREES = 0.05
+_MAX_PIECE_DEGREES = 120.0
+# Edges at the poles would collapse to a point
+_POLE_LIMIT = 89.99
+
+BBox = Tuple[float, float, float, float]
+
+def _valid_position() -> Dict[str, Any]:
+    return {"lat": {"$type": "number", "$gte": -90, "$lte": 90}, "lon": {"$type": "number", "$gte": -180, "$lte": 180}}
+
+async def normalize_locations(collection) -> int:
+    """Set a GeoJSON `location` point from `lat`/`lon` wherever it is missing or stale.
+
+    Runs as a single update on the server, so only documents whose position
+    changed since the last run are written; safe to repeat.
+    """
+    result = await collection.update_many(
+        {**_valid_position(), "$expr": {"$ne": ["$location.coordinates", ["$lon", "$lat"]]}},
+        [{"$set": {"location": {"type": "Point", "coordinates": ["$lon", "$lat"]}}}]
+    )
+    return result.modified_count
+
+def parse_bbox(bbox: str) -> BBox:
+    """min_lon,min_lat,max_lon,max_lat; min_lon > max_lon means the box crosses the antimeridian"""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(value) for value in bbox.split(","))
+    except ValueError:
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat")
+    if not all(math.isfinite(v) for v in (min_lon, min_lat, max_lon, max_lat)):
+        raise ValueError("bbox values must be finite")
+    if not (-90 <= min_lat < max_lat <= 90):
+        raise ValueError("bbox latitudes must satisfy -90 <= min_lat < max_lat <= 90")
+    if not (-180 <= min_lon <= 180 and -180 <= max_lon <= 180) or min_lon == max_lon:
+        raise ValueError("bbox longitudes must be distinct and within -180..180")
+    return min_lon, min_lat, max_lon, max_lat
+
+def bbox_zoom(bbox: BBox) -> int:
+    """Web-map zoom at which the box spans roughly one 256 px tile"""
+    min_lon, _, max_lon, _ = bbox
+    width = (max_lon - min_lon) % 360 or 360
+    return max(0, min(22, int(math.floor(math.log2(360.0 / width)))))
+
+def _split(bbox: BBox) -> List[BBox]:
+    """The box as non-wrapping pieces; in_bbox uses these too"""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    if min_lon <= max_lon:
+        return [bbox]
+    return [(min_lon, min_lat, 180.0, max_lat), (-180.0, min_lat, max_lon, max_lat)]
+
+def _pieces(bbox: BBox) -> List[BBox]:
+    """Non-wrapping pieces at most _MAX_PIECE_DEGREES wide, so no polygon has coinciding edges"""
+    pieces = []
+    for min_lon, min_lat, max_lon, max_lat in _split(bbox):
+        count = max(1, math.ceil((max_lon - min_lon) / _MAX_PIECE_DEGREES))
+        width = (max_lon - min_lon) / count
+        pieces += [(min_lon + width * i, min_lat, min_lon + width * (i + 1), max_lat) for i in range(count)]
+    return pieces
+
+def _polygon(bbox: BBox) -> Dict[str, Any]:
+    min_lon, min_lat, max_lon, max_lat = bbox
+    west, east = max(min_lon - _PAD_DEGREES, -180.0), min(max_lon + _PAD_DEGREES, 180.0)
+    south = max(min_lat - _PAD_DEGREES, -_POLE_LIMIT)
+    north = min(max_lat + _PAD_DEGREES, _POLE_LIMIT)
+    steps = max(1, math.ceil((east - west) / _EDGE_STEP_DEGREES))
+    lons = [west + (east - west) * i / steps for i in range(steps + 1)]
+    # Counter-clockwise, as the strict-winding CRS requires
+    ring = [[lon, south] for lon in lons] + [[lon, north] for lon in reversed(lons)] + [[west, south]]
+    return {"type": "Polygon", "coordinates": [ring], "crs": _BIG_POLYGON_CRS}
+
+def bbox_query(bbox: BBox) -> Dict[str, Any]:
+    """Vessels whose `location` falls in the (padded) box, through the 2dsphere index"""
+    clauses = [{"location": {"$geoWithin": {"$geometry": _polygon(box)}}} for box in _pieces(bbox)]
+    return {"noEvents": {"$ne": True}, **(clauses[0] if len(clauses) == 1 else {"$or": clauses})}
+
+def in_bbox(bbox: BBox, lat: float, lon: float) -> bool:
+    return any(box[1] <= lat <= box[3] and box[0] <= lon <= box[2] for box in _split(bbox))
+
+def cluster(vessels: List[Dict[str, Any]], zoom: int, cell_bits: int) -> List[Dict[str, Any]]:
+    """Vessels grouped into map grid cells at `zoom`, one cluster per non-empty cell.
+
+    Clusters sit at their members' mean position rather than the cell
+    centre, so a cluster of one is drawn where the vessel is.
+    """
+    if not vessels:
+        return []
+    lat = np.array([v["lat"] for v in vessels], dtype=np.float64)
+    lon = np.array([v["lon"] for v in vessels], dtype=np.float64)
+    risk = np.array([sum(v.get(field) or 0 for field in RISK_FIELDS) for v in vessels], dtype=np.float64)
+    cells, inverse = np.unique(tile_cells(lat, lon, zoom + cell_bits), axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    counts = np.bincount(inverse, minlength=len(cells))
+    mean_lat = np.bincount(inverse, weights=lat, minlength=len(cells)) / counts
+    mean_lon = np.bincount(inverse, weights=lon, minlength=len(cells)) / counts
+    risk_sum = np.bincount(inverse, weights=risk, minlength=len(cells))
+    risky = np.bincount(inverse, weights=(risk > 0).astype(np.float64), minlength=len(cells))
+    order = np.argsort(-counts, kind="stable")
+    return [
+        {"lat": round(float(mean_lat[i]), 5), "lon": round(float(mean_lon[i]), 5), "count": int(counts[i]),
+         "riskScore": float(risk_sum[i]), "riskyVessels": int(risky[i])}
+        for i in order
+    ]
+
+async def viewport(collection, bbox: BBox, zoom: Optional[int], max_points: int,
+                   cluster_max_zoom: int, cell_bits: int) -> Dict[str, Any]:
+    """Vessels in `bbox` as points when there are at most `max_points` (or the map is zoomed in
+    to `cluster_max_zoom`), otherwise as grid clusters"""
+    zoom = bbox_zoom(bbox) if zoom is None else zoom
+    query = bbox_query(bbox)
+    docs = await collection.find(query, VIEWPORT_PROJECTION).limit(max_points + 1).to_list()
+    points = [doc for doc in docs if in_bbox(bbox, doc.get("lat", 1e9), doc.get("lon", 1e9))]
+    if len(docs) <= max_points or zoom >= cluster_max_zoom:
+        truncated = len(docs) > max_points
+        return {"mode": "points", "zoom": zoom, "count": len(points[:max_points]),
+                "truncated": truncated, "points": points[:max_points]}
+    members = await collection.find(query, CLUSTER_PROJECTION).to_list()
+    members = [doc for doc in members if in_bbox(bbox, doc.get("lat", 1e9), doc.get("lon", 1e9))]
+    if len(members) <= max_points:
+        # Only the padding pushed the first read over the limit, so its points may be incomplete
+        docs = await collection.find(query, VIEWPORT_PROJECTION).to_list()
+        points = [doc for doc in docs if in_bbox(bbox, doc.get("lat", 1e9), doc.get("lon", 1e9))]
+        return {"mode": "points", "zoom": zoom, "count": len(points), "truncated": False, "points": points}
+    return {"mode": "clusters", "zoom": zoom, "count": len(members), "clusters": cluster(members, zoom, cell_bits)}